@@ -0,0 +1,237 @@
+"""
+Content-Addressed Analysis Cache
+Persists per-frame detections and metrics so repeated requests for the same video skip decoding
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the stored record layout or the metrics that fill it change
+SCHEMA_VERSION = 4
+
+_fingerprints: Dict[Any, str] = {}
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def video_fingerprint(video_path: str) -> str:
+    """SHA-256 of the file contents (memoized per path, size and mtime)"""
+    stat = os.stat(video_path)
+    memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    fingerprint = _fingerprints.get(memo_key)
+    if fingerprint is None:
+        digest = hashlib.sha256()
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        fingerprint = digest.hexdigest()
+        _fingerprints[memo_key] = fingerprint
+    return fingerprint
+
+
+def cache_key(video_path: str, params: Dict[str, Any]) -> str:
+    """Key from the video content plus every model and sampling parameter the records depend on"""
+    payload = json.dumps(
+        {'video': video_fingerprint(video_path), 'schema': SCHEMA_VERSION, 'params': params},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def records_to_columns(records: List[Dict[str, Any]], prefix: str = '') -> Dict[str, np.ndarray]:
+    """Encode homogeneous records into flat numpy columns.
+
+    Nested dicts become dotted columns, lists of dicts become child tables
+    with a parent index, lists of strings are joined and fixed-length
+    numeric lists (bboxes) become 2-D columns.
+    """
+    keys = list(records[0].keys()) if records else []
+    columns = {prefix + '#keys': np.array(keys, dtype=str), prefix + '#n': np.array(len(records))}
+
+    for key in keys:
+        name = prefix + key
+        values = [record[key] for record in records]
+        sample = values[0]
+
+        if isinstance(sample, dict):
+            columns.update(records_to_columns(values, name + '.'))
+        elif isinstance(sample, list) and any(isinstance(v, dict) for value in values for v in value):
+            children = [child for value in values for child in value]
+            parents = [i for i, value in enumerate(values) for _ in value]
+            columns[name + '#parent'] = np.array(parents, dtype=np.int32)
+            columns.update(records_to_columns(children, name + '/'))
+        elif isinstance(sample, list) and any(isinstance(v, str) for value in values for v in value):
+            columns[name + '#strs'] = np.array(['\x1f'.join(value) for value in values], dtype=str)
+        elif isinstance(sample, list) and not any(values):
+            # Every list empty: nothing to infer a type from
+            columns[name + '#empty'] = np.array(len(values))
+        else:
+            column = np.asarray(values)
+            if column.dtype == object:
+                raise ValueError(f"Cannot store column '{name}' without pickling")
+            columns[name] = column
+
+    return columns
+
+
+def columns_to_records(
+    columns: Dict[str, np.ndarray],
+    prefix: str = '',
+    rows: Optional[Sequence[int]] = None
+) -> List[Dict[str, Any]]:
+    """Inverse of records_to_columns; `rows` decodes only the records at those positions"""
+    keys = [str(k) for k in columns[prefix + '#keys']]
+    total = int(columns[prefix + '#n'])
+    rows = np.arange(total) if rows is None else np.asarray(rows, dtype=np.int64)
+    count = len(rows)
+    records = [{} for _ in range(count)]
+
+    for key in keys:
+        name = prefix + key
+        if name + '.#keys' in columns:
+            values = columns_to_records(columns, name + '.', rows)
+        elif name + '#parent' in columns:
+            values = [[] for _ in range(count)]
+            # Output slot of every parent row (-1 when not decoded), then only the children of decoded rows
+            slots = np.full(total, -1, dtype=np.int64)
+            slots[rows] = np.arange(count)
+            parents = slots[columns[name + '#parent']]
+            wanted = np.flatnonzero(parents >= 0)
+            children = columns_to_records(columns, name + '/', wanted)
+            for parent, child in zip(parents[wanted].tolist(), children):
+                values[parent].append(child)
+        elif name + '#strs' in columns:
+            values = [s.split('\x1f') if s else [] for s in columns[name + '#strs'][rows].tolist()]
+        elif name + '#empty' in columns:
+            values = [[] for _ in range(count)]
+        else:
+            values = columns[name][rows].tolist()
+
+        for record, value in zip(records, values):
+            record[key] = value
+
+    return records
+
+
+class AnalysisCache:
+    """On-disk npz cache of per-frame analysis records with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str, section: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{section}.npz")
+
+    def get(self, key: str, section: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached records for a key and section (e.g. 'netflix'), or None"""
+        return self._load(key, section, columns_to_records)
+
+    def get_columns(self, key: str, section: str) -> Optional[Dict[str, np.ndarray]]:
+        """Cached records as the flat columns of records_to_columns, without building a dict per record"""
+        return self._load(key, section, lambda columns: columns)
+
+    def _load(self, key: str, section: str, decode: Callable[[Dict[str, np.ndarray]], Any]) -> Any:
+        path = self._path(key, section)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                records = decode({name: data[name] for name in data.files})
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"⚠ Discarding unreadable cache entry {os.path.basename(path)}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return records
+
+    def put(self, key: str, section: str, records: List[Dict[str, Any]]) -> bool:
+        """Store records atomically, then evict least recently used entries over the size limit"""
+        try:
+            columns = records_to_columns(records)
+        except (ValueError, TypeError) as e:
+            print(f"⚠ Not caching {section} analysis: {e}")
+            return False
+
+        path = self._path(key, section)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **columns)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._remove(tmp_path)
+            print(f"⚠ Failed to write cache entry: {e}")
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.npz'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        entries = [n for n in os.listdir(self.cache_dir) if n.endswith('.npz')]
+        size = sum(os.path.getsize(os.path.join(self.cache_dir, n)) for n in entries)
+        return {
+            'dir': self.cache_dir,
+            'entries': len(entries),
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Process-wide cache configured from the environment (None when THUMBNAIL_CACHE_MB=0)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            max_mb = float(os.environ.get('THUMBNAIL_CACHE_MB', 2048))
+            if max_mb <= 0:
+                return None
+            cache_dir = os.environ.get('THUMBNAIL_CACHE_DIR', os.path.join(PROJECT_ROOT, 'analysis_cache'))
+            _default_cache = AnalysisCache(cache_dir, int(max_mb * 1024 * 1024))
+        return _default_cache
@@ -3,8 +3,10 @@ Flask Backend API for Thumbnail Generation System
 Connects frontend to Python AI models
 """
 
+import mimetypes
 import os
 import sys
+import threading
 
 # Set UTF-8 encoding for Windows compatibility
 if sys.platform == 'win32':
@@ -15,14 +17,28 @@ if sys.platform == 'win32':
     if hasattr(sys.stderr, 'reconfigure'):
         sys.stderr.reconfigure(encoding='utf-8')
 
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
-import subprocess
 import json
 from pathlib import Path
 import uuid
 from werkzeug.utils import secure_filename
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Make the model pipelines and backend helpers importable regardless of the launch directory
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.normpath(os.path.dirname(BACKEND_DIR))
+for _path in (PROJECT_ROOT, BACKEND_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from worker_pool import ModelWorkerPool, SUPPORTED_MODELS
+from job_store import JobStore, JobStoreFull
+from thumbnail_index import ThumbnailIndex, default_db_path
+from result_manifest import manifest_paths, read_manifest, rendition_paths
+from thumbnail_encoding import FORMATS, choose_rendition
+from chunked_upload import UploadStore, UploadNotFound, UploadOffsetMismatch
 
 app = Flask(__name__)
 # Enable CORS for all origins (required for Vercel deployment)
@@ -34,6 +50,7 @@ CORS(app)
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm'}
+GENERATION_TIMEOUT = 1800
 
 # Create directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -42,6 +59,197 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Warm model workers shared by all requests (size via THUMBNAIL_WORKERS)
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+# Asynchronous jobs submitted through /api/jobs
+job_store = JobStore(
+    max_jobs=int(os.environ.get('THUMBNAIL_MAX_JOBS', 100)),
+    ttl_seconds=float(os.environ.get('THUMBNAIL_JOB_TTL', 3600))
+)
+# job_id -> future of every async job handed to the pool and not yet recorded in job_store.
+# Once a job is here, only _finish_async_job decides its final state.
+_async_futures = {}
+_async_futures_lock = threading.Lock()
+
+# Resumable chunked uploads (/api/uploads), kept apart from multipart uploads so an
+# upload_id can only ever resolve to a file the store created
+upload_store = UploadStore(os.path.join(BACKEND_DIR, UPLOAD_FOLDER, 'chunked'))
+
+# request_id/filename -> path for serving routes (path via THUMBNAIL_INDEX_DB)
+thumbnail_index = ThumbnailIndex(default_db_path())
+
+# Served files are revalidated after an hour; URLs carrying their content hash (?v=) never change
+THUMBNAIL_MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Optional: hand the bytes to the front server instead of streaming them from Flask (see SETUP_NGINX.md).
+# THUMBNAIL_ACCEL_REDIRECT is an nginx `internal` location mapped onto THUMBNAIL_ACCEL_ROOT;
+# THUMBNAIL_X_SENDFILE=1 emits X-Sendfile (Apache mod_xsendfile, lighttpd) instead.
+ACCEL_REDIRECT_PREFIX = os.environ.get('THUMBNAIL_ACCEL_REDIRECT', '')
+ACCEL_REDIRECT_ROOT = os.path.abspath(os.environ.get('THUMBNAIL_ACCEL_ROOT', os.path.join(BACKEND_DIR, OUTPUT_FOLDER)))
+app.config['USE_X_SENDFILE'] = os.environ.get('THUMBNAIL_X_SENDFILE', '0').lower() in ('1', 'true', 'yes')
+
+def get_worker_pool():
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = ModelWorkerPool().start()
+        return _worker_pool
+
+def _save_generation_upload():
+    """Validate the generation form, save the upload and create the output dir.
+
+    Returns (params, None) on success or (None, error_response) on bad input.
+    """
+    # Either a multipart file or a chunked upload started via /api/uploads (possibly still in progress)
+    upload_id = request.form.get('upload_id')
+    if 'video' not in request.files and not upload_id:
+        return None, (jsonify({'success': False, 'error': 'No video file provided'}), 400)
+
+    video_file = None
+    if upload_id:
+        try:
+            upload = upload_store.status(upload_id)
+        except UploadNotFound:
+            return None, (jsonify({'success': False, 'error': f'Unknown upload: {upload_id}'}), 404)
+        filename = upload['filename']
+    else:
+        video_file = request.files['video']
+        filename = video_file.filename
+        if filename == '':
+            return None, (jsonify({'success': False, 'error': 'No file selected'}), 400)
+
+    if not allowed_file(filename):
+        return None, (jsonify({'success': False, 'error': 'Invalid file type. Please upload a video file.'}), 400)
+
+    # Get parameters
+    title = request.form.get('title', 'Video Title')
+    genre = request.form.get('genre', 'drama')
+    model = request.form.get('model', 'hybrid')
+    variants = int(request.form.get('variants', 20))
+    want_debug = request.args.get('debug') == '1'
+
+    # Generate unique ID for this request
+    request_id = str(uuid.uuid4())[:8]
+
+    # Save uploaded file to absolute path
+    filename = secure_filename(filename)
+    if video_file is None:
+        video_path = upload_store.path(upload_id)
+    else:
+        uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), UPLOAD_FOLDER)
+        os.makedirs(uploads_dir, exist_ok=True)
+        video_path = os.path.join(uploads_dir, f"{request_id}_{filename}")
+        video_file.save(video_path)
+
+    # Determine output directory (use absolute path)
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), OUTPUT_FOLDER, f"{request_id}_{Path(filename).stem}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Compute paths
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(backend_dir)
+    project_root = os.path.normpath(project_root)
+
+    # Debug: Print paths
+    print(f"DEBUG: Backend dir: {backend_dir}")
+    print(f"DEBUG: Project root: {project_root}")
+    print(f"DEBUG: Current working dir: {os.getcwd()}")
+    print(f"DEBUG: Video path: {video_path}")
+    print(f"DEBUG: Video exists: {os.path.exists(video_path)}")
+
+    return {
+        'request_id': request_id,
+        'video_path': video_path,
+        'output_dir': output_dir,
+        'title': title,
+        'genre': genre,
+        'model': model,
+        'variants': variants,
+        'want_debug': want_debug
+    }, None
+
+def _build_job(params):
+    """Worker pool job description for a saved upload"""
+    return {
+        'job_id': params['request_id'],
+        'model': params['model'],
+        'video_path': params['video_path'],
+        'title': params['title'],
+        'genre': params['genre'],
+        'variants': params['variants'],
+        'output_dir': params['output_dir'],
+        # The pool cancels the job (or kills its worker) once it has run this long
+        'timeout': GENERATION_TIMEOUT
+    }
+
+def _collect_thumbnails(request_id, output_dir, variants, manifest=None):
+    """Build API descriptors from a finished job's result manifest.
+
+    The manifest comes back with the worker result; the copy the pipeline
+    wrote to output_dir is only read if it is missing.
+    Returns (thumbnails, thumbnail_files); thumbnail_files includes the renditions.
+    """
+    from urllib.parse import quote
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    outputs_abs = (Path(backend_dir) / OUTPUT_FOLDER).resolve()
+
+    if manifest is None:
+        manifest = read_manifest(output_dir)
+    if manifest is None:
+        print(f"✗ No result manifest in {output_dir}")
+        return [], []
+
+    thumbnail_files = [Path(path) for path in manifest_paths(manifest)]
+    print(f"\n✓ Result manifest ({manifest['model']}): {len(thumbnail_files)} thumbnails in {manifest['output_dir']}")
+
+    # Build response (URLs via /api/thumbnail/<id>/<filename>)
+    thumbnails = []
+    for idx, (entry, thumb_file) in enumerate(zip(manifest['thumbnails'][:variants], thumbnail_files)):
+        thumb_name = thumb_file.name
+        encoded_filename = quote(thumb_name)
+        thumbnail_url = f'http://localhost:5000/api/thumbnail/{request_id}/{encoded_filename}'
+        download_url = f'http://localhost:5000/api/download/{request_id}/{encoded_filename}'
+        # Create static URL path relative to outputs directory if possible
+        try:
+            rel_path = thumb_file.resolve().relative_to(outputs_abs)
+            static_url = f"http://localhost:5000/outputs/{quote(rel_path.as_posix())}"
+        except ValueError:
+            static_url = ''
+
+        # Content-hashed URLs are served as immutable
+        if entry.get('content_hash'):
+            thumbnail_url += f"?v={entry['content_hash'][:16]}"
+
+        thumbnails.append({
+            'id': idx + 1,
+            'url': thumbnail_url,
+            'static_url': static_url,
+            'download_url': download_url,
+            'filename': thumb_name,
+            'scene_type': entry.get('scene_type', 'unknown'),
+            'score': float(entry.get('score', 0.0)),
+            'bytes': entry.get('bytes'),
+            # Smaller JPEG/WebP copies; `url&w=<px>` also picks one, negotiating WebP via Accept
+            'renditions': [
+                {
+                    'url': f'http://localhost:5000/api/thumbnail/{request_id}/{quote(os.path.basename(r["file"]))}'
+                           + (f"?v={r['content_hash'][:16]}" if r.get('content_hash') else ''),
+                    'format': r['format'],
+                    'width': r['width'],
+                    'height': r['height'],
+                    'bytes': r['bytes']
+                }
+                for r in entry.get('renditions', [])
+            ]
+        })
+        print(f"  ✓ {idx+1}. {thumb_name}")
+
+    return thumbnails, thumbnail_files + [Path(path) for path in rendition_paths(manifest)]
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint - redirect to API info"""
@@ -51,6 +259,8 @@ def root():
         'endpoints': {
             'health': '/api/health',
             'generate': '/api/generate (POST)',
+            'uploads': '/api/uploads (POST), /api/uploads/<id> (GET, PATCH)',
+            'jobs': '/api/jobs (POST), /api/jobs/<id> (GET, DELETE), /api/jobs/<id>/events (GET, SSE)',
             'thumbnail': '/api/thumbnail/<id>/<filename> (GET)',
             'test': '/api/test (GET)'
         },
@@ -62,7 +272,10 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'message': 'Thumbnail generation API is running'
+        'message': 'Thumbnail generation API is running',
+        'worker_pool': _worker_pool.status() if _worker_pool is not None else {'running': False},
+        'jobs': job_store.stats(),
+        'thumbnail_index': thumbnail_index.stats()
     })
 
 @app.route('/api/test', methods=['GET'])
@@ -106,140 +319,45 @@ def generate_thumbnails():
     print("NEW GENERATION REQUEST RECEIVED")
     print("="*80)
     try:
-        # Check if video file is present
-        if 'video' not in request.files:
-            return jsonify({'success': False, 'error': 'No video file provided'}), 400
-
-        video_file = request.files['video']
-        if video_file.filename == '':
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
+        params, error_response = _save_generation_upload()
+        if error_response is not None:
+            return error_response
 
-        if not allowed_file(video_file.filename):
-            return jsonify({'success': False, 'error': 'Invalid file type. Please upload a video file.'}), 400
+        request_id = params['request_id']
+        output_dir = params['output_dir']
+        model = params['model']
+        variants = params['variants']
+        want_debug = params['want_debug']
 
-        # Get parameters
-        title = request.form.get('title', 'Video Title')
-        genre = request.form.get('genre', 'drama')
-        model = request.form.get('model', 'hybrid')
-        variants = int(request.form.get('variants', 20))
-        want_debug = request.args.get('debug') == '1'
-
-        # Generate unique ID for this request
-        request_id = str(uuid.uuid4())[:8]
-
-        # Save uploaded file to absolute path
-        filename = secure_filename(video_file.filename)
-        uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), UPLOAD_FOLDER)
-        os.makedirs(uploads_dir, exist_ok=True)
-        video_path = os.path.join(uploads_dir, f"{request_id}_{filename}")
-        video_file.save(video_path)
-
-        # Determine output directory (use absolute path)
-        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), OUTPUT_FOLDER, f"{request_id}_{Path(filename).stem}")
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Compute paths
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(backend_dir)
-        project_root = os.path.normpath(project_root)
-
-        # Debug: Print paths
-        print(f"DEBUG: Backend dir: {backend_dir}")
-        print(f"DEBUG: Project root: {project_root}")
-        print(f"DEBUG: Current working dir: {os.getcwd()}")
-        print(f"DEBUG: Video path: {video_path}")
-        print(f"DEBUG: Video exists: {os.path.exists(video_path)}")
-
-        # Build command for model
-        script_path = None
-        if model == 'hybrid':
-            script_path = os.path.join(project_root, 'hybrid_netflix_disney_system.py')
-            script_path = os.path.normpath(script_path)
-            cmd = [
-                sys.executable, script_path,
-                video_path,
-                '--title', title,
-                '--genre', genre,             # <-- removed stray 'family'
-                '--variants', str(variants),
-                '--output-dir', output_dir
-            ]
-        elif model == 'netflix':
-            script_path = os.path.join(project_root, 'run_netflix_system.py')
-            script_path = os.path.normpath(script_path)
-            cmd = [
-                sys.executable, script_path,
-                video_path,
-                genre,
-                str(variants)
-            ]
-        elif model == 'disney':
-            script_path = os.path.join(project_root, 'disney_complete_system.py')
-            script_path = os.path.normpath(script_path)
-            cmd = [
-                sys.executable, script_path,
-                video_path,
-                '--title', title,
-                '--genre', genre,             # <-- removed stray 'family'
-                '--variants', str(variants),
-                '--output-dir', output_dir
-            ]
-        else:
+        if model not in SUPPORTED_MODELS:
             return jsonify({'success': False, 'error': 'Invalid model selected'}), 400
 
-        # If script path missing, try alternative locations
-        if not os.path.exists(script_path):
-            alt_paths = [
-                os.path.join(os.getcwd(), os.path.basename(script_path)),
-                script_path,
-            ]
-            found = False
-            for alt_path in alt_paths:
-                if os.path.exists(alt_path):
-                    script_path = alt_path
-                    cmd[1] = script_path
-                    found = True
-                    break
-            if not found:
-                return jsonify({
-                    'success': False,
-                    'error': f'Script not found: {script_path}. Project root: {project_root}, Current dir: {os.getcwd()}'
-                }), 500
-
-        # --- SAFE SUBPROCESS RUN (no len(None), optional debug tails) ---
-        print(f"Running command: {' '.join(cmd)}")
-        print(f"Working directory: {project_root}")
-        print(f"Script path: {script_path}")
-        print(f"Script exists: {os.path.exists(script_path)}")
+        # --- RUN ON WARM MODEL WORKERS (no per-request interpreter/model start-up) ---
+        job = _build_job(params)
+        print(f"Submitting {model} job {request_id} to worker pool")
 
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                cwd=project_root,
-                timeout=1800,
-                check=False
-            )
-        except subprocess.TimeoutExpired:
+            result = get_worker_pool().submit(job).result(timeout=GENERATION_TIMEOUT)
+        except FutureTimeoutError:
+            # Still queued or running: free the worker for the next request
+            get_worker_pool().cancel(request_id)
             return jsonify({
                 'success': False,
                 'error': 'Generation timed out after 30 minutes'
             }), 500
         except Exception as e:
             import traceback
-            print("ERROR running subprocess:", e)
+            print("ERROR running model worker job:", e)
             print(traceback.format_exc())
             return jsonify({
                 'success': False,
-                'error': f'Failed to run script: {e}'
+                'error': f'Failed to run model: {e}'
             }), 500
 
-        stdout = result.stdout or ""
-        stderr = result.stderr or ""
+        stdout = result.get('stdout') or ""
+        stderr = result.get('stderr') or ""
 
-        print(f"Return code: {result.returncode}")
+        print(f"Job finished in {result.get('duration', 0.0):.1f}s (success={result['success']})")
         print(f"STDOUT preview ({len(stdout)} chars):\n{stdout[:2000]}")
         if len(stdout) > 2000:
             print(f"... (truncated, total {len(stdout)} chars)")
@@ -247,11 +365,11 @@ def generate_thumbnails():
         if len(stderr) > 2000:
             print(f"... (truncated, total {len(stderr)} chars)")
 
-        if result.returncode != 0:
-            msg = (stderr.strip() or stdout.strip() or f"Process exited with code {result.returncode}")[-4000:]
+        if not result['success']:
+            msg = (result.get('traceback', '').strip() or stderr.strip() or result.get('error', ''))[-4000:]
             payload = {
                 'success': False,
-                'error': f'Generation failed (code {result.returncode})',
+                'error': f"Generation failed: {result.get('error', 'unknown error')}",
                 'details': msg
             }
             if want_debug:
@@ -259,132 +377,12 @@ def generate_thumbnails():
                 payload['stderr'] = stderr[-4000:]
             return jsonify(payload), 500
 
-        print("✓ Script executed successfully")
-
-        # Find generated thumbnails - COMPREHENSIVE SEARCH
-        thumbnails = []
-        thumbnail_files = []
-
-        print(f"\n{'='*80}")
-        print(f"SEARCHING FOR THUMBNAILS")
-        print(f"{'='*80}")
-        print(f"Request ID: {request_id}")
-        print(f"Backend dir: {backend_dir}")
-        print(f"Project root: {project_root}")
-
-        # PRIMARY: outputs dir
-        backend_outputs = Path(backend_dir) / OUTPUT_FOLDER
-        print(f"\n1. Checking backend/outputs: {backend_outputs}")
-        if backend_outputs.exists():
-            for item in backend_outputs.iterdir():
-                if item.is_dir() and request_id in item.name:
-                    print(f"  ✓ Found output directory: {item.name}")
-                    for ext in ['*.jpg', '*.jpeg', '*.png', '*.webp']:
-                        found = list(item.glob(ext))
-                        thumbnail_files.extend(found)
-                        if found:
-                            print(f"    Found {len(found)} {ext} files")
-
-        # SECONDARY: explicit output_dir
-        if not thumbnail_files:
-            output_path = Path(output_dir)
-            print(f"\n2. Checking output_path: {output_path}")
-            if output_path.exists():
-                for ext in ['*.jpg', '*.jpeg', '*.png', '*.webp']:
-                    found = list(output_path.rglob(ext))
-                    thumbnail_files.extend(found)
-                    if found:
-                        print(f"    Found {len(found)} {ext} files")
-
-        # TERTIARY: Netflix-style: {video_stem}_final at project root
-        if not thumbnail_files:
-            video_stem = Path(video_path).stem
-            netflix_output = Path(project_root) / f"{video_stem}_final"
-            print(f"\n3. Checking Netflix-style output: {netflix_output}")
-            if netflix_output.exists():
-                print(f"  ✓ Found Netflix output directory")
-                for ext in ['*.jpg', '*.jpeg', '*.png', '*.webp']:
-                    found = list(netflix_output.glob(ext))
-                    thumbnail_files.extend(found)
-                    if found:
-                        print(f"    Found {len(found)} {ext} files")
-
-        # QUATERNARY: any directory containing request_id
-        if not thumbnail_files:
-            print(f"\n4. Searching project root for {request_id}...")
-            for item in Path(project_root).iterdir():
-                if item.is_dir() and request_id in item.name:
-                    print(f"  ✓ Found directory: {item.name}")
-                    for ext in ['*.jpg', '*.jpeg', '*.png', '*.webp']:
-                        found = list(item.rglob(ext))
-                        thumbnail_files.extend(found)
-                        if found:
-                            print(f"    Found {len(found)} {ext} files")
-
-        # Remove duplicates and sort
-        thumbnail_files = sorted(list(set(thumbnail_files)), key=lambda x: x.name)
-        print(f"\n✓ Total unique thumbnail files: {len(thumbnail_files)}")
-        if thumbnail_files:
-            print(f"Sample files: {[f.name for f in thumbnail_files[:3]]}")
-        print(f"{'='*80}\n")
-
-        # Build response (URLs via /api/thumbnail/<id>/<filename>)
-        print(f"\nCreating thumbnail data for {len(thumbnail_files)} files...")
-        for idx, thumb_file in enumerate(thumbnail_files[:variants]):
-            try:
-                thumb_name = thumb_file.name
-
-                # Try to read metadata but don't fail if missing
-                scene_type = 'unknown'
-                score = 0.0
-                metadata_file = thumb_file.parent / 'disney_metadata.json'
-                if not metadata_file.exists():
-                    metadata_file = thumb_file.parent / 'hybrid_metadata.json'
-                if not metadata_file.exists():
-                    metadata_file = thumb_file.parent / 'metadata.json'
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8', errors='ignore') as f:
-                            metadata = json.load(f)
-                            variants_list = metadata.get('variants', [])
-                            if idx < len(variants_list):
-                                variant = variants_list[idx]
-                                scene_type = variant.get('scene_type') or variant.get('type', 'unknown')
-                                score = float(variant.get('score', 0.0))
-                                if 'metadata' in variant:
-                                    scene_type = variant['metadata'].get('scene_type', scene_type)
-                    except Exception:
-                        pass
-
-                from urllib.parse import quote
-                encoded_filename = quote(thumb_name)
-                thumbnail_url = f'http://localhost:5000/api/thumbnail/{request_id}/{encoded_filename}'
-                download_url = f'http://localhost:5000/api/download/{request_id}/{encoded_filename}'
-                # Create static URL path relative to outputs directory if possible
-                try:
-                    outputs_abs = Path(backend_dir) / OUTPUT_FOLDER
-                    rel_path = Path(thumb_file).resolve().relative_to(outputs_abs.resolve())
-                    rel_url_path = quote(rel_path.as_posix())
-                    static_url = f"http://localhost:5000/outputs/{rel_url_path}"
-                except Exception:
-                    static_url = ''
-
-                thumbnails.append({
-                    'id': idx + 1,
-                    'url': thumbnail_url,
-                    'static_url': static_url,
-                    'download_url': download_url,
-                    'filename': thumb_name,
-                    'scene_type': scene_type,
-                    'score': float(score)
-                })
-
-                print(f"  ✓ {idx+1}. {thumb_name}")
-            except Exception as e:
-                print(f"  ✗ Error processing {idx+1}: {e}")
-                import traceback
-                print(traceback.format_exc())
-                continue
+        print("✓ Model job completed successfully")
+
+        thumbnails, thumbnail_files = _collect_thumbnails(
+            request_id, output_dir, variants, result['result'].get('manifest')
+        )
+        thumbnail_index.record(request_id, thumbnail_files)
 
         if not thumbnails:
             error_msg = f'No thumbnails found. Request ID: {request_id}. Files found: {len(thumbnail_files)}'
@@ -409,7 +407,9 @@ def generate_thumbnails():
                     'download_url': str(t.get('download_url', '')),
                     'filename': str(t['filename']),
                     'scene_type': str(t['scene_type']),
-                    'score': float(t['score'])
+                    'score': float(t['score']),
+                    'bytes': t.get('bytes'),
+                    'renditions': t.get('renditions', [])
                 }
                 for t in thumbnails
             ],
@@ -441,51 +441,303 @@ def generate_thumbnails():
             'error_type': type(e).__name__
         }), 500
 
+def _finish_async_job(params, future):
+    """Record the outcome of an /api/jobs generation in the job store"""
+    try:
+        _record_async_job(params, future)
+    finally:
+        with _async_futures_lock:
+            _async_futures.pop(params['request_id'], None)
+
+def _record_async_job(params, future):
+    request_id = params['request_id']
+    try:
+        result = future.result()
+    except Exception as e:
+        job_store.finish(request_id, 'failed', error=str(e))
+        return
+
+    if result.get('timed_out'):
+        job_store.finish(request_id, 'failed', error=result['error'])
+        return
+    if result.get('cancelled'):
+        job_store.finish(request_id, 'cancelled', error='Job cancelled')
+        return
+    if not result['success']:
+        job_store.finish(request_id, 'failed', error=result.get('error', 'unknown error'))
+        return
+
+    try:
+        thumbnails, thumbnail_files = _collect_thumbnails(
+            request_id, params['output_dir'], params['variants'], result['result'].get('manifest')
+        )
+        thumbnail_index.record(request_id, thumbnail_files)
+    except Exception as e:
+        job_store.finish(request_id, 'failed', error=f'Failed to collect thumbnails: {e}')
+        return
+
+    if not thumbnails:
+        job_store.finish(request_id, 'failed', error=f'No thumbnails found. Request ID: {request_id}')
+        return
+
+    job_store.finish(request_id, 'completed', result={
+        'thumbnails': thumbnails,
+        'request_id': request_id,
+        'timings': result['result'].get('timings'),
+        'message': f'Successfully generated {len(thumbnails)} thumbnails'
+    })
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable upload; send the bytes with PATCH /api/uploads/<id>"""
+    data = request.get_json(silent=True) or request.form
+    filename = data.get('filename', '')
+    try:
+        size = int(data.get('size', 0))
+    except (TypeError, ValueError):
+        size = 0
+
+    if not allowed_file(filename):
+        return jsonify({'success': False, 'error': 'Invalid file type. Please upload a video file.'}), 400
+    if size <= 0:
+        return jsonify({'success': False, 'error': 'Upload size (bytes) is required'}), 400
+
+    upload = upload_store.create(filename, size)
+    return jsonify({
+        'success': True,
+        **upload,
+        'upload_url': f"/api/uploads/{upload['upload_id']}"
+    }), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Bytes received so far; a resumed upload continues from 'offset'"""
+    try:
+        return jsonify({'success': True, **upload_store.status(upload_id)})
+    except UploadNotFound:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH', 'PUT'])
+def append_upload(upload_id):
+    """Append the raw request body at the Upload-Offset header, streaming it to disk"""
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', -1)))
+    except ValueError:
+        offset = -1
+    try:
+        upload = upload_store.append(upload_id, offset, request.stream)
+    except UploadNotFound:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': e.offset}), 409
+    return jsonify({'success': True, **upload})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Submit a generation job and return its id immediately"""
+    try:
+        params, error_response = _save_generation_upload()
+        if error_response is not None:
+            return error_response
+
+        if params['model'] not in SUPPORTED_MODELS:
+            return jsonify({'success': False, 'error': 'Invalid model selected'}), 400
+
+        request_id = params['request_id']
+        try:
+            job_store.create(request_id, params['model'], {
+                'title': params['title'],
+                'genre': params['genre'],
+                'variants': params['variants']
+            })
+        except JobStoreFull as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+
+        try:
+            with _async_futures_lock:
+                # Cancelled before it reached the pool: nothing to run
+                job = job_store.get(request_id)
+                if job is None or job.finished:
+                    return jsonify({'success': False, 'error': 'Job cancelled', 'job_id': request_id}), 409
+                future = get_worker_pool().submit(
+                    _build_job(params),
+                    on_progress=lambda stage, fraction: job_store.update_progress(request_id, stage, fraction)
+                )
+                _async_futures[request_id] = future
+        except Exception as e:
+            job_store.finish(request_id, 'failed', error=f'Failed to queue job: {e}')
+            raise
+        future.add_done_callback(lambda f: _finish_async_job(params, f))
+
+        print(f"Queued async {params['model']} job {request_id}")
+        return jsonify({
+            'success': True,
+            'job_id': request_id,
+            'status_url': f'/api/jobs/{request_id}',
+            'events_url': f'/api/jobs/{request_id}/events'
+        }), 202
+
+    except Exception as e:
+        import traceback
+        print(f"Error submitting job: {e}")
+        print(traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Current state and progress of a job (includes thumbnails once completed)"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job; decoding stops at the next sampled frame"""
+    job = job_store.mark_cancelling(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found or already finished'}), 404
+
+    with _async_futures_lock:
+        # Not handed to the pool (yet): finish it here. Otherwise _finish_async_job decides, since a job
+        # the pool has already let go of may still be collecting its thumbnails.
+        if job_id not in _async_futures:
+            job_store.finish(job_id, 'cancelled', error='Job cancelled')
+            return jsonify({'success': True, 'job_id': job_id, 'state': job.state}), 202
+    get_worker_pool().cancel(job_id)
+    return jsonify({'success': True, 'job_id': job_id, 'state': 'cancelling'}), 202
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events stream of per-stage progress"""
+    if job_store.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_seq = 0
+
+    def generate():
+        seq = last_seq
+        while True:
+            events, finished = job_store.wait_for_events(job_id, seq)
+            for event in events:
+                seq = event['seq']
+                yield f"id: {seq}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                job = job_store.get(job_id)
+                final = job.to_dict() if job is not None else {'job_id': job_id, 'state': 'expired'}
+                yield f"event: done\ndata: {json.dumps(final)}\n\n"
+                return
+            if not events:
+                # Keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _find_thumbnail(request_id, filename):
+    """Resolve a served file (path, size, mtime, content hash) through the thumbnail index.
+
+    Jobs are indexed when they finish; output from before the index existed
+    is picked up from backend/outputs/{request_id}_* on first request, or in
+    bulk with `python backend/thumbnail_index.py rebuild`.
+    """
+    indexed = thumbnail_index.lookup_file(request_id, filename)
+    if indexed is None and len(request_id) == 8 and request_id.isalnum():
+        outputs_dir = Path(os.path.dirname(os.path.abspath(__file__))) / OUTPUT_FOLDER
+        for output_dir in outputs_dir.glob(f"{request_id}_*"):
+            if output_dir.is_dir():
+                thumbnail_index.record_directory(request_id, str(output_dir))
+        indexed = thumbnail_index.lookup_file(request_id, filename)
+    return indexed
+
+def _is_versioned(indexed):
+    """Whether the request URL pins this file's content (?v=<hash prefix>)"""
+    version = request.args.get('v', '')
+    return indexed is not None and len(version) >= 8 and indexed.etag.startswith(version)
+
+def _accel_redirect_uri(path):
+    """Internal nginx URI for a file under THUMBNAIL_ACCEL_ROOT, or None"""
+    if not ACCEL_REDIRECT_PREFIX:
+        return None
+    relative = os.path.relpath(path, ACCEL_REDIRECT_ROOT)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    from urllib.parse import quote
+    return ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(relative.replace(os.sep, '/'))
+
+def _send_indexed(indexed, mimetype, immutable=False, as_attachment=False, download_name=None):
+    """Send an indexed file with its content hash as a strong ETag.
+
+    send_file answers If-None-Match / If-Modified-Since with 304 and Range
+    requests with 206. With THUMBNAIL_ACCEL_REDIRECT set the validators are
+    checked here and nginx sends the body (ranges included).
+    """
+    max_age = IMMUTABLE_MAX_AGE if immutable else THUMBNAIL_MAX_AGE
+    accel_uri = _accel_redirect_uri(indexed.path)
+    if accel_uri:
+        response = Response(mimetype=mimetype)
+        response.set_etag(indexed.etag)
+        response.last_modified = indexed.mtime
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        response = response.make_conditional(request)
+        if response.status_code == 200:
+            response.headers['X-Accel-Redirect'] = accel_uri
+    else:
+        response = send_file(
+            indexed.path,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            etag=indexed.etag,
+            last_modified=indexed.mtime,
+            max_age=max_age,
+            conditional=True
+        )
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
 @app.route('/api/thumbnail/<request_id>/<path:filename>', methods=['GET'])
 def get_thumbnail(request_id, filename):
-    """Serve generated thumbnail images with proper headers"""
+    """Serve generated thumbnail images with proper headers.
+
+    `?w=<px>` serves the narrowest rendition at least that wide, as WebP when
+    `?format=webp` is given or the Accept header allows it, otherwise JPEG.
+    Responses carry a strong ETag (304 on If-None-Match) and honour Range;
+    `?v=<content hash>` URLs are cached as immutable.
+    """
     try:
         from urllib.parse import unquote
-        import glob
-        from pathlib import Path as PathLib
 
         filename = unquote(filename)
-
-        search_locations = []
-
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        outputs_dir = os.path.join(backend_dir, OUTPUT_FOLDER)
-        output_dir_pattern = os.path.join(outputs_dir, f"{request_id}_*")
-        matching_dirs = glob.glob(output_dir_pattern)
-        search_locations.extend(matching_dirs)
-
-        project_root = os.path.dirname(backend_dir)
-        project_pattern = os.path.join(project_root, f"*{request_id}*")
-        project_dirs = glob.glob(project_pattern)
-        for pd in project_dirs:
-            if os.path.isdir(pd):
-                search_locations.append(pd)
-
-        if os.path.exists(project_root):
-            for item in os.listdir(project_root):
-                item_path = os.path.join(project_root, item)
-                if os.path.isdir(item_path) and request_id in item:
-                    search_locations.append(item_path)
-
-        thumbnail_path = None
-        for search_dir in search_locations:
-            direct_path = os.path.join(search_dir, filename)
-            if os.path.exists(direct_path):
-                thumbnail_path = direct_path
-                break
-            for root, dirs, files in os.walk(search_dir):
-                if filename in files:
-                    thumbnail_path = os.path.join(root, filename)
-                    break
-            if thumbnail_path:
-                break
-
-        if not thumbnail_path or not os.path.exists(thumbnail_path):
+        width = request.args.get('w', type=int)
+        negotiated = False
+        if width is not None:
+            requested_format = request.args.get('format')
+            if requested_format in FORMATS:
+                formats = [requested_format]
+            else:
+                negotiated = True
+                formats = ['webp', 'jpeg'] if 'image/webp' in request.headers.get('Accept', '') else ['jpeg']
+        indexed = _find_thumbnail(request_id, filename)
+        # Renditions are derived from the original, so its hash pins them too
+        immutable = _is_versioned(indexed)
+
+        if indexed and width is not None:
+            # The lookup above also indexes legacy output, renditions included
+            rendition = choose_rendition(filename, thumbnail_index.filenames(request_id), width, formats)
+            if rendition != filename:
+                filename, indexed = rendition, _find_thumbnail(request_id, rendition)
+
+        if indexed is None:
             return jsonify({
                 'error': f'Thumbnail file not found: {filename}',
                 'request_id': request_id
@@ -499,8 +751,9 @@ def get_thumbnail(request_id, filename):
         elif filename.lower().endswith('.webp'):
             mime_type = 'image/webp'
 
-        response = send_file(thumbnail_path, mimetype=mime_type)
-        response.headers['Cache-Control'] = 'public, max-age=3600'
+        response = _send_indexed(indexed, mime_type, immutable=immutable)
+        if negotiated:
+            response.headers['Vary'] = 'Accept'
         response.headers['Access-Control-Allow-Origin'] = '*'
         return response
 
@@ -517,51 +770,17 @@ def download_thumbnail(request_id, filename):
     """Download thumbnail file"""
     try:
         from urllib.parse import unquote
-        import glob
         from pathlib import Path as PathLib
 
         filename = unquote(filename)
+        indexed = _find_thumbnail(request_id, filename)
 
-        # Search locations mirror get_thumbnail logic
-        search_locations = []
-
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        outputs_dir = os.path.join(backend_dir, OUTPUT_FOLDER)
-        output_dir_pattern = os.path.join(outputs_dir, f"{request_id}_*")
-        matching_dirs = glob.glob(output_dir_pattern)
-        search_locations.extend(matching_dirs)
-
-        project_root = os.path.dirname(backend_dir)
-        project_pattern = os.path.join(project_root, f"*{request_id}*")
-        project_dirs = glob.glob(project_pattern)
-        for pd in project_dirs:
-            if os.path.isdir(pd):
-                search_locations.append(pd)
-
-        if os.path.exists(project_root):
-            for item in os.listdir(project_root):
-                item_path = os.path.join(project_root, item)
-                if os.path.isdir(item_path) and request_id in item:
-                    search_locations.append(item_path)
-
-        thumbnail_path = None
-        for search_dir in search_locations:
-            direct_path = os.path.join(search_dir, filename)
-            if os.path.exists(direct_path):
-                thumbnail_path = direct_path
-                break
-            for root, dirs, files in os.walk(search_dir):
-                if filename in files:
-                    thumbnail_path = os.path.join(root, filename)
-                    break
-            if thumbnail_path:
-                break
-
-        if not thumbnail_path or not os.path.exists(thumbnail_path):
+        if indexed is None:
             return jsonify({'error': 'Thumbnail file not found'}), 404
 
-        download_name = PathLib(thumbnail_path).name
-        resp = send_file(thumbnail_path, as_attachment=True, download_name=download_name)
+        download_name = PathLib(indexed.path).name
+        mime_type = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+        resp = _send_indexed(indexed, mime_type, as_attachment=True, download_name=download_name)
         resp.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
         resp.headers['Access-Control-Allow-Origin'] = '*'
         return resp
@@ -571,11 +790,11 @@ def download_thumbnail(request_id, filename):
 
 @app.route('/outputs/<path:filename>', methods=['GET'])
 def serve_outputs(filename):
-    """Serve files directly from the outputs directory (static access)."""
+    """Serve files directly from the outputs directory (static access, with ETag/Range from send_file)."""
     try:
         backend_dir = os.path.dirname(os.path.abspath(__file__))
         outputs_dir = os.path.join(backend_dir, OUTPUT_FOLDER)
-        return send_from_directory(outputs_dir, filename)
+        return send_from_directory(outputs_dir, filename, max_age=THUMBNAIL_MAX_AGE)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -593,10 +812,24 @@ if __name__ == '__main__':
     print("API Endpoints:")
     print("  - GET  /api/health - Health check")
     print("  - POST /api/generate - Generate thumbnails")
+    print("  - POST /api/uploads - Start a resumable chunked upload")
+    print("  - PATCH /api/uploads/<id> - Append a chunk at Upload-Offset")
+    print("  - POST /api/jobs - Submit an asynchronous generation job")
+    print("  - GET  /api/jobs/<id> - Job state and progress")
+    print("  - GET  /api/jobs/<id>/events - Job progress stream (SSE)")
     print("  - GET  /api/thumbnail/<id>/<filename> - Get thumbnail image")
     print("="*80)
     print("DEBUG MODE: ON - All errors will be logged")
     print("="*80)
 
     app.logger.setLevel(logging.DEBUG)
+
+    # Load models before the first request arrives
+    pool = get_worker_pool()
+    print(f"Model worker pool: {pool.num_workers} worker(s) warming up")
+
+    # First start with an existing outputs tree: index it without blocking requests
+    if thumbnail_index.stats()['files'] == 0:
+        thumbnail_index.rebuild_in_background()
+
     app.run(debug=True, host='0.0.0.0', port=port, use_reloader=False)
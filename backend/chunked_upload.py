@@ -0,0 +1,109 @@
+"""
+Chunked Upload Store
+Resumable uploads streamed straight to disk, readable by the pipelines before they finish
+"""
+
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict
+
+from werkzeug.utils import secure_filename
+
+from growing_file import is_partial, mark_complete, mark_partial, partial_info, PARTIAL_SUFFIX
+
+CHUNK_SIZE = 1024 * 1024
+# Full 128-bit ids: unguessable, and never the 8-digit request ids of multipart uploads
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadNotFound(Exception):
+    """Raised for an unknown upload id"""
+
+
+class UploadOffsetMismatch(Exception):
+    """Raised when a chunk does not start where the upload currently ends"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadStore:
+    """Uploads live as {upload_id}_{filename} in upload_dir; a .partial marker holds the declared size.
+
+    upload_dir must hold nothing but these uploads: ids are only resolved there.
+    """
+
+    def __init__(self, upload_dir: str):
+        self.upload_dir = upload_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def create(self, filename: str, size: int) -> Dict[str, Any]:
+        """Start an upload of `size` bytes and return its status"""
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_dir, f"{upload_id}_{secure_filename(filename)}")
+        open(path, 'wb').close()
+        if size > 0:
+            mark_partial(path, upload_id=upload_id, size=size)
+        return self.status(upload_id)
+
+    def path(self, upload_id: str) -> str:
+        """File the upload is written to (it may still be growing)"""
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise UploadNotFound(upload_id)
+        for entry in Path(self.upload_dir).glob(f"{upload_id}_*"):
+            if not entry.name.endswith(PARTIAL_SUFFIX):
+                return str(entry)
+        raise UploadNotFound(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        path = self.path(upload_id)
+        offset = os.path.getsize(path)
+        info = partial_info(path)
+        return {
+            'upload_id': upload_id,
+            'filename': os.path.basename(path)[len(upload_id) + 1:],
+            'offset': offset,
+            'size': info.get('size') if info is not None else offset,
+            'complete': info is None
+        }
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO) -> Dict[str, Any]:
+        """Write one chunk from `stream` at `offset`, which must equal the bytes received so far"""
+        path = self.path(upload_id)
+        with self._lock(upload_id):
+            if not is_partial(path):
+                raise UploadOffsetMismatch(os.path.getsize(path))
+
+            current = os.path.getsize(path)
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+
+            size = int(partial_info(path).get('size') or 0)
+            with open(path, 'ab') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if size and current + len(chunk) > size:
+                        chunk = chunk[:size - current]
+                    f.write(chunk)
+                    # Readers following the upload see each block as soon as it lands
+                    f.flush()
+                    current += len(chunk)
+                    if size and current >= size:
+                        break
+
+            if size and current >= size:
+                mark_complete(path)
+
+        return self.status(upload_id)
+
+    def _lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
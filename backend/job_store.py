@@ -0,0 +1,180 @@
+"""
+Job Store for Asynchronous Generation
+Bounded in-memory job registry with TTL eviction and per-job progress events
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+
+class JobStoreFull(Exception):
+    """Raised when every slot is held by a queued or running job"""
+
+
+@dataclass
+class Job:
+    """A single generation job and its progress history"""
+    job_id: str
+    model: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    state: str = 'queued'  # queued, running, completed, failed, cancelled
+    stage: str = 'Queued'
+    progress: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    events: deque = field(default_factory=lambda: deque(maxlen=500))
+    next_seq: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """Public JSON view of the job"""
+        data = {
+            'job_id': self.job_id,
+            'model': self.model,
+            'state': self.state,
+            'stage': self.stage,
+            'progress': round(self.progress, 4),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobStore:
+    """Thread-safe bounded job store; finished jobs expire after a TTL"""
+
+    def __init__(self, max_jobs: int = 100, ttl_seconds: float = 3600.0):
+        self.max_jobs = max(1, max_jobs)
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._cond = threading.Condition()
+
+    def create(self, job_id: str, model: str, params: Dict[str, Any]) -> Job:
+        """Register a new queued job, evicting expired or oldest finished jobs if needed"""
+        with self._cond:
+            self._evict_expired()
+            if len(self._jobs) >= self.max_jobs:
+                finished = sorted(
+                    (j for j in self._jobs.values() if j.finished),
+                    key=lambda j: j.finished_at or j.created_at
+                )
+                if not finished:
+                    raise JobStoreFull(f"Job store is full ({self.max_jobs} active jobs)")
+                del self._jobs[finished[0].job_id]
+
+            job = Job(job_id=job_id, model=model, params=params)
+            self._jobs[job_id] = job
+            self._append_event(job)
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def update_progress(self, job_id: str, stage: str, fraction: float):
+        """Record a stage/progress update from the pipeline"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            if job.state == 'queued':
+                job.state = 'running'
+                job.started_at = time.time()
+            job.stage = stage
+            job.progress = max(job.progress, fraction)
+            self._append_event(job)
+
+    def finish(
+        self,
+        job_id: str,
+        state: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ):
+        """Move a job to a terminal state"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job.state = state
+            job.stage = {'completed': 'Complete', 'failed': 'Failed', 'cancelled': 'Cancelled'}[state]
+            if state == 'completed':
+                job.progress = 1.0
+            job.finished_at = time.time()
+            job.result = result
+            job.error = error
+            self._append_event(job)
+
+    def mark_cancelling(self, job_id: str) -> Optional[Job]:
+        """Flag a job as being cancelled; returns None if it is unknown or already finished"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return None
+            job.stage = 'Cancelling'
+            self._append_event(job)
+            return job
+
+    def wait_for_events(
+        self,
+        job_id: str,
+        after_seq: int,
+        timeout: float = 15.0
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Block until events newer than after_seq exist; returns (events, finished)"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return [], True
+                events = [e for e in job.events if e['seq'] > after_seq]
+                remaining = deadline - time.time()
+                if events or job.finished or remaining <= 0:
+                    return events, job.finished
+                self._cond.wait(remaining)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            counts = {'total': len(self._jobs)}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return counts
+
+    def _append_event(self, job: Job):
+        """Append a progress event and wake stream readers (caller holds the lock)"""
+        job.next_seq += 1
+        job.events.append({
+            'seq': job.next_seq,
+            'state': job.state,
+            'stage': job.stage,
+            'progress': round(job.progress, 4),
+            'time': time.time()
+        })
+        self._cond.notify_all()
+
+    def _evict_expired(self):
+        """Drop finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and (job.finished_at or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,220 @@
+"""
+Thumbnail File Index
+Persistent request_id/filename -> path index so serving routes never scan output trees
+
+Usage: python backend/thumbnail_index.py rebuild [--db PATH] [ROOT ...]
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.normpath(os.path.dirname(BACKEND_DIR))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+# Output directories start with the 8-character request id: {request_id}_{video_stem}[...]
+REQUEST_DIR_PATTERN = re.compile(r'^([0-9a-f]{8})_')
+
+
+class IndexedFile(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    etag: str  # content hash: a strong ETag and the `v` of immutable thumbnail URLs
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file's bytes, shortened to 32 hex digits"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def default_roots() -> List[str]:
+    """Trees that hold job output: backend/outputs and (legacy CLI runs) the project root"""
+    return [os.path.join(BACKEND_DIR, 'outputs'), PROJECT_ROOT]
+
+
+class ThumbnailIndex:
+    """SQLite-backed index of generated thumbnail files, safe to share between threads"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                request_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                indexed_at REAL NOT NULL,
+                etag TEXT,
+                PRIMARY KEY (request_id, filename)
+            )
+        ''')
+        # Indexes created before content hashes were recorded
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(thumbnails)')]
+        if 'etag' not in columns:
+            self._conn.execute('ALTER TABLE thumbnails ADD COLUMN etag TEXT')
+
+    def record(self, request_id: str, paths: Iterable) -> int:
+        """Index a finished job's files; returns how many were recorded"""
+        rows = []
+        now = time.time()
+        for path in paths:
+            path = os.path.abspath(str(path))
+            try:
+                stat = os.stat(path)
+                etag = content_hash(path)
+            except OSError:
+                continue
+            rows.append((request_id, os.path.basename(path), path, stat.st_size, stat.st_mtime, now, etag))
+
+        if rows:
+            with self._lock:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO thumbnails '
+                    '(request_id, filename, path, size, mtime, indexed_at, etag) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+        return len(rows)
+
+    def record_directory(self, request_id: str, directory: str) -> int:
+        """Index every image below an output directory"""
+        return self.record(request_id, (
+            p for p in Path(directory).rglob('*')
+            if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file()
+        ))
+
+    def lookup(self, request_id: str, filename: str) -> Optional[str]:
+        """Path of an indexed file, or None (stale entries are dropped)"""
+        indexed = self.lookup_file(request_id, filename)
+        return indexed.path if indexed is not None else None
+
+    def lookup_file(self, request_id: str, filename: str) -> Optional[IndexedFile]:
+        """Path, size, mtime and content hash of an indexed file, or None (stale entries are dropped).
+
+        A file changed on disk since it was indexed (or indexed before hashes
+        were recorded) is re-hashed, so the ETag always matches the bytes.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path, size, mtime, etag FROM thumbnails WHERE request_id = ? AND filename = ?',
+                (request_id, filename)
+            ).fetchone()
+        if row is None:
+            return None
+        path, size, mtime, etag = row
+        if not os.path.isfile(path):
+            self.forget(request_id, filename)
+            return None
+
+        stat = os.stat(path)
+        if etag is None or stat.st_size != size or stat.st_mtime != mtime:
+            size, mtime, etag = stat.st_size, stat.st_mtime, content_hash(path)
+            with self._lock:
+                self._conn.execute(
+                    'UPDATE thumbnails SET size = ?, mtime = ?, etag = ? WHERE request_id = ? AND filename = ?',
+                    (size, mtime, etag, request_id, filename)
+                )
+        return IndexedFile(path, size, mtime, etag)
+
+    def filenames(self, request_id: str) -> List[str]:
+        """Every indexed file name of a request (thumbnails and their renditions)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT filename FROM thumbnails WHERE request_id = ?', (request_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, request_id: str, filename: Optional[str] = None):
+        """Remove one file, or every file of a request, from the index"""
+        with self._lock:
+            if filename is None:
+                self._conn.execute('DELETE FROM thumbnails WHERE request_id = ?', (request_id,))
+            else:
+                self._conn.execute(
+                    'DELETE FROM thumbnails WHERE request_id = ? AND filename = ?', (request_id, filename)
+                )
+
+    def rebuild(self, roots: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Index existing output trees (directories named {request_id}_...) under the given roots"""
+        requests = 0
+        files = 0
+        for root in roots or default_roots():
+            if not os.path.isdir(root):
+                continue
+            for entry in os.scandir(root):
+                match = REQUEST_DIR_PATTERN.match(entry.name)
+                if not match or not entry.is_dir():
+                    continue
+                indexed = self.record_directory(match.group(1), entry.path)
+                if indexed:
+                    requests += 1
+                    files += indexed
+        return {'requests': requests, 'files': files}
+
+    def rebuild_in_background(self, roots: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Run rebuild() on a daemon thread; serving keeps working meanwhile"""
+        def _run():
+            start = time.time()
+            result = self.rebuild(roots)
+            print(f"✓ Thumbnail index rebuilt: {result['files']} files from {result['requests']} jobs "
+                  f"in {time.time() - start:.1f}s")
+
+        thread = threading.Thread(target=_run, name='thumbnail-index-rebuild', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            files, requests = self._conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT request_id) FROM thumbnails'
+            ).fetchone()
+        return {'files': files, 'requests': requests}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_db_path() -> str:
+    return os.environ.get('THUMBNAIL_INDEX_DB', os.path.join(BACKEND_DIR, 'thumbnail_index.sqlite3'))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the thumbnail file index")
+    parser.add_argument("command", choices=["rebuild", "stats"])
+    parser.add_argument("roots", nargs="*", help="Output trees to scan (default: backend/outputs and project root)")
+    parser.add_argument("--db", default=default_db_path(), help="Index database path")
+    args = parser.parse_args()
+
+    index = ThumbnailIndex(args.db)
+    if args.command == "rebuild":
+        start = time.time()
+        result = index.rebuild(args.roots or None)
+        print(f"✓ Indexed {result['files']} files from {result['requests']} jobs in {time.time() - start:.1f}s")
+    stats = index.stats()
+    print(f"Index {args.db}: {stats['files']} files, {stats['requests']} jobs")
+    index.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
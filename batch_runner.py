@@ -0,0 +1,282 @@
+"""
+Batch Thumbnail Runner
+Processes a directory, glob or list of videos on a pool of warm model workers
+
+Usage: python batch_runner.py <dir|glob|list.txt|list.json> [...] --output-root backfill/ --model hybrid
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from result_manifest import read_manifest, manifest_paths
+from worker_pool import ModelWorkerPool, SUPPORTED_MODELS
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+FAILURE_LOG = 'batch_failures.jsonl'
+REPORT_FILE = 'batch_report.json'
+
+# Seconds one video may run before it is cancelled and logged as failed
+DEFAULT_JOB_TIMEOUT = 3600.0
+
+
+def _read_video_list(list_path: Path) -> List[str]:
+    """Paths from a .txt (one per line) or .json (list or {"videos": [...]}) file, relative to the file"""
+    if list_path.suffix.lower() == '.json':
+        with open(list_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.get('videos', []) if isinstance(data, dict) else data
+    else:
+        with open(list_path, 'r', encoding='utf-8') as f:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [str(list_path.parent / entry) for entry in entries]
+
+
+def discover_videos(inputs: List[str], recursive: bool = False) -> List[str]:
+    """Expand directories, glob patterns and video lists into unique absolute video paths"""
+    found = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pattern = '**/*' if recursive else '*'
+            found.extend(str(p) for p in path.glob(pattern) if p.suffix.lower() in VIDEO_EXTENSIONS)
+        elif path.is_file() and path.suffix.lower() in ('.txt', '.json'):
+            found.extend(_read_video_list(path))
+        elif glob.has_magic(item):
+            found.extend(glob.glob(item, recursive=recursive))
+        else:
+            found.append(item)
+
+    videos = []
+    seen = set()
+    for video in found:
+        video = os.path.abspath(video)
+        if video not in seen:
+            seen.add(video)
+            videos.append(video)
+    return videos
+
+
+def output_dirs(videos: List[str], output_root: str) -> Dict[str, str]:
+    """One output directory per video; clashing file names get a path hash suffix"""
+    stems: Dict[str, int] = {}
+    for video in videos:
+        stems[Path(video).stem] = stems.get(Path(video).stem, 0) + 1
+
+    dirs = {}
+    for video in videos:
+        name = Path(video).stem
+        if stems[name] > 1:
+            name = f"{name}_{hashlib.sha1(video.encode('utf-8')).hexdigest()[:8]}"
+        dirs[video] = os.path.join(os.path.abspath(output_root), name)
+    return dirs
+
+
+def is_complete(output_dir: str, model: str) -> bool:
+    """A finished run leaves a manifest whose thumbnails all exist"""
+    manifest = read_manifest(output_dir)
+    if manifest is None or manifest.get('model') != model or not manifest['thumbnails']:
+        return False
+    return all(os.path.isfile(path) for path in manifest_paths(manifest))
+
+
+class BatchRunner:
+    """Schedules videos largest-first across a ModelWorkerPool and records the outcome"""
+
+    def __init__(
+        self,
+        output_root: str,
+        model: str = 'hybrid',
+        num_workers: Optional[int] = None,
+        genre: str = 'drama',
+        num_variants: int = 20,
+        characters: Optional[List[str]] = None,
+        force: bool = False,
+        job_timeout: Optional[float] = DEFAULT_JOB_TIMEOUT
+    ):
+        if model not in SUPPORTED_MODELS:
+            raise ValueError(f"Unknown model: {model}")
+
+        self.output_root = os.path.abspath(output_root)
+        self.model = model
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.genre = genre
+        self.num_variants = num_variants
+        self.characters = characters or []
+        self.force = force
+        self.job_timeout = job_timeout
+        os.makedirs(self.output_root, exist_ok=True)
+
+    def run(self, videos: List[str]) -> Dict[str, Any]:
+        """Process every video not already completed; returns the throughput report"""
+        dirs = output_dirs(videos, self.output_root)
+
+        pending = []
+        skipped = 0
+        missing = []
+        for video in videos:
+            if not os.path.isfile(video):
+                missing.append(video)
+            elif not self.force and is_complete(dirs[video], self.model):
+                skipped += 1
+            else:
+                pending.append(video)
+
+        for video in missing:
+            self._log_failure(video, 'Video file not found')
+
+        # Longest jobs first, so no large file starts last and leaves the other workers idle
+        pending.sort(key=os.path.getsize, reverse=True)
+
+        print(f"\n📼 {len(videos)} videos: {len(pending)} to process, {skipped} already complete, "
+              f"{len(missing)} missing")
+
+        results = []
+        start = time.time()
+        if pending:
+            results = self._process(pending, dirs)
+        wall = time.time() - start
+
+        report = self._report(results, skipped, len(missing), wall)
+        with open(os.path.join(self.output_root, REPORT_FILE), 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def _process(self, videos: List[str], dirs: Dict[str, str]) -> List[Dict[str, Any]]:
+        workers = min(self.num_workers, len(videos))
+        # Split the cores between workers instead of every torch instance claiming all of them
+        os.environ.setdefault('OMP_NUM_THREADS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+        pool = ModelWorkerPool(workers).start()
+        print(f"✓ Worker pool: {workers} warm worker(s)")
+
+        futures = {}
+        for i, video in enumerate(videos):
+            job = {
+                'job_id': f"batch-{i}",
+                'model': self.model,
+                'video_path': video,
+                'title': Path(video).stem,
+                'genre': self.genre,
+                'characters': self.characters,
+                'variants': self.num_variants,
+                'output_dir': dirs[video],
+                'timeout': self.job_timeout
+            }
+            futures[pool.submit(job)] = video
+
+        results = []
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                video = futures[future]
+                outcome = {'video': video, 'bytes': os.path.getsize(video), 'success': False}
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    payload = {'success': False, 'error': str(e), 'traceback': traceback.format_exc()}
+
+                outcome['duration'] = payload.get('duration', 0.0)
+                if payload['success'] and not payload['result']['thumbnails']:
+                    payload = dict(payload, success=False, error='No thumbnails produced')
+                if payload['success']:
+                    outcome['success'] = True
+                    outcome['thumbnails'] = len(payload['result']['thumbnails'])
+                    outcome['timings'] = payload['result'].get('timings')
+                    print(f"[{done}/{len(videos)}] ✓ {Path(video).name} - "
+                          f"{outcome['thumbnails']} thumbnails in {outcome['duration']:.1f}s")
+                else:
+                    self._log_failure(video, payload.get('error', 'unknown error'), payload.get('traceback'))
+                    print(f"[{done}/{len(videos)}] ✗ {Path(video).name} - {payload.get('error', 'unknown error')}")
+                results.append(outcome)
+        finally:
+            pool.shutdown()
+
+        return results
+
+    def _log_failure(self, video: str, error: str, trace: Optional[str] = None):
+        """Append one line per failed video to batch_failures.jsonl"""
+        entry = {'video': video, 'model': self.model, 'error': error, 'time': datetime.now().isoformat()}
+        if trace:
+            entry['traceback'] = trace
+        with open(os.path.join(self.output_root, FAILURE_LOG), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def _report(self, results: List[Dict[str, Any]], skipped: int, missing: int, wall: float) -> Dict[str, Any]:
+        succeeded = [r for r in results if r['success']]
+        processed_bytes = sum(r['bytes'] for r in succeeded)
+        busy = sum(r['duration'] for r in results)
+        frames = sum((r.get('timings') or {}).get('frames', 0) for r in succeeded)
+        workers = min(self.num_workers, len(results))
+
+        return {
+            'model': self.model,
+            'workers': workers,
+            'completed': len(succeeded),
+            'failed': len(results) - len(succeeded) + missing,
+            'skipped': skipped,
+            'wall_seconds': round(wall, 2),
+            'videos_per_hour': round(len(succeeded) / wall * 3600, 2) if wall > 0 else 0.0,
+            'input_mb_per_second': round(processed_bytes / (1024 * 1024) / wall, 2) if wall > 0 else 0.0,
+            'analyzed_frames_per_second': round(frames / wall, 2) if wall > 0 else 0.0,
+            # Fraction of worker time spent on jobs; low values point at stragglers
+            'worker_utilization': round(busy / (wall * workers), 3) if wall > 0 and workers else 0.0,
+            'videos': results
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch thumbnail generation over many videos")
+    parser.add_argument("inputs", nargs="+", help="Video files, directories, glob patterns or .txt/.json video lists")
+    parser.add_argument("--output-root", default="batch_output", help="One output directory per video goes here")
+    parser.add_argument("--model", default="hybrid", choices=SUPPORTED_MODELS)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--genre", default="drama")
+    parser.add_argument("--variants", type=int, default=20)
+    parser.add_argument("--characters", nargs="*", default=[])
+    parser.add_argument("--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("--force", action="store_true", help="Reprocess videos that already have a manifest")
+    parser.add_argument("--job-timeout", type=float, default=DEFAULT_JOB_TIMEOUT,
+                        help="Seconds per video before it is cancelled and logged as failed (0: no limit)")
+    args = parser.parse_args()
+
+    videos = discover_videos(args.inputs, args.recursive)
+    if not videos:
+        print("✗ No videos found")
+        return 1
+
+    runner = BatchRunner(
+        args.output_root,
+        model=args.model,
+        num_workers=args.workers,
+        genre=args.genre,
+        num_variants=args.variants,
+        characters=args.characters,
+        force=args.force,
+        job_timeout=args.job_timeout or None
+    )
+    report = runner.run(videos)
+
+    print("\n" + "="*80)
+    print("BATCH COMPLETE")
+    print("="*80)
+    print(f"✓ Completed: {report['completed']}  ✗ Failed: {report['failed']}  ↷ Skipped: {report['skipped']}")
+    print(f"⏱  {report['wall_seconds']:.1f}s wall, {report['videos_per_hour']:.1f} videos/hour, "
+          f"{report['input_mb_per_second']:.1f} MB/s, {report['analyzed_frames_per_second']:.1f} analyzed frames/s")
+    print(f"Worker utilization: {report['worker_utilization']:.0%}")
+    if report['failed']:
+        print(f"⚠ Failures logged to {os.path.join(runner.output_root, FAILURE_LOG)}")
+    print(f"Report: {os.path.join(runner.output_root, REPORT_FILE)}")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
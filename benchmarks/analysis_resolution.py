@@ -0,0 +1,99 @@
+"""
+Analysis Resolution Benchmark
+Compares per-frame analysis cost and scores at native resolution vs. downscaled proxies
+
+Usage: python benchmarks/analysis_resolution.py <video> [--widths 320 640 960] [--frames 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from disney_complete_system import DisneyCompleteThumbnailSystem
+from frame_sampling import FrameSampler
+from run_netflix_system import NetflixSimplifiedSystem
+
+
+def score_frames(netflix, disney, metadata, frames, width=None) -> Dict[str, List[float]]:
+    """Analyze each frame (optionally as a proxy of the given width) and time it"""
+    results = {'netflix': [], 'disney': [], 'seconds': []}
+    generator = disney.thumbnail_generator
+    analyzer = generator.scene_analyzer
+
+    for timestamp, frame in frames:
+        start = time.perf_counter()
+        if width and frame.shape[1] > width:
+            scale = width / frame.shape[1]
+            frame = cv2.resize(frame, (width, round(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+
+        detections = netflix.detect(frame)
+        netflix_analysis = netflix.analyze_frame(frame, timestamp, 0, detections)
+        scene = analyzer.analyze_scene(frame, timestamp, detections)
+        results['seconds'].append(time.perf_counter() - start)
+
+        results['netflix'].append(netflix_analysis['overall_score'])
+        results['disney'].append(generator._disney_score(scene, metadata))
+    return results
+
+
+def top_k_overlap(reference: List[float], other: List[float], k: int) -> float:
+    """Fraction of the reference top-k frames that are also in the other top-k"""
+    k = min(k, len(reference))
+    if k == 0:
+        return 1.0
+    top_ref = set(np.argsort(reference)[::-1][:k])
+    top_other = set(np.argsort(other)[::-1][:k])
+    return len(top_ref & top_other) / k
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downscaled analysis resolution")
+    parser.add_argument("video", help="Input video file")
+    parser.add_argument("--widths", type=int, nargs="+", default=[320, 640, 960])
+    parser.add_argument("--frames", type=int, default=60, help="Number of frames to sample")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    sampler = FrameSampler(args.video, 'grab')
+    if not sampler.is_opened():
+        print(f"✗ Cannot open {args.video}")
+        sys.exit(1)
+
+    interval = max(1, sampler.total_frames // args.frames)
+    frames = [(ts, frame) for _, ts, frame in sampler.sample([interval])][:args.frames]
+
+    netflix = NetflixSimplifiedSystem(genre='action', title='Benchmark')
+    disney = DisneyCompleteThumbnailSystem()
+    metadata = disney.build_metadata(args.video, 'Benchmark', ['action'], [])
+
+    print("=" * 80)
+    print(f"ANALYSIS RESOLUTION BENCHMARK: {sampler.width}x{sampler.height}, {len(frames)} frames")
+    print("=" * 80)
+
+    native = score_frames(netflix, disney, metadata, frames)
+    native_ms = 1000 * np.mean(native['seconds'])
+    print(f"{'width':>8} {'ms/frame':>10} {'speedup':>8} "
+          f"{'netflix |Δ|':>12} {'disney |Δ|':>11} {'netflix top-k':>14} {'disney top-k':>13}")
+    print(f"{'native':>8} {native_ms:>10.1f} {1.0:>7.1f}x {0.0:>12.3f} {0.0:>11.3f} {1.0:>14.0%} {1.0:>13.0%}")
+
+    for width in sorted(args.widths, reverse=True):
+        proxy = score_frames(netflix, disney, metadata, frames, width)
+        ms = 1000 * np.mean(proxy['seconds'])
+        netflix_delta = np.mean(np.abs(np.subtract(proxy['netflix'], native['netflix'])))
+        disney_delta = np.mean(np.abs(np.subtract(proxy['disney'], native['disney'])))
+        print(f"{width:>8} {ms:>10.1f} {native_ms / ms:>7.1f}x {netflix_delta:>12.3f} {disney_delta:>11.3f} "
+              f"{top_k_overlap(native['netflix'], proxy['netflix'], args.top_k):>14.0%} "
+              f"{top_k_overlap(native['disney'], proxy['disney'], args.top_k):>13.0%}")
+
+    print(f"\nScores: mean absolute difference to native; top-k: overlap of the top {args.top_k} frames")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Frame Metrics Benchmark
+Compares per-frame time and peak allocations of the fused FrameMetricsKernel against separate per-metric conversions
+
+Usage: python benchmarks/frame_metrics.py [--sizes 640x360 1280x720 1920x1080] [--frames 50] [--seed 0]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_metrics import FrameMetricsKernel
+from perceptual_hash import phash
+
+
+def synthetic_frames(width: int, height: int, count: int, seed: int) -> List[np.ndarray]:
+    """Smooth color gradients with shapes and noise, so edges, saturation and sharpness vary per frame"""
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    frames = []
+    for _ in range(count):
+        phase = rng.uniform(0, 2 * np.pi, 3)
+        frame = np.stack([127 + 100 * np.sin(xs / width * 4 + ys / height * 3 + p) for p in phase], axis=2)
+        frame += rng.normal(0, 12, frame.shape)
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        for _ in range(6):
+            x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.rectangle(frame, (x, y), (x + width // 8, y + height // 8), color, -1)
+        frames.append(frame)
+    return frames
+
+
+# The per-metric code the analyzers ran before the kernel, one conversion per metric
+
+def separate_disney(frame: np.ndarray) -> Dict[str, float]:
+    return {
+        'phash': phash(frame),
+        'brightness': float(np.mean(np.mean(frame.reshape(-1, 3), axis=0))),
+        'setting_brightness': float(np.mean(frame)),
+        'gray_variance': float(np.var(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))),
+        'edge_density': float(np.sum(cv2.Canny(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 50, 150) > 0) / (frame.shape[0] * frame.shape[1])),
+        'saturation': float(np.mean(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[:, :, 1]))
+    }
+
+
+def separate_netflix(frame: np.ndarray) -> Dict[str, float]:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    return {
+        'phash': phash(gray),
+        'lightness': float(np.mean(lab[:, :, 0])),
+        'contrast': float(np.std(gray)),
+        'laplacian_variance': float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    }
+
+
+def fused_disney(kernel: FrameMetricsKernel) -> Callable[[np.ndarray], Dict[str, float]]:
+    def compute(frame):
+        m = kernel.compute(frame)
+        return {
+            'phash': m.phash, 'brightness': m.brightness, 'setting_brightness': m.brightness,
+            'gray_variance': m.gray_variance, 'edge_density': m.edge_density, 'saturation': m.saturation
+        }
+    return compute
+
+
+def fused_netflix(kernel: FrameMetricsKernel) -> Callable[[np.ndarray], Dict[str, float]]:
+    def compute(frame):
+        m = kernel.compute(frame)
+        return {
+            'phash': m.phash, 'lightness': m.lightness, 'contrast': float(np.sqrt(m.gray_variance)),
+            'laplacian_variance': m.laplacian_variance
+        }
+    return compute
+
+
+def measure(fn: Callable[[np.ndarray], Dict[str, float]], frames: List[np.ndarray]):
+    """Results, mean seconds per frame and mean peak traced allocation per frame (bytes)"""
+    fn(frames[0])  # warm up (the kernel allocates its buffers here)
+    start = time.perf_counter()
+    results = [fn(frame) for frame in frames]
+    seconds = (time.perf_counter() - start) / len(frames)
+
+    peaks = []
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return results, seconds, float(np.mean(peaks))
+
+
+def same_metrics(reference: List[Dict[str, float]], result: List[Dict[str, float]]) -> bool:
+    for a, b in zip(reference, result):
+        for key, value in a.items():
+            if isinstance(value, str) and value != b[key]:
+                return False
+            if not isinstance(value, str) and not np.isclose(value, b[key], rtol=1e-9, atol=1e-9):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fused frame metrics kernel")
+    parser.add_argument("--sizes", nargs="+", default=['640x360', '1280x720', '1920x1080'])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pipelines = [
+        ('disney', separate_disney, fused_disney(FrameMetricsKernel(lightness=False, laplacian=False))),
+        ('netflix', separate_netflix, fused_netflix(FrameMetricsKernel(saturation=False, edges=False)))
+    ]
+
+    print("=" * 80)
+    print("FRAME METRICS BENCHMARK: separate conversions vs. FrameMetricsKernel")
+    print("=" * 80)
+    print(f"{'size':>10} {'pipeline':<8} {'separate ms':>12} {'fused ms':>9} {'speedup':>8} "
+          f"{'separate KiB':>13} {'fused KiB':>10} {'identical':>10}")
+
+    for size in args.sizes:
+        width, height = (int(v) for v in size.lower().split('x'))
+        frames = synthetic_frames(width, height, args.frames, args.seed)
+        for name, separate, fused in pipelines:
+            reference, separate_seconds, separate_peak = measure(separate, frames)
+            result, fused_seconds, fused_peak = measure(fused, frames)
+            print(f"{size:>10} {name:<8} {1000 * separate_seconds:>12.2f} {1000 * fused_seconds:>9.2f} "
+                  f"{separate_seconds / max(fused_seconds, 1e-9):>7.1f}x "
+                  f"{separate_peak / 1024:>13.0f} {fused_peak / 1024:>10.0f} "
+                  f"{'yes' if same_metrics(reference, result) else 'NO':>10}")
+
+    print("\nKiB: peak memory allocated while analyzing one frame (tracemalloc), after warm-up")
+    print("identical: same pHash and metrics (to 1e-9) as the separate conversions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Bounded Candidate Store
+Streaming top-K thumbnail candidates that never hold more than K frames in memory
+"""
+
+import heapq
+import itertools
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from frame_sampling import FrameSampler
+
+# How retained candidates keep their pixels
+FRAME_MODES = ('raw', 'index')
+
+
+def candidate_frame(candidate: Dict[str, Any], video_path: Optional[str] = None) -> Optional[np.ndarray]:
+    """Return a candidate's BGR frame from memory or the source video"""
+    frame = candidate.get('frame')
+    if frame is not None:
+        return frame
+
+    frame_number = candidate.get('frame_number')
+    if frame_number is None or not video_path:
+        return None
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+
+def candidate_frames(candidates: Sequence[Dict[str, Any]], video_path: Optional[str] = None) -> List[Optional[np.ndarray]]:
+    """candidate_frame for many candidates: frames not held in memory are re-read in one sorted pass over the video.
+
+    Candidates without a frame number are located by timestamp.
+    """
+    frames = [candidate_frame(candidate) for candidate in candidates]
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+    if not missing or not video_path:
+        return frames
+
+    sampler = FrameSampler(video_path)
+    if not sampler.is_opened():
+        return frames
+
+    numbers = []
+    for i in missing:
+        frame_number = candidates[i].get('frame_number')
+        if frame_number is None and candidates[i].get('timestamp') is not None:
+            frame_number = int(candidates[i]['timestamp'] * sampler.fps)
+        numbers.append(frame_number)
+
+    for i, frame in zip(missing, sampler.read_frames(numbers)):
+        frames[i] = frame
+    return frames
+
+
+class CandidateStore:
+    """Keeps the K highest-scoring candidates while frames stream past.
+
+    Lower-scoring candidates are evicted as better ones arrive, so memory
+    stays at K frames however long the video is. Ties keep the earlier
+    frame, which matches a stable sort of every candidate followed by [:K].
+
+    frame_mode controls what a retained candidate keeps:
+      raw    - the BGR frame (no re-read, ~6 MB per 1080p frame)
+      index  - nothing; 'frame_number' is used to re-extract the frame at
+               full quality in one sorted pass (see candidate_frames)
+
+    Scene-type counts cover every candidate ever added, so diversity scoring
+    sees the same history as before even after eviction. max_per_scene_type
+    additionally stops one scene type from filling all K slots.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 50,
+        frame_mode: str = 'index',
+        max_per_scene_type: Optional[int] = None
+    ):
+        if frame_mode not in FRAME_MODES:
+            raise ValueError(f"Unknown frame mode '{frame_mode}', expected one of {FRAME_MODES}")
+
+        self.capacity = max(1, int(capacity))
+        self.frame_mode = frame_mode
+        self.max_per_scene_type = max_per_scene_type
+
+        # Min-heap of (score, -seq, candidate): the root is the next eviction
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+        self._retained_types: Counter = Counter()
+        self.scene_types: Counter = Counter()
+        self.added = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.ranked())
+
+    def add(self, candidate: Dict[str, Any]) -> bool:
+        """Offer a candidate; returns True if it is currently retained"""
+        scene_type = self._scene_type(candidate)
+        self.scene_types[scene_type] += 1
+        self.added += 1
+
+        key = (candidate['score'], -next(self._seq))
+
+        # Per-type cap: a new candidate can only replace the weakest of its own type
+        if self.max_per_scene_type and self._retained_types[scene_type] >= self.max_per_scene_type:
+            weakest = min(
+                (entry for entry in self._heap if self._scene_type(entry[2]) == scene_type),
+                key=lambda entry: entry[:2]
+            )
+            if key <= weakest[:2]:
+                return False
+            self._heap.remove(weakest)
+            heapq.heapify(self._heap)
+            self._release(weakest[2])
+        elif len(self._heap) >= self.capacity:
+            if key <= self._heap[0][:2]:
+                return False
+            self._release(heapq.heappop(self._heap)[2])
+
+        self._retain(candidate)
+        heapq.heappush(self._heap, (key[0], key[1], candidate))
+        return True
+
+    def count_skipped(self, scene_types: Counter):
+        """Count candidates a bulk ranking already placed below the top K, as if they had been offered"""
+        self.scene_types.update(scene_types)
+        self.added += sum(scene_types.values())
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        """Retained candidates, best first"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'added': self.added,
+            'retained': len(self._heap),
+            'evicted': self.evicted,
+            'frame_mode': self.frame_mode,
+            'frame_bytes': sum(self._frame_bytes(entry[2]) for entry in self._heap)
+        }
+
+    def _retain(self, candidate: Dict[str, Any]):
+        """Convert the candidate's frame to the configured storage mode"""
+        frame = candidate.pop('frame', None)
+        if frame is not None and self.frame_mode == 'raw':
+            candidate['frame'] = frame
+        self._retained_types[self._scene_type(candidate)] += 1
+
+    def _release(self, candidate: Dict[str, Any]):
+        """Drop an evicted candidate's pixels; its frame_number still identifies it"""
+        candidate.pop('frame', None)
+        self._retained_types[self._scene_type(candidate)] -= 1
+        self.evicted += 1
+
+    @staticmethod
+    def _scene_type(candidate: Dict[str, Any]) -> Optional[str]:
+        return candidate.get('analysis', {}).get('scene_type')
+
+    @staticmethod
+    def _frame_bytes(candidate: Dict[str, Any]) -> int:
+        frame = candidate.get('frame')
+        return frame.nbytes if frame is not None else 0
@@ -0,0 +1,218 @@
+"""
+Columnar Candidate Table
+Candidate features as NumPy columns so scoring, filtering and ranking run as array operations
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from analysis_cache import columns_to_records
+
+# String features are stored as int32 codes into the table's vocabularies
+CODED_FIELDS = ('scene_type', 'composition')
+
+CANDIDATE_DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('frame_number', np.int64),  # -1 when unknown
+    ('people_count', np.int32),
+    ('very_prominent', np.int32),
+    ('objects_count', np.int32),
+    ('quality', np.float64),  # Netflix overall visual quality
+    ('visual_interest', np.float64),
+    ('color_saturation', np.float64),
+    ('family_friendly', np.bool_),
+    ('scene_type', np.int32),
+    ('composition', np.int32),
+])
+
+# Disney+ composition weights (see DisneyThumbnailGenerator._disney_score)
+COMPOSITION_SCORES = {'closeup': 3.0, 'duo': 2.5, 'ensemble': 2.0, 'wide': 1.0}
+RELEVANT_SCENE_TYPES = ('ensemble', 'duo_scene', 'character_focus')
+
+
+class CandidateTable:
+    """One row per candidate frame in a structured array, plus the dicts it was built from.
+
+    Build it once per video (from analysis-cache columns, records or Netflix
+    observations), score it with the functions below, and only turn the few
+    rows that survive ranking back into dicts. A table built from cache columns never decodes the others.
+    """
+
+    def __init__(
+        self,
+        columns: np.ndarray,
+        vocabularies: Dict[str, List[str]],
+        rows: Optional[Sequence[Any]] = None,
+        source_columns: Optional[Dict[str, np.ndarray]] = None
+    ):
+        self.columns = columns
+        self.vocabularies = vocabularies
+        self.rows = rows
+        self.source_columns = source_columns
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    @classmethod
+    def from_analyses(
+        cls,
+        analyses: Sequence[Dict[str, Any]],
+        rows: Optional[Sequence[Any]] = None,
+        frame_numbers: Optional[Sequence[Optional[int]]] = None
+    ) -> 'CandidateTable':
+        """Table from Disney+ scene analyses (rows default to the analyses themselves)"""
+        vocabularies = {name: {} for name in CODED_FIELDS}
+
+        def code(name: str, value: Optional[str]) -> int:
+            return vocabularies[name].setdefault(value or '', len(vocabularies[name]))
+
+        values = []
+        for i, analysis in enumerate(analyses):
+            characters = analysis.get('characters', [])
+            very_prominent = sum(1 for character in characters if character.get('prominence') == 'very_prominent')
+            frame_number = frame_numbers[i] if frame_numbers is not None else None
+            values.append((
+                analysis.get('timestamp', 0.0),
+                -1 if frame_number is None else frame_number,
+                len(characters),
+                very_prominent,
+                0,
+                0.0,
+                analysis.get('visual_interest', 0.0),
+                analysis.get('color_saturation', 0.0),
+                analysis.get('family_friendly', True),
+                code('scene_type', analysis.get('scene_type')),
+                code('composition', analysis.get('composition')),
+            ))
+
+        columns = np.array(values, dtype=CANDIDATE_DTYPE)
+        return cls(columns, {name: list(vocab) for name, vocab in vocabularies.items()},
+                   rows if rows is not None else analyses)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> 'CandidateTable':
+        """Table from analysis-cache records ({'frame_number', 'timestamp', 'analysis'})"""
+        table = cls.from_analyses(
+            [record['analysis'] for record in records],
+            rows=records,
+            frame_numbers=[record['frame_number'] for record in records]
+        )
+        table.columns['timestamp'] = [record['timestamp'] for record in records]
+        return table
+
+    @classmethod
+    def from_record_columns(cls, columns: Dict[str, np.ndarray]) -> 'CandidateTable':
+        """Table straight from the cached columns of Disney+ records (AnalysisCache.get_columns)"""
+        count = int(columns['#n'])
+        table = np.zeros(count, dtype=CANDIDATE_DTYPE)
+        table['family_friendly'] = True
+        vocabularies = {name: [''] for name in CODED_FIELDS}
+        if count == 0:
+            return cls(table, vocabularies, rows=[])
+
+        table['timestamp'] = columns['timestamp']
+        table['frame_number'] = columns['frame_number']
+        for field in ('visual_interest', 'color_saturation', 'family_friendly'):
+            if 'analysis.' + field in columns:
+                table[field] = columns['analysis.' + field]
+
+        # Characters are a child table: count them (and the very prominent ones) per parent row
+        parents = columns.get('analysis.characters#parent')
+        if parents is not None:
+            table['people_count'] = np.bincount(parents, minlength=count)
+            prominence = columns.get('analysis.characters/prominence')
+            if prominence is not None:
+                table['very_prominent'] = np.bincount(parents[prominence == 'very_prominent'], minlength=count)
+
+        for field in CODED_FIELDS:
+            if 'analysis.' + field in columns:
+                vocabulary, codes = np.unique(columns['analysis.' + field], return_inverse=True)
+                table[field] = codes.ravel()
+                vocabularies[field] = vocabulary.tolist()
+
+        return cls(table, vocabularies, source_columns=columns)
+
+    @classmethod
+    def from_observations(cls, observations: Sequence[Dict[str, Any]]) -> 'CandidateTable':
+        """Table from Netflix observations (people, objects and visual quality)"""
+        columns = np.zeros(len(observations), dtype=CANDIDATE_DTYPE)
+        columns['timestamp'] = [o['timestamp'] for o in observations]
+        columns['frame_number'] = [o['frame_number'] for o in observations]
+        columns['people_count'] = [len(o['people']) for o in observations]
+        columns['objects_count'] = [len(o['objects']) for o in observations]
+        columns['quality'] = [o['quality']['overall'] for o in observations]
+        columns['family_friendly'] = True
+        return cls(columns, {name: [''] for name in CODED_FIELDS}, observations)
+
+    def isin(self, field: str, values: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows whose coded field is one of values"""
+        vocabulary = self.vocabularies[field]
+        codes = [vocabulary.index(value) for value in values if value in vocabulary]
+        return np.isin(self.columns[field], codes)
+
+    def lookup(self, field: str, table: Dict[str, float], default: float) -> np.ndarray:
+        """Per-row value of a {string: number} mapping applied to a coded field"""
+        by_code = np.array([table.get(value, default) for value in self.vocabularies[field]], dtype=np.float64)
+        return by_code[self.columns[field]]
+
+    def labels(self, field: str) -> List[Optional[str]]:
+        """Vocabulary of a coded field, with None for rows that had no value"""
+        return [value if value else None for value in self.vocabularies[field]]
+
+    def scene_type_counts(self, positions: np.ndarray) -> Counter:
+        """Scene types of the given rows, counted like CandidateStore.scene_types"""
+        counts = np.bincount(self.columns['scene_type'][positions], minlength=len(self.vocabularies['scene_type']))
+        return Counter({label: int(n) for label, n in zip(self.labels('scene_type'), counts) if n})
+
+    def take(self, indices: Sequence[int]) -> List[Any]:
+        """Source rows (dicts) at the given positions, decoded from the cache columns when there are no dicts"""
+        if self.rows is None:
+            return columns_to_records(self.source_columns, rows=indices)
+        return [self.rows[i] for i in indices]
+
+
+def ranked(scores: np.ndarray, mask: Optional[np.ndarray] = None, limit: Optional[int] = None) -> np.ndarray:
+    """Row positions by descending score, ties in row order (like a stable sort), optionally masked and cut"""
+    positions = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+    order = positions[np.argsort(-scores[positions], kind='stable')]
+    return order if limit is None else order[:limit]
+
+
+def disney_scores(table: CandidateTable) -> np.ndarray:
+    """DisneyThumbnailGenerator._disney_score for every row, bit-for-bit (same operations in the same order)"""
+    score = np.zeros(len(table))
+    score += (table['very_prominent'] * 2.0) * 0.4
+    score += table['visual_interest'] * 2.0 * 0.2
+    score += table.lookup('composition', COMPOSITION_SCORES, 1.0) * 0.15
+    score += table['color_saturation'] * 3.0 * 0.1
+    score += np.where(table.isin('scene_type', RELEVANT_SCENE_TYPES), 2.0, 1.0) * 0.1
+    score += np.where(table['family_friendly'], 2.0 * 0.05, 0.0)
+    return score
+
+
+def prior_counts(table: CandidateTable, mask: np.ndarray, start: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """For each masked row, how many earlier masked rows share its scene type (plus `start` counts)"""
+    positions = np.flatnonzero(mask)
+    codes = table['scene_type'][positions]
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    group_start = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_sizes = np.diff(np.r_[group_start, len(sorted_codes)])
+    within = np.arange(len(sorted_codes)) - np.repeat(group_start, group_sizes)
+
+    counts = np.zeros(len(table), dtype=np.int64)
+    counts[positions[order]] = within
+    if start:
+        offsets = np.array([start.get(label, 0) for label in table.labels('scene_type')])
+        counts[positions] += offsets[codes]
+    return counts
+
+
+def netflix_scores(table: CandidateTable) -> np.ndarray:
+    """Netflix overall_score for every observation row"""
+    return table['quality'] * 0.6 + table['people_count'] * 0.2 + table['objects_count'] * 0.1
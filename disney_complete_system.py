@@ -3,10 +3,10 @@ Disney+ Complete Thumbnail Generation System
 Mirrors everything Disney uses for thumbnail generation
 """
 
-import cv2
 import json
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import argparse
 
@@ -29,6 +29,11 @@ from disney_personalization import (
     DisneyABTestingFramework,
     DisneyContentAnalyzer
 )
+from candidate_store import CandidateStore, candidate_frames
+from pipeline_progress import ProgressCallback, report_progress, scoped_progress
+from result_manifest import manifest_entry, write_manifest
+from thumbnail_encoding import attach_encodings, get_thumbnail_encoder
+from variant_selection import SELECTION_STRATEGIES
 
 
 class DisneyCompleteThumbnailSystem:
@@ -39,10 +44,14 @@ class DisneyCompleteThumbnailSystem:
         self.config = DisneyModelConfig()
         self.metadata_builder = DisneyMetadataBuilder()
         
-        # ML Models
+        # ML Models (one detector, and therefore one set of weights, shared by all components)
         self.character_detector = DisneyCharacterDetector(self.config)
-        self.scene_analyzer = DisneySceneAnalyzer(self.config)
-        self.thumbnail_generator = DisneyThumbnailGenerator(self.config)
+        self.scene_analyzer = DisneySceneAnalyzer(self.config, self.character_detector)
+        self.thumbnail_generator = DisneyThumbnailGenerator(
+            self.config,
+            character_detector=self.character_detector,
+            scene_analyzer=self.scene_analyzer
+        )
         
         # Personalization
         self.content_analyzer = DisneyContentAnalyzer()
@@ -53,6 +62,19 @@ class DisneyCompleteThumbnailSystem:
         print(f"✓ Personalization Engine: Active")
         print(f"✓ A/B Testing Framework: Active")
     
+    def build_metadata(
+        self,
+        video_path: str,
+        title: str,
+        genre: List[str],
+        characters: List[str]
+    ) -> ContentMetadata:
+        """Build the Disney content metadata used for scoring"""
+        content_id = Path(video_path).stem
+        metadata = self.metadata_builder.create_for_cop_show(title, content_id, characters)
+        metadata.genre = genre
+        return metadata
+    
     def process_content(
         self,
         video_path: str,
@@ -60,9 +82,17 @@ class DisneyCompleteThumbnailSystem:
         genre: List[str],
         characters: List[str],
         num_variants: int = 15,
-        output_dir: Optional[str] = None
+        output_dir: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        candidates: Optional[Union[List[Dict[str, Any]], CandidateStore]] = None,
+        renditions: bool = True
     ) -> Dict[str, Any]:
-        """Complete Disney-style content processing"""
+        """Complete Disney-style content processing
+
+        Pass `candidates` (a CandidateStore or a list from DisneyThumbnailGenerator.build_candidate)
+        to skip decoding when the frames were already analyzed by a shared pass, and
+        renditions=False when the thumbnails are only intermediate output.
+        """
         
         print(f"\n{'='*80}")
         print(f"DISNEY+ CONTENT PROCESSING")
@@ -73,64 +103,80 @@ class DisneyCompleteThumbnailSystem:
         
         # 1. Build metadata
         print("\n1️⃣ Building Disney Metadata...")
+        report_progress(progress, 'Building Disney Metadata', 0.0)
         content_id = Path(video_path).stem
-        metadata = self.metadata_builder.create_for_cop_show(title, content_id, characters)
-        metadata.genre = genre
+        metadata = self.build_metadata(video_path, title, genre, characters)
         print(f"✓ Metadata created for {len(metadata.characters)} characters")
         
         # 2. Process video with ML models
         print("\n2️⃣ Processing Video with Disney ML Models...")
-        thumbnails = self.thumbnail_generator.process_video(video_path, metadata)
+        if candidates is None:
+            thumbnails = self.thumbnail_generator.process_video(
+                video_path,
+                metadata,
+                progress=scoped_progress(progress, 0.02, 0.85, 'Processing Video')
+            )
+        else:
+            thumbnails = self.thumbnail_generator.rank_candidates(candidates)
         print(f"✓ Generated {len(thumbnails)} thumbnail candidates")
+        self.metadata_builder.enhance_with_analysis(
+            metadata, {"scenes": self._shot_scenes(self.thumbnail_generator.last_shots, thumbnails)}
+        )
+        if metadata.scenes:
+            print(f"✓ Recorded {len(metadata.scenes)} shots as scenes")
         
         # 3. Apply Disney filters
         print("\n3️⃣ Applying Disney Content Filters...")
+        report_progress(progress, 'Applying Disney Content Filters', 0.85)
         filtered = self.content_analyzer.apply_disney_filters(thumbnails, metadata)
         print(f"✓ {len(filtered)} thumbnails passed Disney filters")
         
         # 4. Generate variants
         print("\n4️⃣ Generating Disney Thumbnail Variants...")
+        report_progress(progress, 'Generating Disney Thumbnail Variants', 0.88)
         variants = self.content_analyzer.generate_thumbnail_variants(
             filtered,
             metadata,
-            num_variants
+            num_variants,
+            strategy=self.config.selection_strategy
         )
         print(f"✓ Created {len(variants['variants'])} thumbnail variants")
         
         # 5. Save thumbnails
         print("\n5️⃣ Saving Thumbnails...")
+        report_progress(progress, 'Saving Thumbnails', 0.9)
         if output_dir is None:
             output_dir = f"{content_id}_disney"
         
         output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True)
+        output_path.mkdir(parents=True, exist_ok=True)
         
         # Extract and save frames
         saved_files = []
-        for i, variant in enumerate(variants['variants']):
+        manifest_entries = []
+        encodings = []
+        encoder = get_thumbnail_encoder()
+        # Held raw frames, otherwise one sorted pass over the video by frame number or timestamp
+        frames = candidate_frames([variant['thumbnail'] for variant in variants['variants']], video_path)
+        for i, (variant, frame) in enumerate(zip(variants['variants'], frames)):
             thumb_data = variant['thumbnail']
             timestamp = thumb_data['timestamp']
-            
-            # Use stored frame if available, otherwise extract
-            if 'frame' in thumb_data:
-                frame = thumb_data['frame']
-            else:
-                # Extract frame
-                cap = cv2.VideoCapture(video_path)
-                frame_num = int(timestamp * cap.get(cv2.CAP_PROP_FPS))
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-                ret, frame = cap.read()
-                cap.release()
-                
-                if not ret:
-                    continue
+            if frame is None:
+                continue
             
             filename = f"disney_{i+1:02d}_{variant['variant_type']}_t{timestamp:.2f}.jpg"
             filepath = output_path / filename
-            cv2.imwrite(str(filepath), frame)
+            encodings.append(encoder.submit(frame, str(filepath), renditions=renditions))
             saved_files.append(str(filepath))
             
             variant_info = variant['thumbnail'].get('metadata', {})
+            manifest_entries.append(manifest_entry(
+                filepath,
+                variant_info.get('scene_type', variant['variant_type']),
+                thumb_data['score'],
+                timestamp,
+                variant_type=variant['variant_type']
+            ))
             print(f"   ✓ {filename}")
             print(f"      Scene: {variant_info.get('scene_type', 'unknown')}")
             print(f"      Composition: {variant_info.get('composition', 'unknown')}")
@@ -140,6 +186,7 @@ class DisneyCompleteThumbnailSystem:
         
         # 6. Save metadata
         print("\n6️⃣ Saving Disney Metadata...")
+        report_progress(progress, 'Saving Disney Metadata', 0.98)
         metadata_file = output_path / "disney_metadata.json"
         
         disney_metadata = {
@@ -163,6 +210,7 @@ class DisneyCompleteThumbnailSystem:
                 }
                 for i, v in enumerate(variants['variants'])
             ],
+            "scenes": metadata.to_dict()["scenes"],
             "complete_analysis": {
                 "total_frames_analyzed": len(thumbnails),
                 "characters_detected": sum(len(t.get('analysis', {}).get('characters', [])) for t in thumbnails),
@@ -175,14 +223,50 @@ class DisneyCompleteThumbnailSystem:
             json.dump(disney_metadata, f, indent=2)
         
         print(f"✓ Metadata saved: {metadata_file}")
+        attach_encodings(manifest_entries, encodings)
+        manifest = write_manifest(output_path, 'disney', manifest_entries, metadata_file)
+        report_progress(progress, 'Complete', 1.0)
         
         return {
             "output_dir": str(output_path),
             "thumbnails": saved_files,
             "variants": variants,
-            "metadata": disney_metadata
+            "metadata": disney_metadata,
+            "manifest": manifest
         }
-
+    
+    def _shot_scenes(
+        self,
+        shots: List[Dict[str, Any]],
+        thumbnails: List[Dict[str, Any]]
+    ) -> Dict[float, Dict[str, Any]]:
+        """One scene per detected shot (needs 'shots' sampling), described by its best-scoring candidate if it has one"""
+        starts = [shot['start_time'] for shot in shots]
+        best = {}
+        for thumbnail in thumbnails:
+            index = bisect_right(starts, thumbnail['timestamp']) - 1
+            if index >= 0 and thumbnail['timestamp'] < shots[index]['end_time']:
+                best.setdefault(index, thumbnail)
+        
+        scenes = {}
+        for index, shot in enumerate(shots):
+            scene = {"start_time": shot['start_time'], "end_time": shot['end_time']}
+            if index in best:
+                analysis = best[index].get('analysis', {})
+                scene.update({
+                    "type": analysis.get('scene_type', 'unknown'),
+                    "characters": [c.get('role', 'character') for c in analysis.get('characters', [])],
+                    "emotion": analysis.get('emotion', 'neutral'),
+                    "setting": analysis.get('setting', 'unknown'),
+                    "composition": analysis.get('composition', 'wide'),
+                    "action_level": analysis.get('action_level', 0),
+                    "intensity": analysis.get('intensity', 0.0),
+                    "family_friendly": analysis.get('family_friendly', True),
+                    "visual_interest": analysis.get('visual_interest', 0.0),
+                    "color_saturation": analysis.get('color_saturation', 0.0)
+                })
+            scenes[shot['start_time']] = scene
+        return scenes
 
 def main():
     parser = argparse.ArgumentParser(description="Disney+ Complete Thumbnail Generation System")
@@ -192,11 +276,14 @@ def main():
     parser.add_argument("--characters", nargs="+", default=[], help="Character names")
     parser.add_argument("--variants", type=int, default=15, help="Number of variants")
     parser.add_argument("--output-dir", help="Output directory")
+    parser.add_argument("--selection", choices=SELECTION_STRATEGIES, default="categories",
+                        help="Variant selection (mmr trades score against visual similarity)")
     
     args = parser.parse_args()
     
     # Initialize Disney system
     system = DisneyCompleteThumbnailSystem()
+    system.config.selection_strategy = args.selection
     
     # Process content
     results = system.process_content(
@@ -34,6 +34,8 @@ class Scene:
     family_friendly: bool = True
     visual_interest: float = 0.0  # 0.0-1.0
     color_saturation: float = 0.0  # 0.0-1.0
+    start_time: Optional[float] = None  # shot boundaries in seconds (None when not detected)
+    end_time: Optional[float] = None
     
 @dataclass
 class ContentMetadata:
@@ -111,7 +113,9 @@ class ContentMetadata:
                     "intensity": s.intensity,
                     "family_friendly": s.family_friendly,
                     "visual_interest": s.visual_interest,
-                    "color_saturation": s.color_saturation
+                    "color_saturation": s.color_saturation,
+                    "start_time": s.start_time,
+                    "end_time": s.end_time
                 }
                 for s in self.scenes
             ],
@@ -179,7 +183,9 @@ class DisneyMetadataBuilder:
                     intensity=scene.get("intensity", 0.0),
                     family_friendly=scene.get("family_friendly", True),
                     visual_interest=scene.get("visual_interest", 0.0),
-                    color_saturation=scene.get("color_saturation", 0.0)
+                    color_saturation=scene.get("color_saturation", 0.0),
+                    start_time=scene.get("start_time"),
+                    end_time=scene.get("end_time")
                 )
                 for ts, scene in analysis_results["scenes"].items()
             ]
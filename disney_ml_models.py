@@ -3,16 +3,24 @@ Disney+ ML Models
 Complete mirror of Disney's proprietary machine learning models
 """
 
-import cv2
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 from dataclasses import dataclass
-from ultralytics import YOLO
 import torch
 import torchvision.transforms as transforms
 from PIL import Image
 
 from disney_metadata_spec import ContentMetadata, Scene, Character
+from analysis_cache import cache_key, get_analysis_cache
+from candidate_store import CandidateStore
+from candidate_table import CandidateTable, disney_scores, prior_counts, ranked
+from frame_features import frame_features
+from frame_metrics import FrameMetrics, FrameMetricsKernel, box_color_stats
+from frame_pipeline import FramePipeline
+from frame_sampling import FrameSampler, sampling_key
+from model_registry import get_yolo, detect, detect_batch, model_version
+from pipeline_progress import ProgressCallback, report_progress
+from segmented_analysis import SegmentedAnalyzer
 
 
 @dataclass
@@ -26,6 +34,17 @@ class DisneyModelConfig:
     use_composition: bool = True
     confidence_threshold: float = 0.5
     nms_threshold: float = 0.4
+    sampling_strategy: str = "auto"  # auto, grab, seek, keyframe or shots (see frame_sampling.py)
+    batch_size: int = 8  # sampled frames per YOLO forward pass
+    analysis_workers: int = 4  # threads for per-frame OpenCV metrics
+    pipeline_queue_size: int = 4  # batches buffered between pipeline stages
+    max_candidates: int = 50  # top-K candidates kept while streaming
+    candidate_frames: str = "index"  # raw or index (see candidate_store.py)
+    max_candidates_per_scene_type: Optional[int] = None
+    analysis_width: Optional[int] = None  # analyze downscaled proxies this wide (None = native)
+    use_analysis_cache: bool = True  # reuse per-frame analyses of previously seen videos
+    segments: int = 1  # long videos are split into this many parallel time segments
+    selection_strategy: str = "categories"  # categories or mmr (see variant_selection.py)
 
 
 class DisneyCharacterDetector:
@@ -35,7 +54,8 @@ class DisneyCharacterDetector:
         self.config = config or DisneyModelConfig()
         self.yolo = None
         if self.config.use_yolo:
-            self.yolo = YOLO('yolov8n.pt')
+            # Shared across every detector in the process (loaded once)
+            self.yolo = get_yolo(f"{self.config.yolo_model}.pt")
         
         # Character classes Disney cares about
         self.character_classes = {
@@ -46,126 +66,140 @@ class DisneyCharacterDetector:
             }
         }
     
-    def detect_characters(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        """Detect and classify characters in frame"""
+    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        """Run YOLO on a frame and return plain detections (all classes, unfiltered)"""
+        if self.yolo is None:
+            return []
+        return detect(self.yolo, frame)
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run YOLO on a mini-batch of frames in one forward pass; one detection list per frame"""
+        if self.yolo is None:
+            return [[] for _ in frames]
+        return detect_batch(self.yolo, frames)
+    
+    def detect_characters(
+        self,
+        frame: np.ndarray,
+        detections: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Detect and classify characters in frame (reuses precomputed detections when given)"""
         if self.yolo is None:
             return []
         
-        results = self.yolo(frame, verbose=False)
-        detections = []
-        
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                if conf < self.config.confidence_threshold:
-                    continue
-                
-                # Get class name
-                class_name = r.names[cls]
-                
-                if class_name == 'person':
-                    bbox = box.xyxy[0].cpu().numpy()
-                    
-                    # Analyze character
-                    character_info = {
-                        'class': class_name,
-                        'confidence': conf,
-                        'bbox': bbox.tolist(),
-                        'center': [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2],
-                        'size': [(bbox[2] - bbox[0]), (bbox[3] - bbox[1])],
-                        'prominence': self._calculate_prominence(bbox, frame.shape),
-                        'role': self._determine_character_role(bbox, frame.shape),
-                        'attributes': self._detect_character_attributes(frame, bbox)
-                    }
-                    detections.append(character_info)
-        
-        return detections
-    
-    def _calculate_prominence(self, bbox: np.ndarray, frame_shape: Tuple[int, int, int]) -> str:
-        """Calculate how prominent a character is in the frame"""
-        width, height = frame_shape[1], frame_shape[0]
-        bbox_area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
-        frame_area = width * height
-        coverage = bbox_area / frame_area
-        
-        if coverage > 0.3:
-            return 'very_prominent'
-        elif coverage > 0.15:
-            return 'prominent'
-        elif coverage > 0.05:
-            return 'moderate'
-        else:
-            return 'background'
+        if detections is None:
+            detections = self.detect(frame)
+        
+        people = [
+            det for det in detections
+            if det['confidence'] >= self.config.confidence_threshold and det['class_name'] == 'person'
+        ]
+        if not people:
+            return []
+        
+        # Geometry and color statistics of every person at once, as arrays over the boxes
+        boxes = np.stack([det['bbox'] for det in people])
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        sizes = boxes[:, 2:] - boxes[:, :2]
+        prominence = self._calculate_prominence(boxes, frame.shape)
+        roles = self._determine_character_role(boxes, frame.shape)
+        attributes = self._detect_character_attributes(frame, boxes)
+        
+        return [
+            {
+                'class': 'person',
+                'confidence': det['confidence'],
+                'bbox': det['bbox'].tolist(),
+                'center': centers[i].tolist(),
+                'size': sizes[i].tolist(),
+                'prominence': prominence[i],
+                'role': roles[i],
+                'attributes': attributes[i]
+            }
+            for i, det in enumerate(people)
+        ]
+    
+    def _coverage(self, boxes: np.ndarray, frame_shape: Tuple[int, int, int]) -> np.ndarray:
+        """Share of the frame each box covers"""
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        return areas / (frame_shape[1] * frame_shape[0])
     
-    def _determine_character_role(self, bbox: np.ndarray, frame_shape: Tuple[int, int, int]) -> str:
-        """Determine character role based on position and size"""
+    def _calculate_prominence(self, boxes: np.ndarray, frame_shape: Tuple[int, int, int]) -> List[str]:
+        """Calculate how prominent each character is in the frame"""
+        coverage = self._coverage(boxes, frame_shape)
+        return np.select(
+            [coverage > 0.3, coverage > 0.15, coverage > 0.05],
+            ['very_prominent', 'prominent', 'moderate'],
+            'background'
+        ).tolist()
+    
+    def _determine_character_role(self, boxes: np.ndarray, frame_shape: Tuple[int, int, int]) -> List[str]:
+        """Determine each character's role based on position and size"""
         width, height = frame_shape[1], frame_shape[0]
-        center_x = (bbox[0] + bbox[2]) / 2
-        center_y = (bbox[1] + bbox[3]) / 2
-        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
-        frame_area = width * height
+        coverage = self._coverage(boxes, frame_shape)
         
         # Center position indicates importance
-        x_pos = center_x / width
-        y_pos = center_y / height
-        coverage = area / frame_area
+        x_pos = (boxes[:, 0] + boxes[:, 2]) / 2 / width
+        y_pos = (boxes[:, 1] + boxes[:, 3]) / 2 / height
+        centered = (0.3 < x_pos) & (x_pos < 0.7) & (0.3 < y_pos) & (y_pos < 0.7)
         
         # Hero is usually centered and prominent
-        if 0.3 < x_pos < 0.7 and 0.3 < y_pos < 0.7 and coverage > 0.1:
-            return 'hero'
-        elif coverage > 0.05:
-            return 'supporting'
-        else:
-            return 'background'
+        return np.select(
+            [centered & (coverage > 0.1), coverage > 0.05],
+            ['hero', 'supporting'],
+            'background'
+        ).tolist()
     
-    def _detect_character_attributes(self, frame: np.ndarray, bbox: np.ndarray) -> List[str]:
-        """Detect character attributes (uniform, casual, etc.)"""
-        x1, y1, x2, y2 = [int(c) for c in bbox]
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-        
-        if x2 <= x1 or y2 <= y1:
-            return []
-        
-        person_roi = frame[y1:y2, x1:x2]
-        
-        if person_roi.size == 0:
-            return []
+    def _detect_character_attributes(self, frame: np.ndarray, boxes: np.ndarray) -> List[List[str]]:
+        """Detect each character's attributes (uniform, casual, etc.)"""
+        # Whole pixels inside the frame (int() truncation, as for slicing)
+        corners = np.trunc(boxes).astype(np.int64)
+        corners[:, [0, 2]] = np.clip(corners[:, [0, 2]], 0, frame.shape[1])
+        corners[:, [1, 3]] = np.clip(corners[:, [1, 3]], 0, frame.shape[0])
+        valid = (corners[:, 2] > corners[:, 0]) & (corners[:, 3] > corners[:, 1])
         
         # Basic color analysis
-        avg_color = np.mean(person_roi.reshape(-1, 3), axis=0)
-        
-        attributes = []
-        
-        # Detect uniform-like consistency
-        std_color = np.std(person_roi.reshape(-1, 3), axis=0)
-        if np.mean(std_color) < 30:  # Low variation suggests uniform
-            attributes.append('uniform')
-        else:
-            attributes.append('casual')
+        avg_color, std_color = box_color_stats(frame, corners)
         
-        # Detect formality based on brightness
-        brightness = np.mean(avg_color)
-        if brightness > 200:
-            attributes.append('light_clothing')
-        elif brightness < 100:
-            attributes.append('dark_clothing')
+        # Low variation suggests uniform; formality based on brightness
+        uniform = std_color.mean(axis=1) < 30
+        brightness = avg_color.mean(axis=1)
         
+        attributes = []
+        for i in range(len(boxes)):
+            if not valid[i]:
+                attributes.append([])
+                continue
+            character = ['uniform' if uniform[i] else 'casual']
+            if brightness[i] > 200:
+                character.append('light_clothing')
+            elif brightness[i] < 100:
+                character.append('dark_clothing')
+            attributes.append(character)
         return attributes
 
 
 class DisneySceneAnalyzer:
     """Disney's scene analysis and classification model"""
     
-    def __init__(self, config: DisneyModelConfig = None):
+    def __init__(
+        self,
+        config: DisneyModelConfig = None,
+        character_detector: Optional[DisneyCharacterDetector] = None
+    ):
         self.config = config or DisneyModelConfig()
-        self.character_detector = DisneyCharacterDetector(config)
+        self.character_detector = character_detector or DisneyCharacterDetector(self.config)
+        # Grayscale and HSV once per frame for every color metric below
+        self.metrics_kernel = FrameMetricsKernel(lightness=False, laplacian=False)
     
-    def analyze_scene(self, frame: np.ndarray, timestamp: float) -> Dict[str, Any]:
+    def analyze_scene(
+        self,
+        frame: np.ndarray,
+        timestamp: float,
+        detections: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
         """Complete scene analysis Disney-style"""
+        metrics = self.metrics_kernel.compute(frame)
         analysis = {
             'timestamp': timestamp,
             'scene_type': 'unknown',
@@ -177,12 +211,14 @@ class DisneySceneAnalyzer:
             'intensity': 0.0,
             'family_friendly': True,
             'visual_interest': 0.0,
-            'color_saturation': 0.0
+            'color_saturation': 0.0,
+            'phash': metrics.phash
         }
         
         # Detect characters
-        characters = self.character_detector.detect_characters(frame)
+        characters = self.character_detector.detect_characters(frame, detections)
         analysis['characters'] = characters
+        analysis['features'] = frame_features(frame, [c['bbox'] for c in characters])
         
         # Determine scene composition
         analysis['composition'] = self._analyze_composition(characters, frame.shape)
@@ -191,23 +227,34 @@ class DisneySceneAnalyzer:
         analysis['scene_type'] = self._classify_scene_type(characters)
         
         # Analyze emotion and intensity
-        analysis['emotion'], analysis['intensity'] = self._analyze_emotion(frame, characters)
+        analysis['emotion'], analysis['intensity'] = self._analyze_emotion(metrics, characters)
         
         # Analyze setting
-        analysis['setting'] = self._analyze_setting(frame)
+        analysis['setting'] = self._analyze_setting(metrics)
         
         # Calculate action level
-        analysis['action_level'] = self._calculate_action_level(frame, characters)
+        analysis['action_level'] = self._calculate_action_level(metrics, characters)
         
         # Visual analysis
-        analysis['visual_interest'] = self._calculate_visual_interest(frame)
-        analysis['color_saturation'] = self._calculate_color_saturation(frame)
+        analysis['visual_interest'] = self._calculate_visual_interest(metrics)
+        analysis['color_saturation'] = self._calculate_color_saturation(metrics)
         
         # Family friendliness
         analysis['family_friendly'] = self._assess_family_friendly(analysis)
         
         return analysis
     
+    def to_native(self, analysis: Dict[str, Any], scale: float) -> Dict[str, Any]:
+        """Map character geometry measured on a proxy frame (scale = proxy / native) back to native pixels"""
+        if scale >= 1.0:
+            return analysis
+        
+        factor = 1.0 / scale
+        for character in analysis['characters']:
+            for key in ('bbox', 'center', 'size'):
+                character[key] = [float(v) * factor for v in character[key]]
+        return analysis
+    
     def _analyze_composition(self, characters: List[Dict], frame_shape: Tuple[int, int, int]) -> str:
         """Determine shot composition"""
         if not characters:
@@ -250,15 +297,14 @@ class DisneySceneAnalyzer:
         else:
             return 'background'
     
-    def _analyze_emotion(self, frame: np.ndarray, characters: List[Dict]) -> Tuple[str, float]:
+    def _analyze_emotion(self, metrics: FrameMetrics, characters: List[Dict]) -> Tuple[str, float]:
         """Analyze emotional content with more diversity"""
         # Simplified emotion detection based on color and composition
         if not characters:
             return 'neutral', 0.5
         
         # Check color temperature
-        avg_color = np.mean(frame.reshape(-1, 3), axis=0)
-        brightness = np.mean(avg_color)
+        brightness = metrics.brightness
         
         # More diverse emotion detection
         if brightness > 220:
@@ -290,10 +336,10 @@ class DisneySceneAnalyzer:
         
         return emotion, intensity
     
-    def _analyze_setting(self, frame: np.ndarray) -> str:
+    def _analyze_setting(self, metrics: FrameMetrics) -> str:
         """Analyze scene setting"""
         # Detect if indoor or outdoor
-        avg_brightness = np.mean(frame)
+        avg_brightness = metrics.brightness
         
         if avg_brightness > 150:
             return 'bright_indoor'
@@ -302,7 +348,7 @@ class DisneySceneAnalyzer:
         else:
             return 'indoor'
     
-    def _calculate_action_level(self, frame: np.ndarray, characters: List[Dict]) -> int:
+    def _calculate_action_level(self, metrics: FrameMetrics, characters: List[Dict]) -> int:
         """Calculate action intensity (0-10)"""
         if not characters:
             return 0
@@ -311,26 +357,19 @@ class DisneySceneAnalyzer:
         base_level = min(len(characters) * 2, 6)
         
         # Add brightness variance (movement indicator)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        variance = np.var(gray)
+        variance = metrics.gray_variance
         action_boost = min(variance / 1000, 4)
         
         return int(base_level + action_boost)
     
-    def _calculate_visual_interest(self, frame: np.ndarray) -> float:
+    def _calculate_visual_interest(self, metrics: FrameMetrics) -> float:
         """Calculate visual interest score (0-1)"""
         # Use edge density as interest metric
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / edges.size
-        
-        return min(edge_density * 2, 1.0)
+        return min(metrics.edge_density * 2, 1.0)
     
-    def _calculate_color_saturation(self, frame: np.ndarray) -> float:
+    def _calculate_color_saturation(self, metrics: FrameMetrics) -> float:
         """Calculate color saturation (0-1)"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        sat = hsv[:, :, 1]
-        return np.mean(sat) / 255.0
+        return metrics.saturation / 255.0
     
     def _assess_family_friendly(self, analysis: Dict[str, Any]) -> bool:
         """Assess if content is family-friendly"""
@@ -341,60 +380,243 @@ class DisneySceneAnalyzer:
 class DisneyThumbnailGenerator:
     """Complete Disney+ thumbnail generation system"""
     
-    def __init__(self, config: DisneyModelConfig = None):
+    def __init__(
+        self,
+        config: DisneyModelConfig = None,
+        character_detector: Optional[DisneyCharacterDetector] = None,
+        scene_analyzer: Optional[DisneySceneAnalyzer] = None
+    ):
         self.config = config or DisneyModelConfig()
-        self.character_detector = DisneyCharacterDetector(config)
-        self.scene_analyzer = DisneySceneAnalyzer(config)
+        self.character_detector = character_detector or DisneyCharacterDetector(self.config)
+        self.scene_analyzer = scene_analyzer or DisneySceneAnalyzer(self.config, self.character_detector)
+        self.analysis_cache = get_analysis_cache() if self.config.use_analysis_cache else None
+        self._segmented = None
+        self.last_timings = None
+        # Boundaries of the shots found by the last pass (Shot.to_dict), only with 'shots' sampling
+        self.last_shots: List[Dict[str, Any]] = []
     
-    def process_video(self, video_path: str, metadata: ContentMetadata) -> List[Dict[str, Any]]:
+    def process_video(
+        self,
+        video_path: str,
+        metadata: ContentMetadata,
+        progress: Optional[ProgressCallback] = None
+    ) -> List[Dict[str, Any]]:
         """Process video Disney-style and generate thumbnails"""
-        cap = cv2.VideoCapture(video_path)
+        sampler = FrameSampler(video_path, self.config.sampling_strategy, self.config.analysis_width, progress)
+        self.last_timings = None
+        self.last_shots = []
         
-        if not cap.isOpened():
+        if not sampler.is_opened():
             return []
         
-        thumbnails = []
-        frame_count = 0
+        # Proxy frames are never saved: keep frame numbers and re-extract at full resolution
+        thumbnails = self.new_candidate_store('index' if sampler.downscaled else None)
         
         # Extract frames at shorter intervals for more diversity
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        interval = int(fps * 1)  # Every 1 second for more frames
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        interval = self.sample_interval(sampler.fps)
+        
+        key = self.analysis_cache_key(video_path, sampler)
+        columns = self.analysis_cache.get_columns(key, 'disney') if key else None
+        if columns is not None:
+            # Scored straight from the cached columns: only the retained candidates become dicts
+            table = CandidateTable.from_record_columns(columns)
+            print(f"   Loaded {len(table)} analyzed frames from cache")
+            self.load_cached_shots(key)
+            return self.rank_candidates(self.candidates_from_table(table, metadata, thumbnails))
+        
+        records = self._analyze_segments(video_path, sampler, progress)
+        if records is not None:
+            print(f"   Stage timings: {self.last_timings.summary()}")
+            if key:
+                self.analysis_cache.put(key, 'disney', records)
+            # Frames were decoded in the segment workers: candidates re-extract theirs by frame number
+            return self.rank_candidates(self.candidates_from_records(records, metadata, thumbnails))
+        records = []
+        
+        def analyze(frame_number, timestamp, frame, detections):
+            analysis = self.scene_analyzer.analyze_scene(frame, timestamp, detections)
+            return self.scene_analyzer.to_native(analysis, sampler.scale)
+        
+        pipeline = FramePipeline(
+            self.character_detector.detect_batch,
+            analyze,
+            batch_size=self.config.batch_size,
+            queue_size=self.config.pipeline_queue_size,
+            workers=self.config.analysis_workers
+        )
+        for frame_number, timestamp, frame, _, analysis in pipeline.run(sampler.sample([interval])):
+            records.append({'frame_number': frame_number, 'timestamp': timestamp, 'analysis': analysis})
             
-            if frame_count % interval == 0:
-                timestamp = frame_count / fps
-                
-                # Analyze frame
-                analysis = self.scene_analyzer.analyze_scene(frame, timestamp)
-                
-                # Score for Disney's criteria
-                score = self._disney_score(analysis, metadata)
-                
-                # Much lower threshold to capture maximum diversity
-                if score > 0.3:  # Very low threshold for maximum diversity
-                    thumbnail_info = {
-                        'timestamp': timestamp,
-                        'score': score,
-                        'analysis': analysis,
-                        'metadata': self._extract_metadata(analysis),
-                        'genre_alignment': self._check_genre_alignment(analysis, metadata),
-                        'diversity_factor': self._calculate_diversity(thumbnails, analysis),
-                        'frame': frame.copy()  # Store frame for later use
-                    }
-                    thumbnails.append(thumbnail_info)
+            # Scoring stays sequential: the diversity factor depends on earlier candidates
+            thumbnail_info = self.build_candidate(
+                frame, timestamp, metadata, thumbnails, analysis=analysis, frame_number=frame_number
+            )
+            if thumbnail_info is not None:
+                thumbnails.add(thumbnail_info)
             
-            frame_count += 1
+            # Also the cancellation point: a cancelled job raises here and stops decoding
+            report_progress(progress, 'Analyzing frames', sampler.progress(frame_number))
         
-        cap.release()
+        self.last_timings = pipeline.timings
+        print(f"   Stage timings: {pipeline.timings.summary()}")
+        if key:
+            self.analysis_cache.put(key, 'disney', records)
+        self.record_shots(sampler, key)
+        
+        return self.rank_candidates(thumbnails)
+    
+    def _analyze_segments(
+        self,
+        video_path: str,
+        sampler: FrameSampler,
+        progress: Optional[ProgressCallback] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Scene analysis records from parallel time segments, or None when the video is not split"""
+        if self.config.segments <= 1:
+            return None
+        if self._segmented is None:
+            self._segmented = SegmentedAnalyzer(self.config.segments, disney_config=self.config)
+        
+        segmented = self._segmented.run(video_path, sampler, progress)
+        if segmented is None:
+            return None
+        self.last_timings = self._segmented.last_timings
+        return segmented['disney']
+    
+    def record_shots(self, sampler: FrameSampler, key: Optional[str] = None):
+        """Keep the shots of a finished pass (the last one only reaches the end once sampling is done) and cache them"""
+        self.last_shots = [shot.to_dict() for shot in sampler.shots]
+        if key and self.last_shots:
+            self.analysis_cache.put(key, 'shots', self.last_shots)
+    
+    def load_cached_shots(self, key: str):
+        """Shots cached with the records of a previous pass over the same video"""
+        self.last_shots = self.analysis_cache.get(key, 'shots') or []
+    
+    def analysis_cache_key(self, video_path: str, sampler: FrameSampler) -> Optional[str]:
+        """Cache key for this video's scene analyses (None when caching is off or the file can't be hashed)"""
+        # An upload still in progress can't be hashed yet
+        if self.analysis_cache is None or sampler.following:
+            return None
+        try:
+            return cache_key(video_path, {
+                'system': 'disney',
+                'weights': model_version(f"{self.config.yolo_model}.pt") if self.config.use_yolo else None,
+                'confidence_threshold': self.config.confidence_threshold,
+                'interval': self.sample_interval(sampler.fps),
+                'analysis_width': self.config.analysis_width if sampler.downscaled else None,
+                'sampling': sampling_key(self.config.sampling_strategy)
+            })
+        except OSError:
+            return None
+    
+    def candidates_from_records(
+        self,
+        records: List[Dict[str, Any]],
+        metadata: ContentMetadata,
+        store: Optional[CandidateStore] = None
+    ) -> CandidateStore:
+        """Score cached scene analyses for this request's metadata (frames are re-extracted on save)"""
+        return self.candidates_from_table(CandidateTable.from_records(records), metadata, store)
+    
+    def candidates_from_table(
+        self,
+        table: CandidateTable,
+        metadata: ContentMetadata,
+        store: Optional[CandidateStore] = None
+    ) -> CandidateStore:
+        """Score every analyzed frame at once and fill the store with the ones that make its top K.
+
+        Diversity factors come from running scene-type counts, exactly as if
+        every record had been added one by one. Only rows that can be retained
+        are turned back into candidate dicts.
+        """
+        store = store if store is not None else self.new_candidate_store()
+        if not len(table):
+            return store
+        
+        scores = disney_scores(table)
+        passing = scores > 0.3
+        diversity = 1.0 / (1.0 + prior_counts(table, passing, store.scene_types))
+        
+        if self.config.max_candidates_per_scene_type:
+            # The per-type cap depends on arrival order: offer every passing row
+            keep = np.flatnonzero(passing)
+        else:
+            keep = np.sort(ranked(scores, passing, store.capacity))
+            skipped = np.setdiff1d(np.flatnonzero(passing), keep, assume_unique=True)
+            store.count_skipped(table.scene_type_counts(skipped))
+        
+        for i, record in zip(keep.tolist(), table.take(keep)):
+            analysis = record['analysis']
+            store.add({
+                'timestamp': record['timestamp'],
+                'frame_number': record['frame_number'],
+                'score': float(scores[i]),
+                'analysis': analysis,
+                'metadata': self._extract_metadata(analysis),
+                'genre_alignment': self._check_genre_alignment(analysis, metadata),
+                'diversity_factor': float(diversity[i]),
+                'frame': None
+            })
+        return store
+    
+    def new_candidate_store(self, frame_mode: Optional[str] = None) -> CandidateStore:
+        """Bounded top-K store for the candidates of one video"""
+        return CandidateStore(
+            capacity=self.config.max_candidates,
+            frame_mode=frame_mode or self.config.candidate_frames,
+            max_per_scene_type=self.config.max_candidates_per_scene_type
+        )
+    
+    def sample_interval(self, fps: float) -> int:
+        """Frames between analyzed samples"""
+        return int(fps * 1)  # Every 1 second for more frames
+    
+    def build_candidate(
+        self,
+        frame: Optional[np.ndarray],
+        timestamp: float,
+        metadata: ContentMetadata,
+        existing: Union[List[Dict[str, Any]], CandidateStore],
+        detections: Optional[List[Dict[str, Any]]] = None,
+        analysis: Optional[Dict[str, Any]] = None,
+        frame_number: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Analyze and score one sampled frame; returns None if it misses the threshold"""
+        # Analyze frame (unless the pipeline already did)
+        if analysis is None:
+            analysis = self.scene_analyzer.analyze_scene(frame, timestamp, detections)
+        
+        # Score for Disney's criteria
+        score = self._disney_score(analysis, metadata)
+        
+        # Much lower threshold to capture maximum diversity
+        if score <= 0.3:  # Very low threshold for maximum diversity
+            return None
+        
+        return {
+            'timestamp': timestamp,
+            'frame_number': frame_number,
+            'score': score,
+            'analysis': analysis,
+            'metadata': self._extract_metadata(analysis),
+            'genre_alignment': self._check_genre_alignment(analysis, metadata),
+            'diversity_factor': self._calculate_diversity(existing, analysis),
+            'frame': frame  # CandidateStore decides how (and whether) to keep it
+        }
+    
+    def rank_candidates(
+        self,
+        thumbnails: Union[List[Dict[str, Any]], CandidateStore]
+    ) -> List[Dict[str, Any]]:
+        """Rank and keep the best candidates (a CandidateStore is already bounded)"""
+        if isinstance(thumbnails, CandidateStore):
+            return thumbnails.ranked()
         
-        # Rank and select best thumbnails
         thumbnails.sort(key=lambda x: x['score'], reverse=True)
         
-        return thumbnails[:50]  # Return more candidates for diversity
+        return thumbnails[:self.config.max_candidates]  # Return more candidates for diversity
     
     def _disney_score(self, analysis: Dict[str, Any], metadata: ContentMetadata) -> float:
         """Disney's proprietary scoring algorithm"""
@@ -448,17 +670,20 @@ class DisneyThumbnailGenerator:
         
         return True
     
-    def _calculate_diversity(self, existing: List[Dict], analysis: Dict[str, Any]) -> float:
+    def _calculate_diversity(self, existing: Union[List[Dict], CandidateStore], analysis: Dict[str, Any]) -> float:
         """Calculate how diverse this thumbnail is from existing ones"""
         if not existing:
             return 1.0
         
         # Check composition diversity
-        existing_types = [t['analysis'].get('scene_type') for t in existing]
         current_type = analysis.get('scene_type')
+        if isinstance(existing, CandidateStore):
+            # Counts every candidate seen so far, including evicted ones
+            type_freq = existing.scene_types[current_type]
+        else:
+            type_freq = sum(1 for t in existing if t['analysis'].get('scene_type') == current_type)
         
         # More unique = higher diversity
-        type_freq = existing_types.count(current_type) if current_type in existing_types else 0
         diversity = 1.0 / (1.0 + type_freq)
         
         return diversity
@@ -10,6 +10,9 @@ from datetime import datetime
 import random
 
 from disney_metadata_spec import ContentMetadata, Character, Scene
+from perceptual_hash import suppress_near_duplicates
+from frame_features import embedding_matrix
+from variant_selection import VariantSelector, mmr_select
 
 
 @dataclass
@@ -323,9 +326,16 @@ class DisneyContentAnalyzer:
         self,
         thumbnails: List[Dict[str, Any]],
         metadata: ContentMetadata,
-        num_variants: int = 15
+        num_variants: int = 15,
+        strategy: str = 'categories'
     ) -> Dict[str, Any]:
-        """Generate Disney-style thumbnail variants with maximum diversity"""
+        """Generate Disney-style thumbnail variants with maximum diversity ('categories' or 'mmr' selection)"""
+        
+        # Visually near-identical candidates (e.g. a repeated shot) would fill several slots with one picture
+        thumbnails = suppress_near_duplicates(
+            sorted(thumbnails, key=lambda x: x.get('score', 0), reverse=True),
+            lambda x: x.get('analysis', {}).get('phash')
+        )
         
         variants = {
             'metadata': {
@@ -337,21 +347,17 @@ class DisneyContentAnalyzer:
             'variants': []
         }
         
-        # Enhanced categorization for maximum diversity
-        hero_shots = []
-        heroine_shots = []
-        ensemble_shots = []
-        duo_shots = []
-        trio_shots = []
-        action_shots = []
-        fight_scenes = []
-        emotional_shots = []
-        closeup_shots = []
-        wide_shots = []
-        dramatic_shots = []
-        comedic_shots = []
-        romantic_shots = []
-        establishing_shots = []
+        if strategy == 'mmr':
+            variants['variants'] = self._mmr_variants(thumbnails, num_variants)
+            return variants
+        
+        # Enhanced categorization for maximum diversity, in variant priority order
+        variant_types = [
+            'hero_closeup', 'heroine_closeup', 'ensemble_shot', 'action_sequence', 'fight_scene',
+            'duo_interaction', 'trio_scene', 'emotional_moment', 'dramatic_scene', 'comedic_moment',
+            'romantic_scene', 'wide_establishing', 'establishing_shot', 'hero_shot'
+        ]
+        selector = VariantSelector(lambda x: x.get('score', 0))
         
         for thumb in thumbnails:
             analysis = thumb.get('analysis', {})
@@ -360,96 +366,87 @@ class DisneyContentAnalyzer:
             emotion = analysis.get('emotion', '')
             action_level = analysis.get('action_level', 0)
             intensity = analysis.get('intensity', 0)
+            categories = set()
             
             # Hero/Heroine shots
             if 'hero_closeup' in scene_type or 'character_focus' in scene_type:
                 if composition == 'closeup':
-                    closeup_shots.append(thumb)
-                hero_shots.append(thumb)
+                    categories.add('hero_closeup')
+                categories.add('hero_shot')
             
             # Ensemble shots
             if scene_type == 'ensemble':
-                ensemble_shots.append(thumb)
+                categories.add('ensemble_shot')
             
             # Duo/Trio shots
             if scene_type == 'duo_scene':
-                duo_shots.append(thumb)
+                categories.add('duo_interaction')
             elif scene_type == 'trio_scene':
-                trio_shots.append(thumb)
+                categories.add('trio_scene')
             
             # Action and fight scenes
             if action_level > 6:
-                action_shots.append(thumb)
+                categories.add('action_sequence')
             if action_level > 7:
-                fight_scenes.append(thumb)
+                categories.add('fight_scene')
             
             # Emotional content
             if intensity > 0.7:
-                emotional_shots.append(thumb)
+                categories.add('emotional_moment')
             
             # Composition-based
             if composition == 'closeup':
-                closeup_shots.append(thumb)
+                categories.add('hero_closeup')
             elif composition == 'wide':
-                wide_shots.append(thumb)
+                categories.add('wide_establishing')
             
             # Emotion-based
             if emotion in ['tense', 'dramatic']:
-                dramatic_shots.append(thumb)
+                categories.add('dramatic_scene')
             elif emotion in ['uplifting', 'happy']:
-                comedic_shots.append(thumb)
+                categories.add('comedic_moment')
             elif emotion in ['romantic']:
-                romantic_shots.append(thumb)
+                categories.add('romantic_scene')
             
             # Establishing shots
             if scene_type == 'establishing':
-                establishing_shots.append(thumb)
+                categories.add('establishing_shot')
+            
+            selector.add(thumb, *categories)
         
-        # Create diverse variants with priority order
+        # Select diverse variants: the best of each category not already leading another one
         selected = []
-        variant_types = {
-            'hero_closeup': closeup_shots,
-            'heroine_closeup': heroine_shots,
-            'ensemble_shot': ensemble_shots,
-            'action_sequence': action_shots,
-            'fight_scene': fight_scenes,
-            'duo_interaction': duo_shots,
-            'trio_scene': trio_shots,
-            'emotional_moment': emotional_shots,
-            'dramatic_scene': dramatic_shots,
-            'comedic_moment': comedic_shots,
-            'romantic_scene': romantic_shots,
-            'wide_establishing': wide_shots,
-            'establishing_shot': establishing_shots,
-            'hero_shot': hero_shots
-        }
-        
-        # Select diverse variants
-        for variant_type, candidate_list in variant_types.items():
-            if candidate_list and len(selected) < num_variants:
-                # Select best from this category
-                candidate_list.sort(key=lambda x: x.get('score', 0), reverse=True)
+        for variant_type in variant_types:
+            if len(selected) >= num_variants:
+                break
+            for thumb in selector.best(variant_type, exclude_chosen=True):
                 selected.append({
                     'variant_type': variant_type,
-                    'thumbnail': candidate_list[0]
+                    'thumbnail': selector.choose(thumb)
                 })
         
-        # If we still need more variants, add from remaining thumbnails
-        remaining_needed = num_variants - len(selected)
-        if remaining_needed > 0:
-            remaining_thumbnails = [t for t in thumbnails if t not in [s['thumbnail'] for s in selected]]
-            remaining_thumbnails.sort(key=lambda x: x.get('score', 0), reverse=True)
-            
-            for i, thumb in enumerate(remaining_thumbnails[:remaining_needed]):
-                selected.append({
-                    'variant_type': f'diverse_shot_{i+1}',
-                    'thumbnail': thumb
-                })
+        # If we still need more variants, add the best thumbnails not picked yet
+        for i, thumb in enumerate(selector.rest(num_variants - len(selected))):
+            selected.append({
+                'variant_type': f'diverse_shot_{i+1}',
+                'thumbnail': thumb
+            })
         
         variants['variants'] = selected[:num_variants]
         
         return variants
     
+    def _mmr_variants(self, thumbnails: List[Dict[str, Any]], num_variants: int) -> List[Dict[str, Any]]:
+        """Variants picked by maximal marginal relevance over color, character layout and shot type"""
+        analyses = [thumb.get('analysis', {}) for thumb in thumbnails]
+        labels = [f"{a.get('scene_type', 'unknown')}_{a.get('composition', 'unknown')}" for a in analyses]
+        embeddings = embedding_matrix([a.get('features') for a in analyses], labels)
+        
+        picks = mmr_select(
+            list(zip(thumbnails, labels)), [thumb.get('score', 0) for thumb in thumbnails], embeddings, num_variants
+        )
+        return [{'variant_type': label, 'thumbnail': thumb} for thumb, label in picks]
+    
     def apply_disney_filters(
         self,
         thumbnails: List[Dict[str, Any]],
@@ -0,0 +1,72 @@
+"""
+Frame Features
+Compact per-frame vectors (color histogram + detection layout) for diversity-aware variant selection
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+# HSV histogram bins: hue x saturation x value
+COLOR_BINS = (6, 2, 2)
+COLOR_SIZE = int(np.prod(COLOR_BINS))
+
+# Detection boxes are summarized as their coverage of a LAYOUT_GRID x LAYOUT_GRID grid
+LAYOUT_GRID = 3
+LAYOUT_SIZE = LAYOUT_GRID * LAYOUT_GRID
+
+
+def frame_features(frame: np.ndarray, boxes: Iterable[Sequence[float]]) -> List[float]:
+    """Color histogram (sums to 1) followed by the detection layout, as plain floats for the analysis cache"""
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1, 2], None, list(COLOR_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+    histogram /= max(float(histogram.sum()), 1.0)
+    layout = detection_layout(boxes, frame.shape[1], frame.shape[0])
+    return [round(float(v), 4) for v in np.concatenate([histogram, layout])]
+
+
+def detection_layout(boxes: Iterable[Sequence[float]], width: int, height: int) -> np.ndarray:
+    """Share of each grid cell covered by detection boxes (x1, y1, x2, y2), capped at 1"""
+    grid = np.zeros((LAYOUT_GRID, LAYOUT_GRID))
+    xs = np.linspace(0, width, LAYOUT_GRID + 1)
+    ys = np.linspace(0, height, LAYOUT_GRID + 1)
+    for x1, y1, x2, y2 in boxes:
+        # Overlap of the box with every column and row, as a fraction of the cell size
+        cols = np.clip(np.minimum(x2, xs[1:]) - np.maximum(x1, xs[:-1]), 0, None) / (width / LAYOUT_GRID)
+        rows = np.clip(np.minimum(y2, ys[1:]) - np.maximum(y1, ys[:-1]), 0, None) / (height / LAYOUT_GRID)
+        grid += np.outer(rows, cols)
+    return np.minimum(grid, 1.0).ravel()
+
+
+def embedding_matrix(features: Sequence[Optional[Sequence[float]]], labels: Sequence[str]) -> np.ndarray:
+    """One row per candidate whose dot products are cosine similarities averaged over three blocks.
+
+    The blocks are the color histogram, the detection layout (frames with no
+    detections share an extra "empty" component) and a one-hot of `labels`
+    (composition or scene type). Each is normalized on its own so none
+    dominates. Candidates without features only compare by label.
+    """
+    count = len(labels)
+    raw = np.zeros((count, COLOR_SIZE + LAYOUT_SIZE))
+    for i, vector in enumerate(features):
+        if vector is not None:
+            raw[i] = vector
+
+    color = raw[:, :COLOR_SIZE]
+    layout = np.hstack([raw[:, COLOR_SIZE:], (raw[:, COLOR_SIZE:].sum(axis=1) == 0)[:, None]])
+    has_features = np.array([vector is not None for vector in features])[:, None]
+    layout *= has_features
+
+    vocabulary, codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    one_hot = np.zeros((count, len(vocabulary)))
+    one_hot[np.arange(count), codes] = 1.0
+
+    blocks = [_unit_rows(block) for block in (color, layout, one_hot)]
+    return np.hstack(blocks) / np.sqrt(len(blocks))
+
+
+def _unit_rows(block: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return block / np.maximum(norms, 1e-12)
@@ -0,0 +1,136 @@
+"""
+Frame Metrics
+Every per-frame image statistic the Disney and Netflix analyzers use, with each color conversion done once into reused buffers
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from perceptual_hash import phash
+
+# Canny thresholds of the Disney visual-interest score
+CANNY_THRESHOLDS = (50, 150)
+
+# Summed-area tables cost about as much as reading each box pixel 7 times:
+# box_color_stats only builds them when boxes overlap more than that
+SUMMED_AREA_BREAK_EVEN = 7.0
+
+
+@dataclass
+class FrameMetrics:
+    """Statistics of one frame; optional ones are None when the kernel was built without them"""
+    mean_bgr: Tuple[float, float, float]
+    brightness: float  # mean over all pixels and channels (0-255)
+    gray_mean: float
+    gray_variance: float
+    phash: str
+    saturation: Optional[float] = None  # mean HSV saturation (0-255)
+    lightness: Optional[float] = None  # mean LAB L on OpenCV's 8-bit scale (0-255)
+    edge_density: Optional[float] = None  # share of Canny edge pixels
+    laplacian_variance: Optional[float] = None  # sharpness
+
+
+class FrameMetricsKernel:
+    """Computes FrameMetrics with one grayscale (and at most one HSV and one LAB) conversion per frame.
+
+    Conversions, edges and the Laplacian are written into buffers allocated
+    once per thread and frame size, and reduced with cv2.mean/meanStdDev
+    instead of NumPy reductions that allocate temporaries. The Laplacian is
+    taken as int16, which is exact for 8-bit input. Safe to share between
+    the frame-analysis worker threads.
+    """
+
+    def __init__(self, saturation: bool = True, lightness: bool = True, edges: bool = True, laplacian: bool = True):
+        self.saturation = saturation
+        self.lightness = lightness
+        self.edges = edges
+        self.laplacian = laplacian
+        self._local = threading.local()
+
+    def compute(self, frame: np.ndarray) -> FrameMetrics:
+        buffers = self._buffers(frame.shape[:2])
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffers['gray'])
+
+        mean_bgr = cv2.mean(frame)[:3]
+        gray_mean, gray_std = cv2.meanStdDev(gray)
+        metrics = FrameMetrics(
+            mean_bgr=mean_bgr,
+            brightness=sum(mean_bgr) / 3.0,
+            gray_mean=float(gray_mean[0, 0]),
+            gray_variance=float(gray_std[0, 0]) ** 2,
+            phash=phash(gray)
+        )
+
+        if self.saturation:
+            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=buffers['hsv'])
+            metrics.saturation = cv2.mean(hsv)[1]
+        if self.lightness:
+            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB, dst=buffers['lab'])
+            metrics.lightness = cv2.mean(lab)[0]
+        if self.edges:
+            edges = cv2.Canny(gray, *CANNY_THRESHOLDS, edges=buffers['edges'])
+            metrics.edge_density = cv2.countNonZero(edges) / edges.size
+        if self.laplacian:
+            laplacian = cv2.Laplacian(gray, cv2.CV_16S, dst=buffers['laplacian'])
+            metrics.laplacian_variance = float(cv2.meanStdDev(laplacian)[1][0, 0]) ** 2
+        return metrics
+
+    def _buffers(self, size: Tuple[int, int]) -> Dict[str, np.ndarray]:
+        """This thread's output buffers, reallocated only when the frame size changes"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers['gray'].shape != size:
+            buffers = {'gray': np.empty(size, dtype=np.uint8)}
+            if self.saturation:
+                buffers['hsv'] = np.empty(size + (3,), dtype=np.uint8)
+            if self.lightness:
+                buffers['lab'] = np.empty(size + (3,), dtype=np.uint8)
+            if self.edges:
+                buffers['edges'] = np.empty(size, dtype=np.uint8)
+            if self.laplacian:
+                buffers['laplacian'] = np.empty(size, dtype=np.int16)
+            self._local.buffers = buffers
+        return buffers
+
+
+def box_color_stats(frame: np.ndarray, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-channel mean and standard deviation of the pixels inside each integer box (x1, y1, x2, y2).
+
+    Boxes must already be clipped to the frame; empty ones get zeros. Each
+    box is reduced in place with cv2.meanStdDev (no ROI copies), or, when
+    the boxes cover their bounding rectangle more than SUMMED_AREA_BREAK_EVEN
+    times (crowds), from one pair of summed-area tables of that rectangle
+    with four lookups per box.
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    means = np.zeros((len(boxes), 3))
+    stds = np.zeros((len(boxes), 3))
+    filled = np.flatnonzero(areas > 0)
+    if len(filled) == 0:
+        return means, stds
+
+    left, top = x1[filled].min(), y1[filled].min()
+    right, bottom = x2[filled].max(), y2[filled].max()
+    if areas.sum() <= SUMMED_AREA_BREAK_EVEN * (right - left) * (bottom - top):
+        for i in filled:
+            mean, std = cv2.meanStdDev(frame[y1[i]:y2[i], x1[i]:x2[i]])
+            means[i], stds[i] = mean.ravel(), std.ravel()
+        return means, stds
+
+    sums, squares = cv2.integral2(frame[top:bottom, left:right], sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    rows = (y1[filled] - top, y2[filled] - top)
+    cols = (x1[filled] - left, x2[filled] - left)
+    count = areas[filled][:, None]
+    means[filled] = _box_sums(sums, rows, cols) / count
+    variance = _box_sums(squares, rows, cols) / count - means[filled] ** 2
+    stds[filled] = np.sqrt(np.maximum(variance, 0.0))
+    return means, stds
+
+
+def _box_sums(table: np.ndarray, rows: Tuple[np.ndarray, np.ndarray], cols: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    (top, bottom), (left, right) = rows, cols
+    return table[bottom, right] - table[top, right] - table[bottom, left] + table[top, left]
@@ -0,0 +1,187 @@
+"""
+Staged Frame Pipeline
+Overlaps frame decoding, batched YOLO inference and per-frame OpenCV analysis
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from frame_sampling import SampledFrame, batched
+from growing_file import stop_waits_on
+
+# (frame_number, timestamp, frame, detections, analysis)
+PipelineResult = Tuple[int, float, np.ndarray, Any, Any]
+
+_END = object()
+
+# Seconds run() waits for the decoder thread to exit once the pipeline stops
+DECODER_JOIN_TIMEOUT = 5.0
+
+
+@dataclass
+class StageTimings:
+    """Seconds spent in each pipeline stage.
+
+    decode/inference/analysis are busy time (analysis is summed over the
+    CPU pool), the *_wait fields show where a stage sat blocked.
+    """
+    decode: float = 0.0
+    inference: float = 0.0
+    analysis: float = 0.0
+    decode_wait: float = 0.0      # decoder blocked on a full queue (inference is the bottleneck)
+    inference_wait: float = 0.0   # inference blocked on an empty queue (decode is the bottleneck)
+    wall: float = 0.0
+    frames: int = 0
+    batches: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(self).items()}
+        data['fps'] = round(self.frames / self.wall, 2) if self.wall > 0 else 0.0
+        return data
+
+    def summary(self) -> str:
+        return (f"decode {self.decode:.2f}s | inference {self.inference:.2f}s | "
+                f"analysis {self.analysis:.2f}s (pool) | wall {self.wall:.2f}s | "
+                f"{self.frames} frames")
+
+
+class FramePipeline:
+    """Producer/consumer pipeline over sampled frames.
+
+    A decoder thread fills a bounded queue with mini-batches, the calling
+    thread runs batched inference, and a thread pool runs the per-frame
+    analysis (OpenCV releases the GIL). Results come back in frame order.
+    Memory is bounded by queue_size batches waiting for inference plus
+    queue_size batches in analysis.
+    """
+
+    def __init__(
+        self,
+        detect_batch: Callable[[List[np.ndarray]], List[Any]],
+        analyze: Callable[[int, float, np.ndarray, Any], Any],
+        batch_size: int = 8,
+        queue_size: int = 4,
+        workers: Optional[int] = None
+    ):
+        self.detect_batch = detect_batch
+        self.analyze = analyze
+        self.batch_size = max(1, int(batch_size))
+        self.queue_size = max(1, int(queue_size))
+        self.workers = max(1, int(workers or min(4, os.cpu_count() or 1)))
+        self.timings = StageTimings()
+        self._timing_lock = threading.Lock()
+
+    def run(self, frames: Iterable[SampledFrame]) -> Iterator[PipelineResult]:
+        """Yield (frame_number, timestamp, frame, detections, analysis) in frame order"""
+        self.timings = StageTimings()
+        started = time.perf_counter()
+
+        batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        decoder = threading.Thread(
+            target=self._decode, args=(frames, batches, stop), name='frame-decoder', daemon=True
+        )
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='frame-analysis')
+        in_flight: deque = deque()
+
+        decoder.start()
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                batch = batches.get()
+                self.timings.inference_wait += time.perf_counter() - wait_start
+
+                if batch is _END:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+
+                inference_start = time.perf_counter()
+                detections = self.detect_batch([frame for _, _, frame in batch])
+                self.timings.inference += time.perf_counter() - inference_start
+                self.timings.batches += 1
+
+                futures = [
+                    executor.submit(self._analyze, frame_number, timestamp, frame, dets)
+                    for (frame_number, timestamp, frame), dets in zip(batch, detections)
+                ]
+                in_flight.append((batch, detections, futures))
+
+                # Keep inference ahead of analysis, but never more than queue_size batches
+                while len(in_flight) > self.queue_size or (in_flight and in_flight[0][2][-1].done()):
+                    yield from self._drain(in_flight.popleft())
+
+            while in_flight:
+                yield from self._drain(in_flight.popleft())
+        finally:
+            stop.set()
+            # Unblock a decoder waiting on a full queue; one stuck elsewhere is left
+            # behind (it is a daemon thread) rather than holding up the caller
+            join_deadline = time.perf_counter() + DECODER_JOIN_TIMEOUT
+            while decoder.is_alive() and time.perf_counter() < join_deadline:
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    pass
+                decoder.join(0.05)
+            if decoder.is_alive():
+                print(f"⚠ Frame decoder did not stop within {DECODER_JOIN_TIMEOUT:.0f}s, leaving it behind")
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.timings.wall = time.perf_counter() - started
+
+    def _drain(self, entry) -> Iterator[PipelineResult]:
+        batch, detections, futures = entry
+        for (frame_number, timestamp, frame), dets, future in zip(batch, detections, futures):
+            self.timings.frames += 1
+            yield frame_number, timestamp, frame, dets, future.result()
+
+    def _analyze(self, frame_number: int, timestamp: float, frame: np.ndarray, detections: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.analyze(frame_number, timestamp, frame, detections)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._timing_lock:
+                self.timings.analysis += elapsed
+
+    def _decode(self, frames: Iterable[SampledFrame], batches: queue.Queue, stop: threading.Event):
+        """Decoder thread: read sampled frames, batch them and push into the bounded queue"""
+        iterator = iter(frames)
+        try:
+            grouped = batched(iterator, self.batch_size)
+            # A decoder following an upload stops waiting for bytes once the pipeline stops
+            with stop_waits_on(stop):
+                while not stop.is_set():
+                    decode_start = time.perf_counter()
+                    item = next(grouped, _END)
+                    self.timings.decode += time.perf_counter() - decode_start
+                    if not self._put(batches, item, stop) or item is _END:
+                        return
+        except BaseException as e:
+            self._put(batches, e, stop)
+        finally:
+            # Release the capture held by the sampler generator
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    def _put(self, batches: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        wait_start = time.perf_counter()
+        try:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.timings.decode_wait += time.perf_counter() - wait_start
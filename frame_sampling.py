@@ -0,0 +1,412 @@
+"""
+Frame Sampling Engine
+Reads only the frames the pipelines analyze instead of decoding and converting every frame
+"""
+
+import time
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from growing_file import GrowingFile, is_partial, wait_until_complete
+from pipeline_progress import ProgressCallback, report_progress
+from shot_detection import Shot, ShotDetector
+
+# Optional: PyAV enables true keyframe-only decoding
+try:
+    import av
+except ImportError:
+    av = None
+
+STRATEGIES = ('auto', 'grab', 'seek', 'keyframe', 'shots')
+
+# Strategies that pick their own frames instead of following the sampling grid
+OFF_GRID_STRATEGIES = ('keyframe', 'shots')
+
+# (frame_number, timestamp, BGR frame)
+SampledFrame = Tuple[int, float, np.ndarray]
+
+
+def batched(frames: Iterable[SampledFrame], batch_size: int) -> Iterator[List[SampledFrame]]:
+    """Group sampled frames into mini-batches for batched inference"""
+    batch_size = max(1, int(batch_size))
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def sampling_key(strategy: str) -> str:
+    """Analysis-cache component: off-grid strategies analyze different frames than the grid"""
+    return strategy if strategy in OFF_GRID_STRATEGIES else 'grid'
+
+
+class FrameSampler:
+    """Yields frames on a fixed sampling grid using the cheapest access pattern for the file.
+
+    Strategies:
+      grab      - cap.grab() every frame, cap.retrieve() (BGR conversion + copy) only for samples
+      seek      - jump to each sample with CAP_PROP_POS_FRAMES, grabbing through short gaps
+      keyframe  - decode I-frames only (PyAV); timestamps follow the keyframes, not the grid
+      shots     - scan a few frames per second for cuts and yield the steadiest frame(s)
+                  of each shot (see shot_detection.py); boundaries land in `shots`
+      auto      - probes the file and picks grab or seek; both return exactly the
+                  frame numbers and timestamps of a sequential cap.read() loop
+
+    A video whose upload is still in progress (see growing_file) is decoded
+    sequentially with PyAV as bytes arrive ('follow'), so analysis overlaps
+    the upload. Without PyAV, or for a container it cannot stream, the
+    sampler waits for the upload to finish first.
+    """
+
+    PROBE_FRAMES = 48
+    # Frames per second scanned for shot boundaries; shots shorter than one scan step can be missed
+    SHOT_SCAN_RATE = 8
+
+    def __init__(
+        self,
+        video_path: str,
+        strategy: str = 'auto',
+        analysis_width: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy '{strategy}', expected one of {STRATEGIES}")
+
+        self.video_path = str(video_path)
+        self.requested_strategy = strategy
+        self.strategy: Optional[str] = None
+        self.shots: List[Shot] = []
+
+        # Seeks are only used for gaps longer than this many frames
+        self.seek_gap = 0
+        # The upload being decoded in 'follow' mode (for progress)
+        self._growing: Optional[GrowingFile] = None
+
+        self.following = is_partial(self.video_path) and av is not None and self._probe_growing()
+        if not self.following:
+            if is_partial(self.video_path):
+                print("   Upload in progress, waiting for it to complete before decoding")
+                # Progress calls are also the cancellation point, so a cancelled job stops waiting
+                wait_until_complete(
+                    self.video_path,
+                    on_poll=lambda: report_progress(progress, 'Waiting for upload', 0.0)
+                )
+            self._probe_capture()
+
+        # Frames are yielded as downscaled proxies when the video is wider than analysis_width;
+        # multiply proxy coordinates by 1 / scale to get back to native pixels
+        self.scale = 1.0
+        if analysis_width and self.width > analysis_width:
+            self.scale = analysis_width / self.width
+
+    def _probe_capture(self):
+        cap = cv2.VideoCapture(self.video_path)
+        self.opened = cap.isOpened()
+        self.fps = cap.get(cv2.CAP_PROP_FPS) if self.opened else 0.0
+        self.total_frames = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))) if self.opened else 0
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) if self.opened else 0
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) if self.opened else 0
+        cap.release()
+
+    def _probe_growing(self) -> bool:
+        """Read stream parameters from the part of an upload already on disk"""
+        try:
+            with GrowingFile(self.video_path) as f, av.open(f) as container:
+                stream = container.streams.video[0]
+                self.fps = float(stream.average_rate or stream.guessed_rate or 0)
+                self.width = stream.codec_context.width
+                self.height = stream.codec_context.height
+        except (av.FFmpegError, IndexError, TimeoutError) as e:
+            print(f"   ⚠ Cannot stream this upload ({e}), waiting for it to complete")
+            return False
+
+        # The frame count is unknown until the upload finishes
+        self.total_frames = 0
+        self.opened = self.fps > 0
+        return self.opened
+
+    @property
+    def downscaled(self) -> bool:
+        return self.scale < 1.0
+
+    def is_opened(self) -> bool:
+        return self.opened
+
+    def progress(self, frame_number: int) -> float:
+        """Share of the video sampled once `frame_number` is reached.
+
+        While following an upload the frame count is still unknown, so this is
+        the share of the upload's bytes the decoder has read instead.
+        """
+        if self._growing is not None:
+            return self._growing.progress()
+        if self.total_frames > 0:
+            return frame_number / self.total_frames
+        return 0.0
+
+    def sample(self, intervals: Sequence[int], start: int = 0, end: Optional[int] = None) -> Iterator[SampledFrame]:
+        """Yield every frame whose number is a multiple of any of the intervals.
+
+        start/end restrict sampling to frames [start, end) of the grid, for
+        time-segmented analysis; only grab and seek support a range.
+        """
+        if not self.opened:
+            return
+
+        intervals = sorted({max(1, int(i)) for i in intervals})
+        self.strategy = 'follow' if self.following else self._choose_strategy(intervals)
+        print(f"   Sampling strategy: {self.strategy}"
+              + (f" (seek for gaps > {self.seek_gap} frames)" if self.strategy == 'seek' else ''))
+
+        if (start or end is not None) and self.strategy in ('follow',) + OFF_GRID_STRATEGIES:
+            raise ValueError(f"'{self.strategy}' sampling cannot start mid-video")
+
+        if self.strategy == 'follow' and self.requested_strategy == 'shots':
+            frames = self._sample_shots(self._sample_follow([self._shot_scan_interval()]))
+        elif self.strategy == 'follow':
+            frames = self._sample_follow(intervals)
+        elif self.strategy == 'keyframe':
+            frames = self._sample_keyframes()
+        elif self.strategy == 'shots':
+            frames = self._sample_shots(self._sample_grab([self._shot_scan_interval()]))
+        elif self.strategy == 'seek':
+            frames = self._sample_seek(intervals, start, end)
+        else:
+            frames = self._sample_grab(intervals, start, end)
+
+        if not self.downscaled:
+            yield from frames
+            return
+
+        size = (max(1, round(self.width * self.scale)), max(1, round(self.height * self.scale)))
+        try:
+            for frame_number, timestamp, frame in frames:
+                yield frame_number, timestamp, cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        finally:
+            frames.close()
+
+    def _choose_strategy(self, intervals: List[int]) -> str:
+        """Resolve 'auto' by timing grabs against seeks on this file"""
+        if self.requested_strategy == 'keyframe':
+            if av is None:
+                raise RuntimeError("Keyframe sampling requires PyAV (pip install av)")
+            return 'keyframe'
+
+        if self.requested_strategy in ('grab', 'shots'):
+            return self.requested_strategy
+
+        # Seeking needs a reliable frame count to enumerate targets
+        if self.total_frames <= 0 or not self.fps:
+            return 'grab'
+
+        probe = self._probe_seek()
+        if self.requested_strategy == 'seek':
+            # Explicit request: seek whenever it beats grabbing, even if not frame-exact
+            self.seek_gap = probe[1] if probe is not None else 1
+            return 'seek'
+
+        if probe is None:
+            return 'grab'
+        accurate, break_even = probe
+
+        # auto: only seek when it lands on the exact frame and some gap is worth skipping
+        if not accurate or max(intervals) <= break_even:
+            return 'grab'
+        self.seek_gap = break_even
+        return 'seek'
+
+    def _probe_seek(self) -> Optional[Tuple[bool, int]]:
+        """Measure grab vs. seek cost; returns (seek is frame-accurate, break-even gap in frames)"""
+        probe_frames = min(self.PROBE_FRAMES, self.total_frames)
+        if probe_frames < 2:
+            return None
+
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            reference_index = probe_frames - 1
+            reference = None
+
+            start = time.perf_counter()
+            for i in range(probe_frames):
+                if not cap.grab():
+                    return None
+                if i == reference_index:
+                    ok, reference = cap.retrieve()
+                    if not ok:
+                        return None
+            grab_cost = (time.perf_counter() - start) / probe_frames
+
+            # Seek cost is measured far from the current position, like a real jump
+            far_target = max(reference_index, self.total_frames // 2)
+            start = time.perf_counter()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, far_target)
+            ok, _ = cap.read()
+            seek_cost = time.perf_counter() - start
+            if not ok:
+                return None
+
+            # Accuracy: seeking back must return exactly the frame a sequential read saw
+            cap.set(cv2.CAP_PROP_POS_FRAMES, reference_index)
+            ok, frame = cap.read()
+            accurate = ok and frame is not None and np.array_equal(frame, reference)
+        finally:
+            cap.release()
+
+        break_even = int(seek_cost / max(grab_cost, 1e-6)) + 1
+        return accurate, break_even
+
+    def _is_target(self, frame_number: int, intervals: List[int]) -> bool:
+        return any(frame_number % i == 0 for i in intervals)
+
+    def _targets(self, intervals: List[int], start: int = 0, end: Optional[int] = None) -> List[int]:
+        """Sorted union of the sampling grids in [start, end), at most up to the reported frame count"""
+        stop = self.total_frames if end is None else min(end, self.total_frames)
+        targets = set()
+        for interval in intervals:
+            first = -(-start // interval) * interval
+            targets.update(range(first, stop, interval))
+        return sorted(targets)
+
+    def seek_is_accurate(self) -> bool:
+        """Whether CAP_PROP_POS_FRAMES lands exactly on the requested frame in this file"""
+        probe = self._probe_seek() if self.total_frames > 0 and not self.following else None
+        return probe is not None and probe[0]
+
+    def read_frames(self, frame_numbers: Sequence[Optional[int]]) -> List[Optional[np.ndarray]]:
+        """Native-resolution frames at arbitrary indices, in request order (None where unreadable).
+
+        The distinct targets are visited in sorted order on a single capture,
+        grabbing (no BGR conversion) through the frames in between. Gaps
+        longer than the grab/seek break-even are jumped only when seeks are
+        frame-accurate for this file, so every frame matches a full decode.
+        """
+        targets = sorted({int(n) for n in frame_numbers if n is not None and n >= 0})
+        if not targets:
+            return [None] * len(frame_numbers)
+
+        seek_gap = 0
+        if self.total_frames > 0 and not self.following and max(np.diff([0] + targets)) > self.PROBE_FRAMES:
+            probe = self._probe_seek()
+            if probe is not None and probe[0]:
+                seek_gap = probe[1]
+
+        frames = {}
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            position = 0  # frame number the next grab/read returns
+            for target in targets:
+                gap = target - position
+                if seek_gap and gap > seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                elif not all(cap.grab() for _ in range(gap)):
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames[target] = frame
+                position = target + 1
+        finally:
+            cap.release()
+
+        return [frames.get(int(n)) if n is not None else None for n in frame_numbers]
+
+    def _sample_grab(self, intervals: List[int], start: int = 0, end: Optional[int] = None) -> Iterator[SampledFrame]:
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if start:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            frame_number = start
+            while (end is None or frame_number < end) and cap.grab():
+                if self._is_target(frame_number, intervals):
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    yield frame_number, frame_number / self.fps, frame
+                frame_number += 1
+        finally:
+            cap.release()
+
+    def _sample_seek(self, intervals: List[int], start: int = 0, end: Optional[int] = None) -> Iterator[SampledFrame]:
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if start:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            position = start  # frame number the next grab/read returns
+            for target in self._targets(intervals, start, end):
+                gap = target - position
+                if self.seek_gap and gap > self.seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                else:
+                    for _ in range(gap):
+                        if not cap.grab():
+                            return
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                position = target + 1
+                yield target, target / self.fps, frame
+        finally:
+            cap.release()
+
+    def _shot_scan_interval(self) -> int:
+        return max(1, int(round((self.fps or 30.0) / self.SHOT_SCAN_RATE)))
+
+    def _sample_shots(self, scan: Iterator[SampledFrame]) -> Iterator[SampledFrame]:
+        """Representative frames of each shot, yielded as soon as the shot ends"""
+        self.shots = []
+        try:
+            for shot, representatives in ShotDetector(self.fps).detect(scan):
+                self.shots.append(shot)
+                yield from representatives
+        finally:
+            scan.close()
+
+        # The scan stops short of the last few frames; the final shot runs to the end
+        if self.shots and self.total_frames > self.shots[-1].end_frame:
+            self.shots[-1].end_frame = self.total_frames
+
+    def _sample_keyframes(self) -> Iterator[SampledFrame]:
+        container = av.open(self.video_path)
+        try:
+            stream = container.streams.video[0]
+            stream.codec_context.skip_frame = 'NONKEY'
+            fps = self.fps or float(stream.average_rate or 0) or 30.0
+            for frame in container.decode(stream):
+                if frame.pts is None:
+                    continue
+                frame_number = int(round(float(frame.pts * stream.time_base) * fps))
+                yield frame_number, frame_number / fps, frame.to_ndarray(format='bgr24')
+        finally:
+            container.close()
+
+    def _sample_follow(self, intervals: List[int]) -> Iterator[SampledFrame]:
+        """Decode an upload in progress front to back, blocking whenever the decoder catches up"""
+        keyframes_only = self.requested_strategy == 'keyframe'
+        with GrowingFile(self.video_path) as f, av.open(f) as container:
+            self._growing = f
+            try:
+                stream = container.streams.video[0]
+                stream.thread_type = 'AUTO'
+                if keyframes_only:
+                    stream.codec_context.skip_frame = 'NONKEY'
+
+                frame_number = -1
+                for frame_number, frame in enumerate(container.decode(stream)):
+                    if keyframes_only:
+                        if frame.pts is None:
+                            continue
+                        number = int(round(float(frame.pts * stream.time_base) * self.fps))
+                        yield number, number / self.fps, frame.to_ndarray(format='bgr24')
+                    elif self._is_target(frame_number, intervals):
+                        yield frame_number, frame_number / self.fps, frame.to_ndarray(format='bgr24')
+
+                if not keyframes_only:
+                    self.total_frames = frame_number + 1
+            finally:
+                self._growing = None
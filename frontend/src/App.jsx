@@ -305,6 +305,9 @@ const App = () => {
                     <div className="aspect-[16/9] bg-gray-800">
                       <img
                         src={thumb.url}
+                        // w= serves a smaller rendition (WebP when the browser accepts it); url may already carry ?v=
+                        srcSet={[480, 960].map((w) => `${thumb.url}${thumb.url.includes('?') ? '&' : '?'}w=${w} ${w}w`).concat(`${thumb.url} 1920w`).join(', ')}
+                        sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
                         alt={`Thumbnail ${index + 1}`}
                         className="w-full h-full object-cover"
                         loading="lazy"
@@ -0,0 +1,173 @@
+"""
+Growing File Reader
+Lets the pipelines read a video while its upload is still being written to disk
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# An upload in progress is marked by "<video>.partial" holding its declared size;
+# the uploader removes the marker once the last byte is on disk
+PARTIAL_SUFFIX = '.partial'
+
+POLL_INTERVAL = 0.2
+STALL_TIMEOUT = 600.0
+
+# Event that stops waits for upload bytes on the current thread (see stop_waits_on)
+_waits = threading.local()
+
+
+def is_partial(path: str) -> bool:
+    return os.path.exists(str(path) + PARTIAL_SUFFIX)
+
+
+def partial_info(path: str) -> Optional[Dict[str, Any]]:
+    """Contents of the upload marker, or None once the upload is complete"""
+    try:
+        with open(str(path) + PARTIAL_SUFFIX, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        return {}
+
+
+def mark_partial(path: str, **info):
+    with open(str(path) + PARTIAL_SUFFIX, 'w') as f:
+        json.dump(info, f)
+
+
+def mark_complete(path: str):
+    try:
+        os.remove(str(path) + PARTIAL_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def stop_waits_on(stop: threading.Event):
+    """Make waits for upload bytes on this thread raise InterruptedError once stop is set"""
+    previous = getattr(_waits, 'stop', None)
+    _waits.stop = stop
+    try:
+        yield
+    finally:
+        _waits.stop = previous
+
+
+def _pause(path: str, poll_interval: float):
+    """Sleep until the next poll, unless this thread was told to stop waiting"""
+    stop = getattr(_waits, 'stop', None)
+    if stop is None:
+        time.sleep(poll_interval)
+    elif stop.wait(poll_interval):
+        raise InterruptedError(f"Stopped waiting for the upload of {os.path.basename(path)}")
+
+
+def wait_until_complete(
+    path: str,
+    stall_timeout: float = STALL_TIMEOUT,
+    poll_interval: float = POLL_INTERVAL,
+    on_poll: Optional[Callable[[], None]] = None
+):
+    """Block until the upload marker is gone; raises TimeoutError if the file stops growing.
+
+    on_poll runs before every poll, so a caller can abort the wait by raising from it.
+    """
+    size = -1
+    last_growth = time.time()
+    while is_partial(path):
+        if on_poll is not None:
+            on_poll()
+        current = os.path.getsize(path) if os.path.exists(path) else 0
+        if current != size:
+            size, last_growth = current, time.time()
+        elif time.time() - last_growth > stall_timeout:
+            raise TimeoutError(f"Upload of {os.path.basename(path)} stalled at {size} bytes")
+        _pause(path, poll_interval)
+
+
+class GrowingFile:
+    """Seekable read-only file object that waits for bytes the uploader hasn't written yet.
+
+    Reads past the current end block until more data arrives, and only
+    return EOF once the upload is complete. Seeking relative to the end
+    uses the declared upload size (or waits for completion if unknown).
+    Inside stop_waits_on, a blocked read gives up as soon as the event is set.
+    """
+
+    def __init__(self, path: str, stall_timeout: float = STALL_TIMEOUT, poll_interval: float = POLL_INTERVAL):
+        self.path = str(path)
+        self.stall_timeout = stall_timeout
+        self.poll_interval = poll_interval
+        self._file = open(self.path, 'rb')
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            self._pos = offset
+        elif whence == os.SEEK_CUR:
+            self._pos += offset
+        elif whence == os.SEEK_END:
+            self._pos = self._final_size() + offset
+        else:
+            raise ValueError(f"Unsupported whence: {whence}")
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        last_growth = time.time()
+        while True:
+            self._file.seek(self._pos)
+            data = self._file.read(size)
+            if data:
+                self._pos += len(data)
+                return data
+
+            if not is_partial(self.path):
+                # The marker may have gone between the read and the check
+                self._file.seek(self._pos)
+                data = self._file.read(size)
+                self._pos += len(data)
+                return data
+
+            if time.time() - last_growth > self.stall_timeout:
+                raise TimeoutError(f"Upload of {os.path.basename(self.path)} stalled at {self._pos} bytes")
+            _pause(self.path, self.poll_interval)
+
+    def progress(self) -> float:
+        """Share of the upload read so far (0 while its size is unknown)"""
+        info = partial_info(self.path)
+        if info is None:
+            size = os.path.getsize(self.path)
+        else:
+            size = int(info.get('size') or 0)
+        return min(1.0, self._pos / size) if size else 0.0
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'GrowingFile':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _final_size(self) -> int:
+        info = partial_info(self.path)
+        if info and info.get('size'):
+            return int(info['size'])
+        wait_until_complete(self.path, self.stall_timeout, self.poll_interval)
+        return os.path.getsize(self.path)
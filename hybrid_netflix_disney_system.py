@@ -3,10 +3,9 @@ Hybrid Netflix + Disney+ Thumbnail Generation System
 Combines the best of both systems for maximum diversity and quality
 """
 
-import cv2
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import argparse
 import sys
@@ -15,17 +14,46 @@ import sys
 from run_netflix_system import NetflixSimplifiedSystem
 from disney_complete_system import DisneyCompleteThumbnailSystem
 from disney_metadata_spec import DisneyMetadataBuilder
+from candidate_store import CandidateStore, candidate_frames
+from candidate_table import CandidateTable
+from frame_pipeline import FramePipeline
+from frame_sampling import FrameSampler, OFF_GRID_STRATEGIES, STRATEGIES
+from perceptual_hash import HashIndex
+from frame_features import embedding_matrix
+from thumbnail_encoding import attach_encodings, get_thumbnail_encoder
+from variant_selection import SELECTION_STRATEGIES, VariantSelector, mmr_select
+from pipeline_progress import ProgressCallback, report_progress, scoped_progress
+from result_manifest import manifest_entry, write_manifest
+from segmented_analysis import SegmentedAnalyzer
 
 
 class HybridThumbnailSystem:
     """Combines Netflix and Disney+ systems for optimal results"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        sampling_strategy: str = "auto",
+        analysis_width: Optional[int] = None,
+        segments: int = 1,
+        selection_strategy: str = "categories"
+    ):
         print("🚀 Initializing Hybrid Netflix + Disney+ System...")
         
         # Initialize both systems
-        self.netflix_system = NetflixSimplifiedSystem(genre="action", title="Hybrid", num_variants=10)
+        self.netflix_system = NetflixSimplifiedSystem(
+            genre="action", title="Hybrid", num_variants=10,
+            sampling_strategy=sampling_strategy, analysis_width=analysis_width, segments=segments,
+            selection_strategy=selection_strategy
+        )
         self.disney_system = DisneyCompleteThumbnailSystem()
+        self.disney_system.config.sampling_strategy = sampling_strategy
+        self.disney_system.config.analysis_width = analysis_width
+        self.disney_system.config.segments = segments
+        self.disney_system.config.selection_strategy = selection_strategy
+        self.segments = segments
+        self.selection_strategy = selection_strategy  # categories or mmr (see variant_selection.py)
+        self._segmented = None
+        self.last_timings = None
         
         print("✓ Netflix System: Active")
         print("✓ Disney+ System: Active")
@@ -38,7 +66,8 @@ class HybridThumbnailSystem:
         genre: List[str],
         characters: List[str],
         num_variants: int = 20,
-        output_dir: Optional[str] = None
+        output_dir: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
     ) -> Dict[str, Any]:
         """Process video with both systems and combine results"""
         
@@ -50,11 +79,31 @@ class HybridThumbnailSystem:
         print(f"Requested Variants: {num_variants}")
         
         content_id = Path(video_path).stem
+        if output_dir is None:
+            output_dir = f"{content_id}_hybrid_final"
+        disney_metadata = self.disney_system.build_metadata(video_path, title, genre, characters)
+        
+        # 0. Decode and detect once for both systems
+        print("\n0️⃣ Shared Frame Analysis...")
+        netflix_analyses, disney_candidates = self._shared_analysis_pass(
+            video_path,
+            disney_metadata,
+            progress=scoped_progress(progress, 0.0, 0.8, 'Shared Frame Analysis')
+        )
+        print(f"✓ Analyzed {len(netflix_analyses)} Netflix frames and {len(disney_candidates)} Disney+ candidates")
         
         # 1. Run Netflix System
         print("\n1️⃣ Running Netflix System...")
-        netflix_output_dir = f"{content_id}_netflix_hybrid"
-        netflix_results = self.netflix_system.process(video_path, netflix_output_dir)
+        # Intermediate outputs live inside the final directory, not next to it, and are never served:
+        # only the final thumbnails get renditions
+        netflix_output_dir = str(Path(output_dir) / "netflix")
+        netflix_results = self.netflix_system.process(
+            video_path,
+            netflix_output_dir,
+            progress=scoped_progress(progress, 0.8, 0.85, 'Running Netflix System'),
+            analyses=netflix_analyses,
+            renditions=False
+        )
         
         # Netflix system returns a list, not dict
         netflix_variants = netflix_results if isinstance(netflix_results, list) else netflix_results.get('variants', [])
@@ -68,50 +117,195 @@ class HybridThumbnailSystem:
             genre=genre,
             characters=characters,
             num_variants=15,
-            output_dir=f"{content_id}_disney_hybrid"
+            output_dir=str(Path(output_dir) / "disney"),
+            progress=scoped_progress(progress, 0.85, 0.9, 'Running Disney+ System'),
+            candidates=disney_candidates,
+            renditions=False
         )
         print(f"✓ Disney+ generated {len(disney_results.get('variants', {}).get('variants', []))} thumbnails")
         
         # 3. Combine and deduplicate results
         print("\n3️⃣ Combining Results...")
-        combined_thumbnails = self._combine_results(netflix_variants, disney_results, video_path)
+        report_progress(progress, 'Combining Results', 0.9)
+        combined_thumbnails = self._combine_results(netflix_variants, disney_results)
         print(f"✓ Combined {len(combined_thumbnails)} unique thumbnails")
         
         # 4. Select best diverse variants
         print("\n4️⃣ Selecting Best Variants...")
+        report_progress(progress, 'Selecting Best Variants', 0.92)
         final_variants = self._select_diverse_variants(combined_thumbnails, num_variants)
         print(f"✓ Selected {len(final_variants)} final variants")
         
         # 5. Save final results
         print("\n5️⃣ Saving Final Results...")
-        if output_dir is None:
-            output_dir = f"{content_id}_hybrid_final"
-        
+        report_progress(progress, 'Saving Final Results', 0.95)
         final_results = self._save_final_results(
             final_variants, 
             output_dir, 
             title, 
             genre, 
-            content_id
+            content_id,
+            video_path
         )
+        report_progress(progress, 'Complete', 1.0)
         
         return final_results
     
+    def _shared_analysis_pass(
+        self,
+        video_path: str,
+        disney_metadata,
+        progress: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Dict[str, Any]], CandidateStore]:
+        """Decode the video once, run YOLO once per sampled frame and feed both systems"""
+        strategy = self.netflix_system.sampling_strategy
+        sampler = FrameSampler(video_path, strategy, self.netflix_system.analysis_width, progress)
+        self.last_timings = None
+        generator = self.disney_system.thumbnail_generator
+        generator.last_shots = []
+        if not sampler.is_opened():
+            return [], []
+        
+        netflix_interval = self.netflix_system.SAMPLE_INTERVAL
+        disney_interval = max(1, generator.sample_interval(sampler.fps))
+        # Detections can only be reused when both systems run the same weights;
+        # otherwise the Disney+ detector runs its own batched pass
+        shared_model = generator.character_detector.yolo is self.netflix_system.yolo
+        # Keyframes and shot representatives are off the sampling grid, so both systems see every one
+        off_grid = strategy in OFF_GRID_STRATEGIES
+        
+        # Both sections cached (e.g. the same upload with another genre): skip decoding entirely
+        netflix = self.netflix_system
+        netflix_key = netflix.analysis_cache_key(video_path, sampler)
+        disney_key = generator.analysis_cache_key(video_path, sampler)
+        observations = netflix.analysis_cache.get(netflix_key, 'netflix') if netflix_key else None
+        columns = generator.analysis_cache.get_columns(disney_key, 'disney') if disney_key else None
+        if observations is not None and columns is not None:
+            table = CandidateTable.from_record_columns(columns)
+            print(f"   Loaded {len(observations)} Netflix and {len(table)} Disney+ analyzed frames from cache")
+            generator.load_cached_shots(disney_key)
+            return (
+                netflix.analyses_from_observations(observations),
+                generator.candidates_from_table(table, disney_metadata)
+            )
+        
+        # Long videos: both systems' records from parallel time segments, scored like cached records
+        segmented = self._analyze_segments(video_path, sampler, progress)
+        if segmented is not None:
+            observations, records = segmented['netflix'], segmented['disney']
+            print(f"   Stage timings: {self.last_timings.summary()}")
+            if netflix_key:
+                netflix.analysis_cache.put(netflix_key, 'netflix', observations)
+            if disney_key:
+                generator.analysis_cache.put(disney_key, 'disney', records)
+            return (
+                netflix.analyses_from_observations(observations),
+                generator.candidates_from_records(records, disney_metadata)
+            )
+        
+        def for_netflix(frame_number: int) -> bool:
+            return off_grid or frame_number % netflix_interval == 0
+        
+        def for_disney(frame_number: int) -> bool:
+            return off_grid or frame_number % disney_interval == 0
+        
+        def detect_batch(frames):
+            netflix_detections = netflix.detect_batch(frames)
+            if shared_model:
+                return [(d, d) for d in netflix_detections]
+            return list(zip(netflix_detections, generator.character_detector.detect_batch(frames)))
+        
+        def analyze(frame_number, timestamp, frame, detections):
+            netflix_detections, disney_detections = detections
+            observation = None
+            scene_analysis = None
+            if for_netflix(frame_number):
+                observation = netflix.observe_frame(frame, timestamp, frame_number, netflix_detections)
+            if for_disney(frame_number):
+                scene_analysis = generator.scene_analyzer.analyze_scene(frame, timestamp, disney_detections)
+                scene_analysis = generator.scene_analyzer.to_native(scene_analysis, sampler.scale)
+            return observation, scene_analysis
+        
+        config = generator.config
+        pipeline = FramePipeline(
+            detect_batch, analyze,
+            batch_size=config.batch_size,
+            queue_size=config.pipeline_queue_size,
+            workers=config.analysis_workers
+        )
+        
+        observations = []
+        records = []
+        # Proxy frames are never saved: keep frame numbers and re-extract at full resolution
+        disney_candidates = generator.new_candidate_store('index' if sampler.downscaled else None)
+        
+        samples = sampler.sample([netflix_interval, disney_interval])
+        for frame_number, timestamp, frame, _, (observation, scene_analysis) in pipeline.run(samples):
+            if observation is not None:
+                observations.append(observation)
+            
+            if scene_analysis is not None:
+                records.append({'frame_number': frame_number, 'timestamp': timestamp, 'analysis': scene_analysis})
+                # Scoring stays sequential: the diversity factor depends on earlier candidates
+                candidate = generator.build_candidate(
+                    frame, timestamp, disney_metadata, disney_candidates,
+                    analysis=scene_analysis, frame_number=frame_number
+                )
+                if candidate is not None:
+                    disney_candidates.add(candidate)
+            
+            report_progress(progress, 'Analyzing frames', sampler.progress(frame_number))
+        
+        self.last_timings = pipeline.timings
+        print(f"   Stage timings: {pipeline.timings.summary()}")
+        if netflix_key:
+            netflix.analysis_cache.put(netflix_key, 'netflix', observations)
+        if disney_key:
+            generator.analysis_cache.put(disney_key, 'disney', records)
+        generator.record_shots(sampler, disney_key)
+        
+        netflix_analyses = netflix.analyses_from_observations(observations)
+        return netflix_analyses, disney_candidates
+    
+    def _analyze_segments(
+        self,
+        video_path: str,
+        sampler: FrameSampler,
+        progress: Optional[ProgressCallback] = None
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Netflix and Disney+ records from parallel time segments, or None when the video is not split"""
+        if self.segments <= 1:
+            return None
+        if self._segmented is None:
+            self._segmented = SegmentedAnalyzer(
+                self.segments,
+                netflix_kwargs=self.netflix_system.segment_kwargs(),
+                disney_config=self.disney_system.thumbnail_generator.config
+            )
+        
+        segmented = self._segmented.run(video_path, sampler, progress)
+        if segmented is not None:
+            self.last_timings = self._segmented.last_timings
+        return segmented
+    
     def _combine_results(
         self, 
         netflix_variants: List[Dict[str, Any]], 
-        disney_results: Dict[str, Any],
-        video_path: str
+        disney_results: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
         """Combine Netflix and Disney results, removing duplicates"""
         
         combined = []
         seen_timestamps = set()
+        # Perceptual hashes of everything combined so far: on top of the timestamp rules,
+        # a pick that looks like one already combined is a duplicate however far apart
+        # in time the two frames are
+        seen_hashes = HashIndex()
         
         # Add Netflix results
         for variant in netflix_variants:
             timestamp = variant.get('timestamp', 0)
-            if timestamp not in seen_timestamps:
+            if timestamp not in seen_timestamps and not seen_hashes.is_near_duplicate(variant.get('phash')):
                 combined.append({
                     'source': 'netflix',
                     'timestamp': timestamp,
@@ -120,15 +314,20 @@ class HybridThumbnailSystem:
                     'people_count': variant.get('people_count', 0),
                     'score': variant.get('score', 0),
                     'description': variant.get('description', ''),
+                    'frame_number': variant.get('frame_number'),
                     'metadata': {
                         'scene_type': variant.get('scene_type', 'unknown'),
                         'composition': variant.get('composition', 'unknown'),
                         'character_count': variant.get('people_count', 0),
                         'emotion': 'neutral',
                         'action_level': 0
-                    }
+                    },
+                    'phash': variant.get('phash'),
+                    'features': variant.get('features')
                 })
                 seen_timestamps.add(timestamp)
+                if variant.get('phash') is not None:
+                    seen_hashes.add(variant['phash'])
         
         # Add Disney results
         disney_variants = disney_results.get('variants', {}).get('variants', [])
@@ -136,11 +335,13 @@ class HybridThumbnailSystem:
             thumb_data = variant.get('thumbnail', {})
             timestamp = thumb_data.get('timestamp', 0)
             
+            analysis = thumb_data.get('analysis', {})
+            phash = analysis.get('phash')
+            
             # Only add if not too close to existing timestamps (within 2 seconds)
             too_close = any(abs(timestamp - seen_ts) < 2.0 for seen_ts in seen_timestamps)
             
-            if not too_close:
-                analysis = thumb_data.get('analysis', {})
+            if not too_close and not seen_hashes.is_near_duplicate(phash):
                 metadata = thumb_data.get('metadata', {})
                 
                 combined.append({
@@ -152,9 +353,15 @@ class HybridThumbnailSystem:
                     'score': thumb_data.get('score', 0),
                     'description': f"{analysis.get('scene_type', 'unknown')} with {len(analysis.get('characters', []))} characters",
                     'metadata': metadata,
-                    'frame': thumb_data.get('frame')  # Store frame if available
+                    # Pixels stay as the candidate holds them; only the final picks are decoded or re-extracted
+                    'frame': thumb_data.get('frame'),
+                    'frame_number': thumb_data.get('frame_number'),
+                    'phash': phash,
+                    'features': analysis.get('features')
                 })
                 seen_timestamps.add(timestamp)
+                if phash is not None:
+                    seen_hashes.add(phash)
         
         return combined
     
@@ -163,19 +370,17 @@ class HybridThumbnailSystem:
         thumbnails: List[Dict[str, Any]], 
         num_variants: int
     ) -> List[Dict[str, Any]]:
-        """Select diverse variants prioritizing different scene types"""
+        """Select diverse variants prioritizing different scene types (or by MMR)"""
+        
+        if self.selection_strategy == 'mmr':
+            embeddings = embedding_matrix(
+                [t.get('features') for t in thumbnails],
+                [f"{t.get('scene_type', 'unknown')}_{t.get('composition', 'unknown')}" for t in thumbnails]
+            )
+            return mmr_select(thumbnails, [t.get('score', 0) for t in thumbnails], embeddings, num_variants)
         
         # Categorize thumbnails
-        categories = {
-            'hero_closeup': [],
-            'ensemble': [],
-            'duo_scene': [],
-            'action': [],
-            'emotional': [],
-            'romantic': [],
-            'dramatic': [],
-            'other': []
-        }
+        selector = VariantSelector(lambda x: x.get('score', 0))
         
         for thumb in thumbnails:
             scene_type = thumb.get('scene_type', '').lower()
@@ -184,42 +389,34 @@ class HybridThumbnailSystem:
             
             # Categorize based on scene type and composition
             if 'hero' in scene_type or 'closeup' in composition:
-                categories['hero_closeup'].append(thumb)
+                category = 'hero_closeup'
             elif 'ensemble' in scene_type or people_count >= 4:
-                categories['ensemble'].append(thumb)
+                category = 'ensemble'
             elif 'duo' in scene_type or people_count == 2:
-                categories['duo_scene'].append(thumb)
+                category = 'duo_scene'
             elif 'action' in scene_type or 'fight' in scene_type:
-                categories['action'].append(thumb)
+                category = 'action'
             elif 'romantic' in scene_type or 'romance' in scene_type:
-                categories['romantic'].append(thumb)
+                category = 'romantic'
             elif 'dramatic' in scene_type or 'tense' in scene_type:
-                categories['dramatic'].append(thumb)
+                category = 'dramatic'
             elif 'emotional' in scene_type:
-                categories['emotional'].append(thumb)
+                category = 'emotional'
             else:
-                categories['other'].append(thumb)
+                category = 'other'
+            selector.add(thumb, category)
         
-        # Select diverse variants
+        # Select diverse variants: the best of each category not picked already
         selected = []
         category_order = ['hero_closeup', 'ensemble', 'action', 'duo_scene', 'romantic', 'dramatic', 'emotional', 'other']
         
         for category in category_order:
             if len(selected) >= num_variants:
                 break
-            
-            candidates = categories[category]
-            if candidates:
-                # Sort by score and take the best
-                candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
-                selected.append(candidates[0])
+            selected.extend(selector.choose(thumb) for thumb in selector.best(category, exclude_chosen=True))
         
         # Fill remaining slots with highest scoring thumbnails
-        remaining_needed = num_variants - len(selected)
-        if remaining_needed > 0:
-            remaining = [t for t in thumbnails if t not in selected]
-            remaining.sort(key=lambda x: x.get('score', 0), reverse=True)
-            selected.extend(remaining[:remaining_needed])
+        selected.extend(selector.rest(num_variants - len(selected)))
         
         return selected[:num_variants]
     
@@ -229,38 +426,35 @@ class HybridThumbnailSystem:
         output_dir: str,
         title: str,
         genre: List[str],
-        content_id: str
+        content_id: str,
+        video_path: str
     ) -> Dict[str, Any]:
         """Save final hybrid results"""
         
         output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True)
+        output_path.mkdir(parents=True, exist_ok=True)
         
         saved_files = []
+        manifest_entries = []
+        encodings = []
+        encoder = get_thumbnail_encoder()
+        
+        # Held frames, otherwise one sorted pass over the source video for every pick (Netflix ones included)
+        frames = candidate_frames(variants, video_path)
         
-        for i, variant in enumerate(variants):
+        for i, (variant, frame) in enumerate(zip(variants, frames)):
             timestamp = variant['timestamp']
             source = variant['source']
             scene_type = variant['scene_type']
             
-            # Extract frame
-            frame = variant.get('frame')
-            if frame is None:
-                # Need to extract frame from video
-                cap = cv2.VideoCapture(variants[0].get('video_path', ''))
-                if cap.isOpened():
-                    frame_num = int(timestamp * cap.get(cv2.CAP_PROP_FPS))
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-                    ret, frame = cap.read()
-                    cap.release()
-                    if not ret:
-                        continue
-            
             if frame is not None:
                 filename = f"hybrid_{i+1:02d}_{source}_{scene_type}_t{timestamp:.2f}.jpg"
                 filepath = output_path / filename
-                cv2.imwrite(str(filepath), frame)
+                encodings.append(encoder.submit(frame, str(filepath)))
                 saved_files.append(str(filepath))
+                manifest_entries.append(manifest_entry(
+                    filepath, scene_type, variant.get('score', 0), timestamp, source=source
+                ))
                 
                 print(f"   ✓ {filename}")
                 print(f"      Source: {source.upper()}")
@@ -303,12 +497,15 @@ class HybridThumbnailSystem:
             json.dump(hybrid_metadata, f, indent=2)
         
         print(f"✓ Metadata saved: {metadata_file}")
+        attach_encodings(manifest_entries, encodings)
+        manifest = write_manifest(output_path, 'hybrid', manifest_entries, metadata_file)
         
         return {
             "output_dir": str(output_path),
             "thumbnails": saved_files,
             "variants": variants,
-            "metadata": hybrid_metadata
+            "metadata": hybrid_metadata,
+            "manifest": manifest
         }
 
 
@@ -320,11 +517,22 @@ def main():
     parser.add_argument("--characters", nargs="+", default=[], help="Character names")
     parser.add_argument("--variants", type=int, default=20, help="Number of variants")
     parser.add_argument("--output-dir", help="Output directory")
+    parser.add_argument("--sampling", choices=STRATEGIES, default="auto",
+                        help="Frame sampling strategy (keyframe requires PyAV; shots analyzes one frame per shot)")
+    parser.add_argument("--analysis-width", type=int, default=None,
+                        help="Analyze frames downscaled to this width (e.g. 640); thumbnails stay full resolution")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Analyze long videos as this many parallel time segments (e.g. the core count)")
+    parser.add_argument("--selection", choices=SELECTION_STRATEGIES, default="categories",
+                        help="Variant selection in every pipeline (mmr trades score against visual similarity)")
     
     args = parser.parse_args()
     
     # Initialize hybrid system
-    system = HybridThumbnailSystem()
+    system = HybridThumbnailSystem(
+        sampling_strategy=args.sampling, analysis_width=args.analysis_width, segments=args.segments,
+        selection_strategy=args.selection
+    )
     
     # Process content
     results = system.process_video(
@@ -0,0 +1,115 @@
+"""
+Shared Model Registry
+Process-wide cache that loads each YOLO weights file once and shares it between pipelines
+"""
+
+import os
+import sys
+import time
+import threading
+from typing import Dict, Any, List, Sequence
+
+from ultralytics import YOLO
+
+_models: Dict[str, YOLO] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, AttributeError):
+        return 0.0
+
+
+def get_yolo(weights: str = 'yolov8n.pt') -> YOLO:
+    """Return the shared YOLO model for a weights file, loading it on first use.
+
+    The instance is shared read-only: callers only run inference on it and
+    must not fine-tune, fuse or otherwise mutate it.
+    """
+    with _lock:
+        model = _models.get(weights)
+        if model is None:
+            rss_before = _current_rss_mb()
+            start = time.time()
+            model = YOLO(weights)
+            _models[weights] = model
+            _stats[weights] = {
+                'weights': weights,
+                'load_seconds': round(time.time() - start, 3),
+                'rss_delta_mb': round(_current_rss_mb() - rss_before, 1),
+                'references': 0
+            }
+        _stats[weights]['references'] += 1
+        return model
+
+
+def model_version(weights: str) -> str:
+    """Identifies the exact weights and ultralytics release (used in cache keys)"""
+    import ultralytics
+    version = f"{weights}@ultralytics-{getattr(ultralytics, '__version__', 'unknown')}"
+    if os.path.exists(weights):
+        stat = os.stat(weights)
+        version += f":{stat.st_size}:{int(stat.st_mtime)}"
+    return version
+
+
+def model_stats() -> Dict[str, Any]:
+    """Load time, memory and sharing statistics for every loaded model"""
+    with _lock:
+        return {
+            'models': [dict(s) for s in _stats.values()],
+            'rss_mb': round(_current_rss_mb(), 1)
+        }
+
+
+def to_detections(result) -> List[Dict[str, Any]]:
+    """Convert one ultralytics result into plain detection dicts.
+
+    Every pipeline consumes this format, so one inference call per frame
+    can feed both the Netflix and the Disney+ analysis.
+    """
+    detections = []
+    if result is None or not result.boxes:
+        return detections
+
+    for box in result.boxes:
+        class_id = int(box.cls[0])
+        detections.append({
+            'class_id': class_id,
+            'class_name': result.names[class_id],
+            'confidence': float(box.conf[0]),
+            'bbox': box.xyxy[0].cpu().numpy()
+        })
+    return detections
+
+
+def detect(model: YOLO, frame) -> List[Dict[str, Any]]:
+    """Run the model on a single frame and return plain detections"""
+    results = model(frame, verbose=False)
+    return to_detections(results[0] if results and len(results) > 0 else None)
+
+
+def detect_batch(model: YOLO, frames: Sequence) -> List[List[Dict[str, Any]]]:
+    """Run the model on a mini-batch of frames in one forward pass.
+
+    Returns one detection list per frame, in input order. Frames of the
+    same size share a single letterbox transform during preprocessing.
+    """
+    if len(frames) == 0:
+        return []
+    results = model(list(frames), verbose=False)
+    return [to_detections(result) for result in results]
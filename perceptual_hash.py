@@ -0,0 +1,82 @@
+"""
+Perceptual Hashing
+64-bit DCT hashes (pHash) of analyzed frames and a NumPy Hamming-distance index for near-duplicate suppression
+"""
+
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+import cv2
+import numpy as np
+
+# Hashes at most this many bits apart (of 64) are treated as the same picture
+DEFAULT_MAX_DISTANCE = 10
+
+# Set bits per byte value: a Hamming distance is the popcount of the XOR, summed over 8 bytes
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+T = TypeVar('T')
+
+
+def phash(frame: np.ndarray) -> str:
+    """Lowest 8x8 DCT coefficients of a 32x32 grayscale thumbnail thresholded at their median, as 16 hex digits.
+
+    The median threshold sets about half the bits even on flat, dark or
+    low-texture frames, where gradient hashes (dHash) collapse to near zero.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    coefficients = cv2.dct(small)[:8, :8].ravel()
+    # The DC term only measures brightness: leave it out of the threshold
+    bits = coefficients > np.median(coefficients[1:])
+    return f"{int(np.packbits(bits).view('>u8')[0]):016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    """Bits that differ between two hashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class HashIndex:
+    """Hashes packed into a uint64 array; each lookup is one vectorized XOR and byte popcount over all of them"""
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._hashes = np.zeros(64, dtype=np.uint64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, phash: str):
+        if self._count == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+        self._hashes[self._count] = np.uint64(int(phash, 16))
+        self._count += 1
+
+    def distances(self, phash: str) -> np.ndarray:
+        """Hamming distance from phash to every indexed hash, in insertion order"""
+        xor = self._hashes[:self._count] ^ np.uint64(int(phash, 16))
+        return _POPCOUNT[xor.view(np.uint8)].reshape(self._count, 8).sum(axis=1)
+
+    def is_near_duplicate(self, phash: Optional[str]) -> bool:
+        if phash is None or self._count == 0:
+            return False
+        return bool(self.distances(phash).min() <= self.max_distance)
+
+
+def suppress_near_duplicates(
+    items: Iterable[T],
+    phash_of: Callable[[T], Optional[str]],
+    max_distance: int = DEFAULT_MAX_DISTANCE
+) -> List[T]:
+    """Keep items in order, dropping any that looks like one already kept (pass items best-first)"""
+    index = HashIndex(max_distance)
+    kept = []
+    for item in items:
+        phash = phash_of(item)
+        if index.is_near_duplicate(phash):
+            continue
+        if phash is not None:
+            index.add(phash)
+        kept.append(item)
+    return kept
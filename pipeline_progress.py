@@ -0,0 +1,36 @@
+"""
+Pipeline Progress Reporting
+Stage/progress callbacks shared by the Netflix, Disney+ and Hybrid pipelines
+"""
+
+from typing import Callable, Optional
+
+# progress(stage, fraction) - fraction is the overall completion in [0, 1]
+ProgressCallback = Callable[[str, float], None]
+
+
+class PipelineCancelled(Exception):
+    """Raised from a progress callback to stop a running pipeline"""
+
+
+def report_progress(progress: Optional[ProgressCallback], stage: str, fraction: float):
+    """Forward a progress update if a callback is attached"""
+    if progress is not None:
+        progress(stage, max(0.0, min(1.0, fraction)))
+
+
+def scoped_progress(
+    progress: Optional[ProgressCallback],
+    start: float,
+    end: float,
+    prefix: str = ''
+) -> Optional[ProgressCallback]:
+    """Map a nested pipeline's 0-1 progress into the [start, end] range of its parent"""
+    if progress is None:
+        return None
+
+    def _scoped(stage: str, fraction: float):
+        label = f"{prefix}: {stage}" if prefix else stage
+        progress(label, start + (end - start) * max(0.0, min(1.0, fraction)))
+
+    return _scoped
@@ -0,0 +1,78 @@
+"""
+Result Manifest
+Structured list of the thumbnails a pipeline wrote, consumed by the API instead of scanning output trees
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def manifest_entry(path: str, scene_type: Optional[str], score: float, timestamp: float, **extra) -> Dict[str, Any]:
+    """One saved thumbnail: file name plus the fields the API reports for it"""
+    entry = {
+        'file': os.path.basename(str(path)),
+        'scene_type': scene_type or 'unknown',
+        'score': float(score or 0.0),
+        'timestamp': float(timestamp)
+    }
+    entry.update(extra)
+    return entry
+
+
+def write_manifest(
+    output_dir: str,
+    model: str,
+    thumbnails: List[Dict[str, Any]],
+    metadata_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """Write manifest.json atomically next to the thumbnails and return it"""
+    output_dir = os.path.abspath(str(output_dir))
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'model': model,
+        'created': datetime.now().isoformat(),
+        'output_dir': output_dir,
+        'metadata_file': os.path.basename(str(metadata_file)) if metadata_file else None,
+        'thumbnails': thumbnails
+    }
+
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return manifest
+
+
+def read_manifest(output_dir: str) -> Optional[Dict[str, Any]]:
+    """Manifest of a finished run, or None if the directory has none"""
+    try:
+        with open(os.path.join(str(output_dir), MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    manifest['output_dir'] = os.path.abspath(str(output_dir))
+    return manifest
+
+
+def manifest_paths(manifest: Dict[str, Any]) -> List[str]:
+    """Absolute paths of the manifest's thumbnails, in ranking order"""
+    return [os.path.join(manifest['output_dir'], entry['file']) for entry in manifest['thumbnails']]
+
+
+def rendition_paths(manifest: Dict[str, Any]) -> List[str]:
+    """Absolute paths of every thumbnail's renditions (see thumbnail_encoding.py)"""
+    return [
+        os.path.join(manifest['output_dir'], rendition['file'])
+        for entry in manifest['thumbnails'] for rendition in entry.get('renditions', [])
+    ]
@@ -8,14 +8,26 @@ import numpy as np
 from pathlib import Path
 from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
-from collections import defaultdict
 import json
 from datetime import datetime
 
 # Core - these should already be installed
-from ultralytics import YOLO
 import torch
 
+from model_registry import get_yolo, detect, detect_batch, model_version
+from analysis_cache import cache_key, get_analysis_cache
+from candidate_table import CandidateTable, netflix_scores
+from frame_pipeline import FramePipeline
+from frame_sampling import FrameSampler, sampling_key
+from pipeline_progress import report_progress, scoped_progress
+from segmented_analysis import SegmentedAnalyzer
+from result_manifest import manifest_entry, write_manifest
+from perceptual_hash import suppress_near_duplicates
+from frame_features import embedding_matrix, frame_features
+from frame_metrics import FrameMetricsKernel
+from thumbnail_encoding import attach_encodings, get_thumbnail_encoder
+from variant_selection import VariantSelector, mmr_select
+
 print("="*80)
 print("NETFLIX-STYLE SYSTEM (Simplified)")
 print("="*80)
@@ -23,10 +35,28 @@ print("="*80)
 class NetflixSimplifiedSystem:
     """Simplified Netflix system using only YOLO (reliable model)"""
     
-    def __init__(self, genre='action', title='Untitled', num_variants=8):
+    # Analyze every Nth decoded frame
+    SAMPLE_INTERVAL = 15
+    WEIGHTS = 'yolov8n.pt'
+    
+    def __init__(self, genre='action', title='Untitled', num_variants=8, sampling_strategy='auto',
+                 batch_size=8, analysis_workers=4, queue_size=4, analysis_width=None,
+                 use_analysis_cache=True, segments=1, selection_strategy='categories'):
         self.genre = genre.lower()
         self.title = title
         self.num_variants = num_variants
+        self.sampling_strategy = sampling_strategy  # auto, grab, seek, keyframe or shots
+        self.batch_size = batch_size  # sampled frames per YOLO forward pass
+        self.analysis_workers = analysis_workers  # threads for per-frame OpenCV metrics
+        self.queue_size = queue_size  # batches buffered between pipeline stages
+        self.analysis_width = analysis_width  # analyze downscaled proxies this wide (None = native)
+        self.analysis_cache = get_analysis_cache() if use_analysis_cache else None
+        self.segments = segments  # long videos are split into this many parallel time segments
+        self.selection_strategy = selection_strategy  # categories or mmr (see variant_selection.py)
+        self.metrics_kernel = FrameMetricsKernel(saturation=False, edges=False)  # gray + LAB once per frame
+        self._segmented = None
+        self.last_timings = None
+        self.last_manifest = None
         
         print(f"\nTitle: {self.title}")
         print(f"Genre: {self.genre}")
@@ -34,61 +64,91 @@ class NetflixSimplifiedSystem:
         
         # Load YOLO (this works well)
         print("\nLoading YOLO model...")
-        self.yolo = YOLO('yolov8n.pt')
+        self.yolo = get_yolo(self.WEIGHTS)
         print("✓ Loaded")
         
         self.analyses = []
     
-    def analyze_frame(self, frame, timestamp, frame_number):
-        """Analyze single frame"""
+    def detect(self, frame):
+        """Run YOLO on a frame and return plain detections"""
+        return detect(self.yolo, frame)
+    
+    def detect_batch(self, frames):
+        """Run YOLO on a mini-batch of frames; returns one detection list per frame"""
+        return detect_batch(self.yolo, frames)
+    
+    def analyze_frame(self, frame, timestamp, frame_number, detections=None):
+        """Analyze single frame (reuses precomputed detections when given)"""
+        return self.analysis_from_observation(self.observe_frame(frame, timestamp, frame_number, detections))
+    
+    def observe_frame(self, frame, timestamp, frame_number, detections=None):
+        """Genre-independent measurements of one frame (what the analysis cache stores)"""
         
-        result = self.yolo(frame, verbose=False)
+        if detections is None:
+            detections = self.detect(frame)
         
         people = []
         objects = []
         
-        if result and len(result) > 0 and result[0].boxes:
-            for box in result[0].boxes:
-                class_id = int(box.cls)
-                class_name = self.yolo.names[class_id]
-                confidence = float(box.conf)
-                
-                if class_name == 'person':
-                    bbox = box.xyxy[0].cpu().numpy()
-                    people.append({
-                        'bbox': bbox.tolist(),
-                        'confidence': confidence
-                    })
-                else:
-                    objects.append({
-                        'name': class_name,
-                        'confidence': confidence
-                    })
+        for det in detections:
+            if det['class_name'] == 'person':
+                people.append({
+                    'bbox': det['bbox'].tolist(),
+                    'confidence': det['confidence']
+                })
+            else:
+                objects.append({
+                    'name': det['class_name'],
+                    'confidence': det['confidence']
+                })
         
         # Visual quality
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+        metrics = self.metrics_kernel.compute(frame)
         
         quality = {
-            'brightness': 1 - abs(np.mean(lab[:,:,0]) - 50) / 50,
-            'contrast': min(np.std(gray) / 50, 1.0),
-            'sharpness': min(cv2.Laplacian(gray, cv2.CV_64F).var() / 300, 1.0),
+            'brightness': 1 - abs(metrics.lightness - 50) / 50,
+            'contrast': min(np.sqrt(metrics.gray_variance) / 50, 1.0),
+            'sharpness': min(metrics.laplacian_variance / 300, 1.0),
         }
         
         quality['overall'] = np.mean(list(quality.values()))
         
+        return {
+            'timestamp': timestamp,
+            'frame_number': frame_number,
+            'frame_height': frame.shape[0],
+            'frame_width': frame.shape[1],
+            'people': people,
+            'objects': objects,
+            'quality': quality,
+            'phash': metrics.phash,
+            'features': frame_features(frame, [det['bbox'] for det in detections])
+        }
+    
+    def analyses_from_observations(self, observations):
+        """analysis_from_observation for a whole video, with every score computed in one vectorized pass"""
+        scores = netflix_scores(CandidateTable.from_observations(observations)).tolist()
+        return [self.analysis_from_observation(o, score) for o, score in zip(observations, scores)]
+    
+    def analysis_from_observation(self, observation, score=None):
+        """Genre-dependent scene type and score for one observed frame"""
+        people = observation['people']
+        objects = observation['objects']
+        quality = observation['quality']
+        
         # Composition
-        composition = self._get_composition(frame, people)
+        composition = self._get_composition((observation['frame_height'], observation['frame_width']), people)
         
         # Scene type
         scene_type = self._classify_scene(people, objects)
         
         # Score
-        score = quality['overall'] * 0.6 + len(people) * 0.2 + len(objects) * 0.1
+        if score is None:
+            score = quality['overall'] * 0.6 + len(people) * 0.2 + len(objects) * 0.1
         
         analysis = {
-            'timestamp': timestamp,
-            'frame_number': frame_number,
+            'timestamp': observation['timestamp'],
+            'frame_number': observation['frame_number'],
             'people_count': len(people),
             'objects_count': len(objects),
             'quality': quality,
@@ -96,12 +156,29 @@ class NetflixSimplifiedSystem:
             'scene_type': scene_type,
             'overall_score': score,
             'description': f"{scene_type} with {len(people)} people",
-            'frame': frame
+            'phash': observation['phash'],
+            'features': observation['features']
         }
         
         return analysis
     
-    def _get_composition(self, frame, people):
+    def analysis_cache_key(self, video_path, sampler):
+        """Cache key for this video's observations (None when caching is off or the file can't be hashed)"""
+        # An upload still in progress can't be hashed yet
+        if self.analysis_cache is None or sampler.following:
+            return None
+        try:
+            return cache_key(video_path, {
+                'system': 'netflix',
+                'weights': model_version(self.WEIGHTS),
+                'interval': self.SAMPLE_INTERVAL,
+                'analysis_width': self.analysis_width if sampler.downscaled else None,
+                'sampling': sampling_key(self.sampling_strategy)
+            })
+        except OSError:
+            return None
+    
+    def _get_composition(self, frame_shape, people):
         """Get shot composition"""
         if not people:
             return 'wide'
@@ -109,7 +186,7 @@ class NetflixSimplifiedSystem:
         largest = max(people, key=lambda x: (x['bbox'][2]-x['bbox'][0])*(x['bbox'][3]-x['bbox'][1]))
         bbox = largest['bbox']
         
-        prominence = ((bbox[2]-bbox[0])*(bbox[3]-bbox[1])) / (frame.shape[0]*frame.shape[1])
+        prominence = ((bbox[2]-bbox[0])*(bbox[3]-bbox[1])) / (frame_shape[0]*frame_shape[1])
         
         if prominence > 0.25:
             return 'closeup'
@@ -154,80 +231,142 @@ class NetflixSimplifiedSystem:
             else:
                 return 'ensemble'
     
-    def process(self, video_path, output_dir):
-        """Process video"""
+    def process(self, video_path, output_dir, progress=None, analyses=None, renditions=True):
+        """Process video (pass `analyses` to skip decoding when frames were already analyzed,
+        renditions=False when the thumbnails are only intermediate output)"""
         print(f"\n📹 Processing: {Path(video_path).name}")
         
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        # Analysis may run on proxies; _extract always re-reads the selected frames at full resolution
+        sampler = FrameSampler(video_path, self.sampling_strategy, self.analysis_width, progress)
+        self.last_timings = None
         
-        analyses = []
-        frame_number = 0
-        
-        print("\n🔍 Analyzing frames...")
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        if analyses is None:
+            key = self.analysis_cache_key(video_path, sampler)
+            observations = self.analysis_cache.get(key, 'netflix') if key else None
             
-            if frame_number % 15 == 0:
-                timestamp = frame_number / fps
-                analysis = self.analyze_frame(frame, timestamp, frame_number)
-                analyses.append(analysis)
-            
-            frame_number += 1
+            if observations is not None:
+                print(f"\n✓ Loaded {len(observations)} analyzed frames from cache")
+            else:
+                print("\n🔍 Analyzing frames...")
+                report_progress(progress, 'Analyzing frames', 0.0)
+                
+                # Long videos: parallel time segments when configured, otherwise one sequential pass
+                observations = self._analyze_segments(video_path, sampler, scoped_progress(progress, 0.0, 0.9))
+                if observations is None:
+                    observations = []
+                    
+                    def analyze(frame_number, timestamp, frame, detections):
+                        return self.observe_frame(frame, timestamp, frame_number, detections)
+                    
+                    pipeline = FramePipeline(
+                        self.detect_batch,
+                        analyze,
+                        batch_size=self.batch_size,
+                        queue_size=self.queue_size,
+                        workers=self.analysis_workers
+                    )
+                    for frame_number, _, _, _, observation in pipeline.run(sampler.sample([self.SAMPLE_INTERVAL])):
+                        observations.append(observation)
+                        report_progress(progress, 'Analyzing frames', 0.9 * sampler.progress(frame_number))
+                        
+                        if len(observations) % 50 == 0:
+                            print(f"   Analyzed {len(observations)} frames...")
+                    
+                    self.last_timings = pipeline.timings
+                
+                print(f"   Stage timings: {self.last_timings.summary()}")
+                if key:
+                    self.analysis_cache.put(key, 'netflix', observations)
             
-            if len(analyses) % 50 == 0:
-                print(f"   Analyzed {len(analyses)} frames...")
+            analyses = self.analyses_from_observations(observations)
+            print(f"✓ Complete: {len(analyses)} frames")
+        else:
+            print(f"✓ Using {len(analyses)} pre-analyzed frames")
         
-        cap.release()
+        # Select variants
+        report_progress(progress, 'Selecting variants', 0.9)
+        selected = self.select_variants(analyses)
         
-        print(f"✓ Complete: {len(analyses)} frames")
+        # Extract
+        report_progress(progress, 'Extracting thumbnails', 0.92)
+        saved = self._extract(sampler, selected, output_dir, renditions)
         
-        # Select variants
-        by_scene = defaultdict(list)
+        # Save metadata
+        report_progress(progress, 'Saving metadata', 0.98)
+        self.last_manifest = self._save_metadata(selected, output_dir, saved)
+        report_progress(progress, 'Complete', 1.0)
+        
+        return selected
+    
+    def segment_kwargs(self):
+        """Constructor arguments for the copies that analyze time segments in worker processes"""
+        return {
+            'genre': self.genre,
+            'title': self.title,
+            'num_variants': self.num_variants,
+            'sampling_strategy': self.sampling_strategy,
+            'batch_size': self.batch_size,
+            'analysis_workers': self.analysis_workers,
+            'queue_size': self.queue_size,
+            'analysis_width': self.analysis_width
+        }
+    
+    def _analyze_segments(self, video_path, sampler, progress=None):
+        """Observations from parallel time segments, or None when the video is not split"""
+        if self.segments <= 1:
+            return None
+        if self._segmented is None:
+            self._segmented = SegmentedAnalyzer(self.segments, netflix_kwargs=self.segment_kwargs())
+        
+        segmented = self._segmented.run(video_path, sampler, progress)
+        if segmented is None:
+            return None
+        self.last_timings = self._segmented.last_timings
+        return segmented['netflix']
+    
+    def select_variants(self, analyses):
+        """Pick the top frames per priority scene type, then fill by score"""
+        # Near-identical frames (a static shot, a repeated shot) compete for a single slot
+        analyses = suppress_near_duplicates(
+            sorted(analyses, key=lambda x: x['overall_score'], reverse=True),
+            lambda x: x.get('phash')
+        )
+        
+        if self.selection_strategy == 'mmr':
+            embeddings = embedding_matrix([a['features'] for a in analyses], [a['scene_type'] for a in analyses])
+            selected = mmr_select(analyses, [a['overall_score'] for a in analyses], embeddings, self.num_variants)
+            return sorted(selected, key=lambda x: x['timestamp'])
+        
+        selector = VariantSelector(lambda x: x['overall_score'])
         for a in analyses:
-            by_scene[a['scene_type']].append(a)
+            selector.add(a, a['scene_type'])
         
         selected = []
         priorities = ['hero_action', 'hero_solo', 'ensemble', 'romantic_couple', 'duo_scene']
         
         for scene_type in priorities:
-            if scene_type in by_scene:
-                items = sorted(by_scene[scene_type], key=lambda x: x['overall_score'], reverse=True)
-                selected.extend(items[:2])
-                if len(selected) >= self.num_variants:
-                    break
+            selected.extend(selector.choose(a) for a in selector.best(scene_type, 2))
+            if len(selected) >= self.num_variants:
+                break
         
-        if len(selected) < self.num_variants:
-            remaining = sorted([a for a in analyses if a not in selected], 
-                             key=lambda x: x['overall_score'], reverse=True)
-            selected.extend(remaining[:self.num_variants - len(selected)])
+        selected.extend(selector.rest(self.num_variants - len(selected)))
         
         selected.sort(key=lambda x: x['timestamp'])
-        selected = selected[:self.num_variants]
-        
-        # Extract
-        self._extract(cap, selected, output_dir, fps, video_path)
-        
-        # Save metadata
-        self._save_metadata(selected, output_dir)
-        
-        return selected
+        return selected[:self.num_variants]
     
-    def _extract(self, cap, analyses, output_dir, fps, video_path):
-        """Extract thumbnails"""
+    def _extract(self, sampler, analyses, output_dir, renditions=True):
+        """Extract thumbnails; returns (analysis, path, pending encode) for every file written"""
         Path(output_dir).mkdir(parents=True, exist_ok=True)
-        cap = cv2.VideoCapture(video_path)
+        encoder = get_thumbnail_encoder()
+        saved = []
         
         print(f"\n📸 Extracting {len(analyses)} thumbnails...")
         
-        for i, analysis in enumerate(analyses, 1):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, analysis['frame_number'])
-            ret, frame = cap.read()
-            
-            if ret:
+        # One sorted pass over the video for all selected frames
+        frames = sampler.read_frames([analysis['frame_number'] for analysis in analyses])
+        
+        for i, (analysis, frame) in enumerate(zip(analyses, frames), 1):
+            if frame is not None:
                 timestamp_str = f"{int(analysis['timestamp']//60):02d}_{int(analysis['timestamp']%60):02d}"
                 filename = f"thumb_{i:02d}_{analysis['scene_type']}_t{timestamp_str}.jpg"
                 filepath = Path(output_dir) / filename
@@ -237,15 +376,17 @@ class NetflixSimplifiedSystem:
                     scale = 1920 / w
                     frame = cv2.resize(frame, (int(w*scale), int(h*scale)))
                 
-                cv2.imwrite(str(filepath), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                # Written with its renditions on the encoder's threads
+                encoding = encoder.submit(frame, str(filepath), [cv2.IMWRITE_JPEG_QUALITY, 95], renditions=renditions)
+                saved.append((analysis, str(filepath), encoding))
                 
                 print(f"   ✓ {filename}")
                 print(f"      Score: {analysis['overall_score']:.2f}")
         
-        cap.release()
+        return saved
     
-    def _save_metadata(self, variants, output_dir):
-        """Save metadata"""
+    def _save_metadata(self, variants, output_dir, saved):
+        """Save metadata and the result manifest; returns the manifest"""
         metadata = {
             'title': self.title,
             'genre': self.genre,
@@ -269,6 +410,14 @@ class NetflixSimplifiedSystem:
             json.dump(metadata, f, indent=2, default=str)
         
         print(f"\n✓ Metadata saved: {metadata_path}")
+        
+        entries = [
+            manifest_entry(path, analysis['scene_type'], analysis['overall_score'], analysis['timestamp'],
+                           frame_number=analysis['frame_number'])
+            for analysis, path, _ in saved
+        ]
+        attach_encodings(entries, [encoding for _, _, encoding in saved])
+        return write_manifest(output_dir, 'netflix', entries, metadata_path)
 
 
 def main():
@@ -276,7 +425,7 @@ def main():
     import sys
     
     if len(sys.argv) < 2:
-        print("\nUsage: python run_netflix_system.py <video> [genre] [num_variants]")
+        print("\nUsage: python run_netflix_system.py <video> [genre] [num_variants] [output_dir]")
         print("Example: python run_netflix_system.py 3.mp4 action 10")
         sys.exit(1)
     
@@ -287,7 +436,7 @@ def main():
     title = Path(video_path).stem
     
     system = NetflixSimplifiedSystem(genre=genre, title=title, num_variants=num_variants)
-    output_dir = f"{Path(video_path).stem}_final"
+    output_dir = sys.argv[4] if len(sys.argv) > 4 else f"{Path(video_path).stem}_final"
     
     system.process(video_path, output_dir)
     
@@ -0,0 +1,254 @@
+"""
+Time-Segmented Parallel Analysis
+Splits one long video into segments analyzed by separate processes, each with its own capture and model
+"""
+
+import dataclasses
+import multiprocessing
+import os
+import time
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from frame_pipeline import FramePipeline, StageTimings
+from frame_sampling import FrameSampler, OFF_GRID_STRATEGIES
+from pipeline_progress import PipelineCancelled, ProgressCallback, report_progress
+
+# Seconds running segments get to stop at their next frame after a cancellation before their processes are terminated
+CANCEL_GRACE_SECONDS = 10.0
+
+# Systems of a segment worker process, built once by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(netflix_kwargs: Optional[Dict[str, Any]], disney_config, threads: int, cancelled):
+    """Load the models a segment needs once per worker process"""
+    import torch
+    torch.set_num_threads(threads)
+
+    # Shared with the parent: segments of every run id up to this value are cancelled
+    _worker['cancelled'] = cancelled
+
+    if netflix_kwargs is not None:
+        from run_netflix_system import NetflixSimplifiedSystem
+        _worker['netflix'] = NetflixSimplifiedSystem(**netflix_kwargs)
+    if disney_config is not None:
+        from disney_ml_models import DisneyThumbnailGenerator
+        _worker['disney'] = DisneyThumbnailGenerator(disney_config)
+
+
+def _analyze_segment(video_path: str, start: int, end: Optional[int], run_id: int) -> Dict[str, Any]:
+    """Per-frame records for frames [start, end), in the same format as the analysis cache"""
+    cancelled = _worker['cancelled']
+    if cancelled.value >= run_id:
+        raise PipelineCancelled(f"Segment {start}-{end} cancelled before it started")
+
+    netflix = _worker.get('netflix')
+    generator = _worker.get('disney')
+    if netflix is not None:
+        strategy, analysis_width = netflix.sampling_strategy, netflix.analysis_width
+        batch_size, queue_size, workers = netflix.batch_size, netflix.queue_size, netflix.analysis_workers
+    else:
+        config = generator.config
+        strategy, analysis_width = config.sampling_strategy, config.analysis_width
+        batch_size, queue_size, workers = config.batch_size, config.pipeline_queue_size, config.analysis_workers
+
+    sampler = FrameSampler(video_path, strategy, analysis_width)
+    intervals = []
+    netflix_interval = disney_interval = 0
+    if netflix is not None:
+        netflix_interval = netflix.SAMPLE_INTERVAL
+        intervals.append(netflix_interval)
+    if generator is not None:
+        disney_interval = max(1, generator.sample_interval(sampler.fps))
+        intervals.append(disney_interval)
+
+    # One YOLO pass per frame when both systems run the same weights
+    shared_model = netflix is not None and generator is not None and generator.character_detector.yolo is netflix.yolo
+
+    def detect_batch(frames):
+        netflix_detections = netflix.detect_batch(frames) if netflix is not None else [None] * len(frames)
+        if generator is None:
+            return [(d, None) for d in netflix_detections]
+        if shared_model:
+            return [(d, d) for d in netflix_detections]
+        return list(zip(netflix_detections, generator.character_detector.detect_batch(frames)))
+
+    def analyze(frame_number, timestamp, frame, detections):
+        netflix_detections, disney_detections = detections
+        observation = None
+        scene_analysis = None
+        if netflix_interval and frame_number % netflix_interval == 0:
+            observation = netflix.observe_frame(frame, timestamp, frame_number, netflix_detections)
+        if disney_interval and frame_number % disney_interval == 0:
+            scene_analysis = generator.scene_analyzer.to_native(
+                generator.scene_analyzer.analyze_scene(frame, timestamp, disney_detections),
+                sampler.scale
+            )
+        return observation, scene_analysis
+
+    pipeline = FramePipeline(detect_batch, analyze, batch_size=batch_size, queue_size=queue_size, workers=workers)
+    observations = []
+    records = []
+    with closing(pipeline.run(sampler.sample(intervals, start, end))) as results:
+        for frame_number, timestamp, _, _, (observation, scene_analysis) in results:
+            if cancelled.value >= run_id:
+                raise PipelineCancelled(f"Segment {start}-{end} cancelled at frame {frame_number}")
+            if observation is not None:
+                observations.append(observation)
+            if scene_analysis is not None:
+                records.append({'frame_number': frame_number, 'timestamp': timestamp, 'analysis': scene_analysis})
+
+    return {'netflix': observations, 'disney': records, 'timings': pipeline.timings}
+
+
+class SegmentedAnalyzer:
+    """Analyzes N time segments of one video in parallel and concatenates their records in order.
+
+    Each segment runs in its own process with its own VideoCapture seeked to
+    the segment start and its own copy of the model. The merged records are
+    exactly what a sequential pass produces, so callers feed them through the
+    same scoring and diversity rules as cached analyses. Videos are only split
+    when seeking is frame-accurate and every segment gets MIN_SEGMENT_FRAMES.
+
+    If a run fails or is cancelled, its running segments stop at their next
+    frame through a flag shared with the worker processes. Workers that do not
+    stop within CANCEL_GRACE_SECONDS (a hung decode) are terminated and the
+    pool is started again for the next video, as it is after a worker dies.
+    """
+
+    MIN_SEGMENT_FRAMES = 300
+
+    def __init__(
+        self,
+        segments: int,
+        netflix_kwargs: Optional[Dict[str, Any]] = None,
+        disney_config=None
+    ):
+        self.segments = max(1, int(segments))
+        self.netflix_kwargs = dict(netflix_kwargs, use_analysis_cache=False) if netflix_kwargs is not None else None
+        self.disney_config = (
+            dataclasses.replace(disney_config, segments=1, use_analysis_cache=False)
+            if disney_config is not None else None
+        )
+        self.last_timings: Optional[StageTimings] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cancelled = None
+        self._run_id = 0
+
+    def plan(self, sampler: FrameSampler) -> List[Tuple[int, Optional[int]]]:
+        """Segment boundaries as (start, end) frame ranges; empty when the video should not be split"""
+        if self.segments <= 1 or not sampler.is_opened() or sampler.following:
+            return []
+        if multiprocessing.current_process().daemon:
+            print("   ⚠ Daemonic processes cannot start segment workers, analyzing sequentially")
+            return []
+        if sampler.requested_strategy in OFF_GRID_STRATEGIES:
+            return []
+
+        count = min(self.segments, sampler.total_frames // self.MIN_SEGMENT_FRAMES)
+        if count <= 1:
+            return []
+        if not sampler.seek_is_accurate():
+            print("   ⚠ Seeking is not frame-accurate for this file, analyzing sequentially")
+            return []
+
+        bounds = [round(i * sampler.total_frames / count) for i in range(count)]
+        # The last segment reads to the end of the stream, whatever the reported frame count
+        return list(zip(bounds, bounds[1:] + [None]))
+
+    def run(
+        self,
+        video_path: str,
+        sampler: FrameSampler,
+        progress: Optional[ProgressCallback] = None
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Records per section ('netflix', 'disney'), or None if the video is analyzed sequentially"""
+        segments = self.plan(sampler)
+        if not segments:
+            return None
+
+        print(f"   Analyzing {len(segments)} segments in parallel")
+        start = time.time()
+        executor = self._get_executor()
+        self._run_id += 1
+        run_id = self._run_id
+        futures: List[Future] = []
+
+        try:
+            futures = [executor.submit(_analyze_segment, video_path, a, b, run_id) for a, b in segments]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                # Also the cancellation point for callers whose callback raises
+                report_progress(progress, 'Analyzing segments', (len(futures) - len(pending)) / len(futures))
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): the pool takes no more work, so the next run starts a fresh one
+            print("   ⚠ A segment worker died, restarting the segment workers")
+            self._terminate()
+            raise
+        except BaseException:
+            self._cancel(run_id, futures)
+            raise
+
+        timings = StageTimings()
+        for result in results:
+            for field in ('decode', 'inference', 'analysis', 'decode_wait', 'inference_wait', 'frames', 'batches'):
+                setattr(timings, field, getattr(timings, field) + getattr(result['timings'], field))
+        timings.wall = time.time() - start
+        self.last_timings = timings
+
+        return {
+            'netflix': [o for result in results for o in result['netflix']],
+            'disney': [r for result in results for r in result['disney']]
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._cancelled = None
+
+    def _cancel(self, run_id: int, futures: List[Future]):
+        """Stop every segment of a run, so the next video does not queue behind it"""
+        self._cancelled.value = run_id
+        for future in futures:
+            future.cancel()
+        _, still_running = wait(futures, timeout=CANCEL_GRACE_SECONDS)
+        if still_running:
+            print(f"   ⚠ {len(still_running)} segments did not stop, restarting the segment workers")
+            self._terminate()
+
+    def _terminate(self):
+        """Kill the worker processes; the next run starts a fresh pool"""
+        executor = self._executor
+        if executor is None:
+            return
+        # ProcessPoolExecutor has no public way to stop a running task
+        processes = list((executor._processes or {}).values())
+        for process in processes:
+            process.terminate()
+        self.close()
+        for process in processes:
+            process.join(5.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Worker processes stay warm between videos"""
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.segments)
+            context = multiprocessing.get_context('spawn')
+            # Only the parent writes it; run ids keep growing, so it never has to be reset
+            self._cancelled = context.Value('q', 0)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.segments,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.netflix_kwargs, self.disney_config, threads, self._cancelled)
+            )
+        return self._executor
@@ -0,0 +1,179 @@
+"""
+Thumbnail Encoding
+Writes every saved thumbnail plus smaller JPEG/WebP renditions on a thread pool, recording their byte sizes
+"""
+
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Renditions live next to the thumbnail: renditions/{stem}_w{width}.{jpg|webp}
+RENDITION_DIR = 'renditions'
+RENDITION_PATTERN = re.compile(r'^(?P<stem>.+)_w(?P<width>\d+)\.(?P<ext>jpg|webp)$')
+
+# format -> (file extension, MIME type)
+FORMATS = {
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'webp': ('.webp', 'image/webp'),
+}
+
+
+@dataclass
+class EncodingConfig:
+    """Which renditions to write for each thumbnail"""
+    widths: Tuple[int, ...] = (1920, 960, 480)  # widths above the source width are skipped (no upscaling)
+    formats: Tuple[str, ...] = ('jpeg', 'webp')
+    jpeg_quality: int = 85
+    webp_quality: int = 80
+    progressive: bool = False  # progressive JPEG renditions
+    workers: int = 4
+
+    @classmethod
+    def from_env(cls) -> 'EncodingConfig':
+        widths = os.environ.get('THUMBNAIL_RENDITIONS', '1920,960,480')
+        formats = os.environ.get('THUMBNAIL_RENDITION_FORMATS', 'jpeg,webp')
+        config = cls(
+            widths=tuple(int(w) for w in widths.split(',') if w.strip()),
+            formats=tuple(f.strip().lower() for f in formats.split(',') if f.strip()),
+            progressive=os.environ.get('THUMBNAIL_PROGRESSIVE_JPEG', '0').lower() in ('1', 'true', 'yes'),
+            workers=int(os.environ.get('THUMBNAIL_ENCODE_WORKERS', 4))
+        )
+        unknown = set(config.formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown rendition formats {sorted(unknown)}, expected some of {tuple(FORMATS)}")
+        return config
+
+
+class ThumbnailEncoder:
+    """Encodes thumbnails and their renditions in worker threads (OpenCV releases the GIL while encoding)"""
+
+    def __init__(self, config: Optional[EncodingConfig] = None):
+        self.config = config or EncodingConfig()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, self.config.workers), thread_name_prefix='thumbnail-encode')
+
+    def submit(
+        self,
+        frame: np.ndarray,
+        path: str,
+        params: Sequence[int] = (),
+        renditions: bool = True
+    ) -> 'Future[Dict[str, Any]]':
+        """Write `path` as cv2.imwrite(path, frame, params) would, then its renditions, in the background.
+
+        The result holds the manifest fields for the thumbnail: its byte size,
+        content hash, dimensions and one entry per rendition (see attach_encodings).
+        Pass renditions=False for files that are never served (intermediate output).
+        """
+        return self._pool.submit(self._encode, frame, str(path), list(params), renditions)
+
+    def _encode(self, frame: np.ndarray, path: str, params: List[int], with_renditions: bool) -> Dict[str, Any]:
+        ok, data = cv2.imencode(os.path.splitext(path)[1] or '.jpg', frame, params)
+        if not ok:
+            return {}
+        _write(path, data)
+        size = int(data.size)
+        digest = _content_hash(data)
+
+        height, width = frame.shape[:2]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        directory = os.path.join(os.path.dirname(path), RENDITION_DIR)
+        renditions = []
+        widths = self.config.widths if with_renditions else ()
+
+        # Largest first, each downscaled from the previous one
+        scaled = frame
+        for target in sorted({w for w in widths if 0 < w <= width}, reverse=True):
+            if target != scaled.shape[1]:
+                dimensions = (target, max(1, int(round(height * target / width))))
+                scaled = cv2.resize(scaled, dimensions, interpolation=cv2.INTER_AREA)
+            for fmt in self.config.formats:
+                extension = FORMATS[fmt][0]
+                ok, data = cv2.imencode(extension, scaled, self._params(fmt))
+                if not ok:
+                    continue
+                os.makedirs(directory, exist_ok=True)
+                name = f"{stem}_w{target}{extension}"
+                _write(os.path.join(directory, name), data)
+                renditions.append({
+                    'file': f"{RENDITION_DIR}/{name}",
+                    'format': fmt,
+                    'width': target,
+                    'height': scaled.shape[0],
+                    'bytes': int(data.size),
+                    'content_hash': _content_hash(data)
+                })
+
+        return {'bytes': size, 'content_hash': digest, 'width': width, 'height': height, 'renditions': renditions}
+
+    def _params(self, fmt: str) -> List[int]:
+        if fmt == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, self.config.webp_quality]
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.config.jpeg_quality]
+        if self.config.progressive:
+            params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        return params
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def _write(path: str, data: np.ndarray):
+    with open(path, 'wb') as f:
+        f.write(data.tobytes())
+
+
+def _content_hash(data: np.ndarray) -> str:
+    # Same digest as backend/thumbnail_index.content_hash, so manifest hashes match served ETags
+    return hashlib.sha256(data.tobytes()).hexdigest()[:32]
+
+
+def attach_encodings(entries: List[Dict[str, Any]], encodings: Sequence['Future[Dict[str, Any]]']) -> List[Dict[str, Any]]:
+    """Wait for submitted encodes and merge their sizes and renditions into the matching manifest entries"""
+    for entry, encoding in zip(entries, encodings):
+        entry.update(encoding.result())
+    return entries
+
+
+def choose_rendition(filename: str, available: Sequence[str], width: Optional[int], formats: Sequence[str]) -> str:
+    """File to serve for a thumbnail at `width` px in the first of `formats` it exists in.
+
+    Picks the narrowest rendition at least `width` wide (or the widest one
+    if none is), falling back to the original file when no rendition of
+    the thumbnail matches.
+    """
+    if width is None:
+        return filename
+    stem = os.path.splitext(filename)[0]
+    by_format: Dict[str, List[Tuple[int, str]]] = {}
+    for name in available:
+        match = RENDITION_PATTERN.match(name)
+        if match and match.group('stem') == stem:
+            fmt = 'jpeg' if match.group('ext') == 'jpg' else 'webp'
+            by_format.setdefault(fmt, []).append((int(match.group('width')), name))
+
+    for fmt in formats:
+        candidates = sorted(by_format.get(fmt, []))
+        if candidates:
+            wide_enough = [c for c in candidates if c[0] >= width]
+            return (wide_enough[0] if wide_enough else candidates[-1])[1]
+    return filename
+
+
+_default_encoder: Optional[ThumbnailEncoder] = None
+_default_lock = threading.Lock()
+
+
+def get_thumbnail_encoder() -> ThumbnailEncoder:
+    """Process-wide encoder configured from the environment"""
+    global _default_encoder
+    with _default_lock:
+        if _default_encoder is None:
+            _default_encoder = ThumbnailEncoder(EncodingConfig.from_env())
+        return _default_encoder
@@ -0,0 +1,102 @@
+"""
+Variant Selection
+Diversity selection strategies: best per category by candidate id, or maximal marginal relevance (MMR)
+"""
+
+import heapq
+from collections import defaultdict
+from typing import Callable, Dict, Generic, List, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+# 'categories': the best candidate of each hardcoded category, then the best of the rest
+# 'mmr': score traded off against similarity to what is already selected (see mmr_select)
+SELECTION_STRATEGIES = ('categories', 'mmr')
+
+# Weight of relevance (normalized score) against redundancy in MMR
+DEFAULT_RELEVANCE_WEIGHT = 0.7
+
+
+class VariantSelector(Generic[T]):
+    """Candidates grouped into categories, with chosen ones tracked in a set of ids.
+
+    Replaces `x not in selected` scans over lists of dicts (which compare
+    NumPy frames element-wise) and per-category sorts. Ties resolve like a
+    stable descending sort: the candidate added first wins.
+    """
+
+    def __init__(self, score: Callable[[T], float]):
+        self.score = score
+        self._entries: List[Tuple[float, int, T]] = []
+        self._categories: Dict[str, List[Tuple[float, int, T]]] = defaultdict(list)
+        self._chosen: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, candidate: T, *categories: str):
+        """Add a candidate to every category it belongs to (possibly none)"""
+        entry = (-self.score(candidate), len(self._entries), candidate)
+        self._entries.append(entry)
+        for category in categories:
+            self._categories[category].append(entry)
+
+    def best(self, category: str, count: int = 1, exclude_chosen: bool = False) -> List[T]:
+        """Top `count` candidates of a category; chosen ones are skipped with exclude_chosen"""
+        entries = self._categories.get(category, ())
+        if not exclude_chosen:
+            return [entry[2] for entry in heapq.nsmallest(count, entries)]
+        top = heapq.nsmallest(count + len(self._chosen), entries)
+        return [entry[2] for entry in top if id(entry[2]) not in self._chosen][:count]
+
+    def choose(self, candidate: T) -> T:
+        self._chosen.add(id(candidate))
+        return candidate
+
+    def is_chosen(self, candidate: T) -> bool:
+        return id(candidate) in self._chosen
+
+    def rest(self, count: int) -> List[T]:
+        """Top `count` candidates not chosen yet, best first"""
+        if count <= 0:
+            return []
+        # At most len(chosen) of the top entries can be chosen ones
+        top = heapq.nsmallest(count + len(self._chosen), self._entries)
+        return [entry[2] for entry in top if id(entry[2]) not in self._chosen][:count]
+
+
+def mmr_select(
+    candidates: Sequence[T],
+    scores: Sequence[float],
+    embeddings: np.ndarray,
+    count: int,
+    relevance_weight: float = DEFAULT_RELEVANCE_WEIGHT
+) -> List[T]:
+    """Greedy maximal marginal relevance: each pick maximizes
+    relevance_weight * score - (1 - relevance_weight) * max similarity to the picks so far.
+
+    Scores are min-max normalized and `embeddings` rows are unit vectors (see
+    frame_features.embedding_matrix). Each candidate's maximum similarity is
+    updated with one matrix-vector product per pick, so choosing K of N costs
+    O(N * K). Picks are returned in selection order; ties go to the earlier candidate.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    count = min(count, len(candidates))
+    if count <= 0:
+        return []
+
+    span = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / span if span > 0 else np.ones(len(scores))
+    max_similarity = np.zeros(len(scores))
+    available = np.ones(len(scores), dtype=bool)
+
+    chosen = []
+    for _ in range(count):
+        gain = relevance_weight * relevance - (1.0 - relevance_weight) * max_similarity
+        index = int(np.argmax(np.where(available, gain, -np.inf)))
+        chosen.append(index)
+        available[index] = False
+        np.maximum(max_similarity, embeddings @ embeddings[index], out=max_similarity)
+    return [candidates[i] for i in chosen]
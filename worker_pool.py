@@ -0,0 +1,493 @@
+"""
+Persistent Model Worker Pool
+Long-lived worker processes that keep the Netflix, Disney+ and Hybrid systems warm
+"""
+
+import atexit
+import io
+import os
+import sys
+import time
+import queue
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import Future
+from contextlib import redirect_stdout, redirect_stderr
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+from pipeline_progress import PipelineCancelled
+from result_manifest import manifest_paths
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SUPPORTED_MODELS = ('hybrid', 'netflix', 'disney')
+
+# Bytes of the per-worker shared slot naming the job to cancel
+CANCEL_SLOT_SIZE = 128
+
+# Seconds a job past its deadline gets to stop at a progress call before its worker is killed
+DEADLINE_GRACE_SECONDS = 30.0
+
+
+def _load_systems() -> Dict[str, Any]:
+    """Import every pipeline once and build warm instances"""
+    from hybrid_netflix_disney_system import HybridThumbnailSystem
+
+    # The hybrid system already owns a Netflix and a Disney+ system,
+    # so the standalone jobs reuse them instead of loading more weights
+    hybrid = HybridThumbnailSystem(
+        sampling_strategy=os.environ.get('THUMBNAIL_SAMPLING', 'auto'),
+        segments=int(os.environ.get('THUMBNAIL_SEGMENTS', 1)),
+        selection_strategy=os.environ.get('THUMBNAIL_SELECTION', 'categories')
+    )
+    return {
+        'hybrid': hybrid,
+        'netflix': hybrid.netflix_system,
+        'disney': hybrid.disney_system,
+    }
+
+
+def _stage_timings(owner) -> Optional[Dict[str, Any]]:
+    """Per-stage frame pipeline timings of the last run, if it decoded frames"""
+    timings = getattr(owner, 'last_timings', None)
+    return timings.to_dict() if timings is not None else None
+
+
+def run_job(
+    systems: Dict[str, Any],
+    job: Dict[str, Any],
+    progress: Optional[Callable[[str, float], None]] = None
+) -> Dict[str, Any]:
+    """Run one generation job on warm systems"""
+    model = job['model']
+    video_path = job['video_path']
+    genre = job.get('genre', 'drama')
+    num_variants = int(job.get('variants', 20))
+    output_dir = job['output_dir']
+
+    if model == 'hybrid':
+        results = systems['hybrid'].process_video(
+            video_path=video_path,
+            title=job.get('title', 'Video Title'),
+            genre=[genre],
+            characters=job.get('characters', []),
+            num_variants=num_variants,
+            output_dir=output_dir,
+            progress=progress
+        )
+        return {
+            'output_dir': results['output_dir'],
+            'thumbnails': results['thumbnails'],
+            'manifest': results['manifest'],
+            'timings': _stage_timings(systems['hybrid'])
+        }
+
+    if model == 'disney':
+        results = systems['disney'].process_content(
+            video_path=video_path,
+            title=job.get('title', 'Video Title'),
+            genre=[genre],
+            characters=job.get('characters', []),
+            num_variants=num_variants,
+            output_dir=output_dir,
+            progress=progress
+        )
+        return {
+            'output_dir': results['output_dir'],
+            'thumbnails': results['thumbnails'],
+            'manifest': results['manifest'],
+            'timings': _stage_timings(systems['disney'].thumbnail_generator)
+        }
+
+    if model == 'netflix':
+        # The Netflix instance is shared with the hybrid system, so restore its settings afterwards
+        netflix = systems['netflix']
+        saved = (netflix.genre, netflix.title, netflix.num_variants)
+        try:
+            netflix.genre = genre.lower()
+            netflix.title = Path(video_path).stem
+            netflix.num_variants = num_variants
+            netflix.process(video_path, output_dir, progress=progress)
+        finally:
+            netflix.genre, netflix.title, netflix.num_variants = saved
+        manifest = netflix.last_manifest
+        return {
+            'output_dir': output_dir,
+            'thumbnails': manifest_paths(manifest),
+            'manifest': manifest,
+            'timings': _stage_timings(netflix)
+        }
+
+    raise ValueError(f"Unknown model: {model}")
+
+
+def _cancel_key(job_id: str) -> bytes:
+    """How a job id is written to a worker's cancel slot"""
+    return job_id.encode('utf-8')[:CANCEL_SLOT_SIZE - 1]
+
+
+def _job_progress(worker_id: int, job_id: str, event_queue, cancel_slot) -> Callable[[str, float], None]:
+    """Progress callback that forwards stage updates and honours cancellation of this job"""
+    last = {'stage': None, 'fraction': -1.0, 'time': 0.0}
+    key = _cancel_key(job_id)
+
+    def _progress(stage: str, fraction: float):
+        # The slot names a job, so a cancel meant for the previous job is never applied to this one
+        if cancel_slot.value == key:
+            raise PipelineCancelled(f"Job {job_id} cancelled")
+
+        # Per-frame calls are throttled; stage changes always go through
+        now = time.time()
+        if stage == last['stage'] and fraction - last['fraction'] < 0.01 and now - last['time'] < 1.0:
+            return
+        last.update(stage=stage, fraction=fraction, time=now)
+        event_queue.put(('progress', worker_id, job_id, {'stage': stage, 'fraction': fraction}))
+
+    return _progress
+
+
+def _worker_main(worker_id: int, job_queue, event_queue, cancel_slot):
+    """Worker process entry point: load models once, then serve jobs until a None sentinel"""
+    os.chdir(PROJECT_ROOT)
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    load_start = time.time()
+    boot_log = io.StringIO()
+    try:
+        with redirect_stdout(boot_log):
+            systems = _load_systems()
+    except Exception:
+        event_queue.put(('failed', worker_id, None, {'error': traceback.format_exc()}))
+        return
+
+    from model_registry import model_stats
+    event_queue.put(('warm', worker_id, None, {
+        'load_seconds': time.time() - load_start,
+        'models': model_stats()
+    }))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        job_id = job['job_id']
+        event_queue.put(('busy', worker_id, job_id, None))
+
+        started = time.time()
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        progress = _job_progress(worker_id, job_id, event_queue, cancel_slot)
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                result = run_job(systems, job, progress=progress)
+            payload = {'success': True, 'result': result}
+        except PipelineCancelled as e:
+            payload = {'success': False, 'cancelled': True, 'error': str(e)}
+        except Exception as e:
+            payload = {
+                'success': False,
+                'error': str(e),
+                'traceback': traceback.format_exc()
+            }
+
+        payload['stdout'] = stdout.getvalue()
+        payload['stderr'] = stderr.getvalue()
+        payload['duration'] = time.time() - started
+        event_queue.put(('done', worker_id, job_id, payload))
+
+
+class ModelWorkerPool:
+    """Pool of warm model worker processes fed from a local job queue"""
+
+    def __init__(self, num_workers: Optional[int] = None):
+        if num_workers is None:
+            num_workers = int(os.environ.get('THUMBNAIL_WORKERS', 1))
+        self.num_workers = max(1, num_workers)
+
+        # Spawn keeps torch/OpenCV state out of the forked Flask process
+        self._ctx = multiprocessing.get_context('spawn')
+        self._job_queue = self._ctx.Queue()
+        self._event_queue = self._ctx.Queue()
+
+        self._lock = threading.Lock()
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._progress_callbacks: Dict[str, Callable[[str, float], None]] = {}
+        self._cancelled = set()
+        self._timeouts: Dict[str, float] = {}
+        self._collector: Optional[threading.Thread] = None
+        self._running = False
+        self._job_counter = 0
+
+    def start(self) -> 'ModelWorkerPool':
+        """Spawn the worker processes and the result collector"""
+        with self._lock:
+            if self._running:
+                return self
+            self._running = True
+            for worker_id in range(self.num_workers):
+                self._spawn(worker_id)
+
+        self._collector = threading.Thread(target=self._collect, name='model-pool-collector', daemon=True)
+        self._collector.start()
+        atexit.register(self.shutdown)
+        return self
+
+    def _spawn(self, worker_id: int):
+        """Start (or restart) a single worker process"""
+        # Id of the job this worker should cancel (shared memory, checked at every progress call)
+        cancel_slot = self._ctx.Array('c', CANCEL_SLOT_SIZE)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._job_queue, self._event_queue, cancel_slot),
+            name=f'model-worker-{worker_id}',
+            # Not daemonic, so a worker can start segment processes for long videos;
+            # start() registers shutdown() to stop them at interpreter exit instead
+            daemon=False
+        )
+        process.start()
+        self._workers[worker_id] = {
+            'process': process,
+            'cancel_slot': cancel_slot,
+            'state': 'starting',
+            'job_id': None,
+            'busy_since': None,
+            'deadline': None,
+            'timed_out': False,
+            'jobs_completed': 0,
+            'load_seconds': None,
+            'models': None,
+            'error': None
+        }
+
+    def submit(
+        self,
+        job: Dict[str, Any],
+        on_progress: Optional[Callable[[str, float], None]] = None
+    ) -> Future:
+        """Queue a job and return a future resolved with the worker's result payload.
+
+        A job with a 'timeout' (seconds) is cancelled once it has run that long;
+        if it does not stop within DEADLINE_GRACE_SECONDS (e.g. a hung decode),
+        its worker is killed and restarted. Either way the payload reports
+        'timed_out'.
+        """
+        if not self._running:
+            self.start()
+
+        job = dict(job)
+        if job.get('model') not in SUPPORTED_MODELS:
+            raise ValueError(f"Unknown model: {job.get('model')}")
+
+        with self._lock:
+            self._job_counter += 1
+            job.setdefault('job_id', f"job-{os.getpid()}-{self._job_counter}")
+            future = Future()
+            self._pending[job['job_id']] = future
+            if on_progress is not None:
+                self._progress_callbacks[job['job_id']] = on_progress
+            if job.get('timeout'):
+                self._timeouts[job['job_id']] = float(job['timeout'])
+
+        self._job_queue.put(job)
+        return future
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; running jobs stop at their next frame"""
+        with self._lock:
+            if job_id not in self._pending:
+                return False
+            self._cancelled.add(job_id)
+            for info in self._workers.values():
+                if info['job_id'] == job_id:
+                    info['cancel_slot'].value = _cancel_key(job_id)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Warm/busy state of the pool for the health endpoint"""
+        with self._lock:
+            workers = []
+            for worker_id, info in sorted(self._workers.items()):
+                workers.append({
+                    'id': worker_id,
+                    'pid': info['process'].pid,
+                    'state': info['state'],
+                    'job_id': info['job_id'],
+                    'busy_seconds': round(time.time() - info['busy_since'], 1) if info['busy_since'] else 0.0,
+                    'jobs_completed': info['jobs_completed'],
+                    'load_seconds': info['load_seconds'],
+                    'models': info['models'],
+                })
+            busy = sum(1 for w in workers if w['state'] == 'busy')
+            warm = sum(1 for w in workers if w['state'] in ('warm', 'busy'))
+            return {
+                'running': self._running,
+                'workers': len(workers),
+                'warm': warm,
+                'busy': busy,
+                'queued': max(0, len(self._pending) - busy),
+                'details': workers
+            }
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop all workers once their current job finishes"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            processes = [info['process'] for info in self._workers.values()]
+
+        for _ in processes:
+            self._job_queue.put(None)
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError('Worker pool shut down'))
+
+    def _collect(self):
+        """Route worker events to futures and restart crashed or overdue workers"""
+        last_check = time.time()
+        while self._running:
+            # Checked on a clock, so a steady stream of progress events cannot hold back a deadline
+            if time.time() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.time()
+            try:
+                kind, worker_id, job_id, payload = self._event_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            future = None
+            callback = None
+            with self._lock:
+                info = self._workers.get(worker_id)
+                if info is None:
+                    continue
+
+                if kind == 'warm':
+                    info['state'] = 'warm'
+                    info['load_seconds'] = round(payload['load_seconds'], 2)
+                    info['models'] = payload['models']
+                elif kind == 'busy':
+                    info['state'] = 'busy'
+                    info['job_id'] = job_id
+                    info['busy_since'] = time.time()
+                    timeout = self._timeouts.get(job_id)
+                    info['deadline'] = info['busy_since'] + timeout if timeout else None
+                    info['timed_out'] = False
+                    # Cancelled while still queued: stop it as soon as it starts
+                    if job_id in self._cancelled:
+                        info['cancel_slot'].value = _cancel_key(job_id)
+                elif kind == 'progress':
+                    callback = self._progress_callbacks.get(job_id)
+                elif kind == 'done':
+                    if info['timed_out'] and not payload['success']:
+                        payload = dict(payload, timed_out=True, error=self._timeout_error(job_id))
+                    info['state'] = 'warm'
+                    info['job_id'] = None
+                    info['busy_since'] = None
+                    info['deadline'] = None
+                    info['timed_out'] = False
+                    info['jobs_completed'] += 1
+                    future = self._pending.pop(job_id, None)
+                    self._progress_callbacks.pop(job_id, None)
+                    self._cancelled.discard(job_id)
+                    self._timeouts.pop(job_id, None)
+                elif kind == 'failed':
+                    info['state'] = 'failed'
+                    info['error'] = payload['error']
+                    print(f"✗ Model worker {worker_id} failed to start:\n{payload['error']}")
+
+            if callback is not None:
+                try:
+                    callback(payload['stage'], payload['fraction'])
+                except Exception as e:
+                    print(f"⚠ Progress callback failed for {job_id}: {e}")
+
+            if future is not None and not future.done():
+                future.set_result(payload)
+
+            if kind == 'failed':
+                self._fail_if_no_workers()
+
+    def _timeout_error(self, job_id: str) -> str:
+        return f"Job {job_id} timed out after {self._timeouts.get(job_id, 0):.0f}s"
+
+    def _check_workers(self):
+        """Enforce job deadlines, and fail the in-flight job of a dead worker and respawn it"""
+        overdue = []
+        with self._lock:
+            if not self._running:
+                return
+            now = time.time()
+            for worker_id, info in list(self._workers.items()):
+                job_id = info['job_id']
+                if info['state'] == 'busy' and info['deadline'] is not None and now > info['deadline']:
+                    if not info['timed_out']:
+                        # First ask the job to stop at its next progress call
+                        info['timed_out'] = True
+                        info['cancel_slot'].value = _cancel_key(job_id)
+                        print(f"⚠ Job {job_id} passed its deadline, cancelling...")
+                    elif now > info['deadline'] + DEADLINE_GRACE_SECONDS and info['process'].is_alive():
+                        # No progress call came (hung decode): the worker has to go
+                        print(f"⚠ Job {job_id} did not stop, killing model worker {worker_id}...")
+                        info['process'].terminate()
+                        overdue.append(info['process'])
+
+        for process in overdue:
+            process.join(5.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+        with self._lock:
+            if not self._running:
+                return
+            for worker_id, info in list(self._workers.items()):
+                if info['state'] == 'failed' or info['process'].is_alive():
+                    continue
+
+                job_id = info['job_id']
+                future = self._pending.pop(job_id, None) if job_id else None
+                self._progress_callbacks.pop(job_id, None)
+                self._cancelled.discard(job_id)
+                if future is not None and not future.done():
+                    if info['timed_out']:
+                        future.set_result({
+                            'success': False,
+                            'cancelled': True,
+                            'timed_out': True,
+                            'error': self._timeout_error(job_id),
+                            'duration': time.time() - info['busy_since']
+                        })
+                    else:
+                        future.set_exception(RuntimeError(
+                            f"Model worker {worker_id} exited with code {info['process'].exitcode}"
+                        ))
+                self._timeouts.pop(job_id, None)
+                print(f"⚠ Model worker {worker_id} exited, restarting...")
+                self._spawn(worker_id)
+
+    def _fail_if_no_workers(self):
+        """Fail queued jobs when no worker could load the models"""
+        with self._lock:
+            if any(info['state'] != 'failed' for info in self._workers.values()):
+                return
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError('No model worker could be started'))